@@ -0,0 +1,72 @@
+import math
+
+# (distance from target, ticks between steering updates); enemies beyond the last band use the last interval
+AI_LOD_BANDS = [(300, 1), (600, 2), (1000, 4), (math.inf, 8)]
+
+
+class AIScheduler:
+    """Level of detail for enemy AI.
+
+    Nearby enemies steer every tick. Further away they steer every 2nd, 4th or
+    8th tick and coast along their last velocity in between. Start phases are
+    staggered so a wave spawned together doesn't steer together, and at most
+    `budget` enemies steer per tick; the nearby band always steers, others that
+    miss out just go again next tick.
+    """
+
+    def __init__(self, bands=AI_LOD_BANDS, budget=150, enabled=True):
+        self.bands = bands
+        self.budget = budget
+        self.enabled = enabled
+        self.tick = 0
+        self.steered = 0  # Enemies that steered this tick
+        self.coasted = 0  # Enemies that only moved this tick
+        self._phase = 0
+
+    def reset(self):
+        """Back to tick zero, so a new run staggers its enemies the same way every time"""
+        self.tick = 0
+        self.steered = 0
+        self.coasted = 0
+        self._phase = 0
+
+    def begin_tick(self):
+        self.tick += 1
+        self.steered = 0
+        self.coasted = 0
+
+    def update(self, enemy, find_target):
+        """Steer the enemy if it is due (find_target(enemy) picks who to chase), then move it"""
+        if not self.enabled:
+            enemy.update(find_target(enemy))
+            self.steered += 1
+            return
+
+        interval = enemy.lod_interval
+        if enemy.lod_tick is None:
+            # Not placed in a band yet (just spawned); waits for budget like distant enemies
+            due = True
+            interval = 0
+        else:
+            due = self.tick - enemy.lod_tick >= interval
+
+        if due and (interval == 1 or self.steered < self.budget):
+            enemy.steer(find_target(enemy))
+            self.steered += 1
+            new_interval = self.interval_for(enemy.target_distance)
+            if enemy.lod_tick is None or new_interval != interval:
+                # Entering a band: spread enemies over the ticks of the interval
+                self._phase += 1
+                enemy.lod_tick = self.tick - self._phase % new_interval
+            else:
+                enemy.lod_tick = self.tick
+            enemy.lod_interval = new_interval
+        else:
+            self.coasted += 1
+        enemy.coast()
+
+    def interval_for(self, distance):
+        for max_distance, interval in self.bands:
+            if distance < max_distance:
+                return interval
+        return self.bands[-1][1]
@@ -0,0 +1,56 @@
+import threading
+import time
+
+
+class AssetLoader:
+    """Loads assets on a background thread so the window can show a menu right away"""
+
+    def __init__(self, timer=None):
+        self.timer = timer
+        self.tasks = []
+        self.assets = {}
+        self.errors = {}
+        self.loaded = 0
+        self.ready = False
+        self._thread = None
+
+    def add(self, name, load):
+        """Queue a loader; load() returns the asset stored under name"""
+        self.tasks.append((name, load))
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="asset-loader", daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        for name, load in self.tasks:
+            started = time.perf_counter()
+            try:
+                self.assets[name] = load()
+            except Exception as e:
+                print(f"Error loading {name}: {e}")
+                self.errors[name] = e
+            if self.timer:
+                self.timer.mark(f"asset:{name}", (time.perf_counter() - started) * 1000)
+            self.loaded += 1
+        self.ready = True
+        if self.timer:
+            self.timer.mark("assets_ready", 0.0)
+
+    def wait(self):
+        """Block until everything is loaded (for tools that need assets immediately)"""
+        if self._thread is None:
+            self.start()
+        self._thread.join()
+
+    @property
+    def progress(self):
+        if not self.tasks:
+            return 1.0
+        return self.loaded / len(self.tasks)
+
+    def has(self, name):
+        return name in self.assets
+
+    def get(self, name, default=None):
+        return self.assets.get(name, default)
@@ -0,0 +1,307 @@
+"""Balance simulator: many seeded headless games played by scripted bots on every core.
+
+Each game runs the real gameplay code (main.update_playing) on a virtual clock
+with nothing drawn, so it goes as fast as the simulation allows. Results are
+summarised as survival times, the level curve and how often each upgrade is
+picked when offered.
+
+    python balance.py --games 1000
+    python balance.py --games 400 --duration 300 --policy collector --upgrades weapons
+    python balance.py --set INITIAL_SPAWN_DELAY=1.5 --set enemies.tank.health=150 --set weapons.Shotgun.damage=5
+"""
+import argparse
+import ast
+import json
+import math
+import os
+import random
+import statistics
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from flowfield import ARENAS, DEFAULT_ARENA
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+
+POLICIES = ["stand", "kite", "collector"]
+UPGRADE_POLICIES = ["random", "weapons", "general"]
+
+parser = argparse.ArgumentParser(description="Vibe Survivors balance simulator")
+parser.add_argument("--games", type=int, default=200, help="Games to simulate")
+parser.add_argument("--duration", type=float, help="Seconds per game (default: the full game)")
+parser.add_argument("--seed", type=int, default=1, help="Seed of the first game; game i uses seed + i")
+parser.add_argument("--policy", choices=POLICIES, default="collector", help="How the bot moves")
+parser.add_argument("--upgrades", choices=UPGRADE_POLICIES, default="random", help="How the bot picks upgrades")
+parser.add_argument("--arena", choices=list(ARENAS), default=DEFAULT_ARENA, help="Obstacle layout to play in")
+parser.add_argument("--workers", type=int, default=os.cpu_count(), help="Processes to run games in")
+parser.add_argument("--set", action="append", default=[], metavar="NAME=VALUE", dest="overrides",
+                    help="Tuning override: a main.py constant (INITIAL_SPAWN_DELAY=1.5), an enemy stat "
+                         "(enemies.tank.health=150) or a weapon upgrade amount (weapons.Shotgun.damage=5)")
+parser.add_argument("--json", metavar="PATH", help="Also write the per-game results and summary as JSON")
+
+
+def apply_overrides(overrides):
+    """Apply NAME=VALUE tuning overrides to the game modules in this process"""
+    import enemies
+    import main
+    import weapons
+
+    for override in overrides:
+        name, _, text = override.partition("=")
+        value = ast.literal_eval(text)
+        parts = name.split(".")
+        if parts[0] == "enemies" and len(parts) == 3:
+            enemies.ENEMY_STATS[parts[1]][parts[2]] = value
+        elif parts[0] == "weapons" and len(parts) == 3:
+            # First modifier of the upgrade that changes this stat, e.g. the +5 of "Damage Up"
+            upgrade = next(entry for entry in getattr(weapons, parts[1]).UPGRADES if entry["stat"] == parts[2])
+            op, _ = upgrade["modifiers"][0]
+            upgrade["modifiers"][0] = (op, value)
+        elif len(parts) == 1 and hasattr(main, name):
+            setattr(main, name, value)
+        else:
+            raise ValueError(f"Unknown override: {override}")
+
+
+class BalanceBot:
+    """Scripted player: moves by `policy`, always shoots at the nearest enemy"""
+
+    def __init__(self, main, policy, rng):
+        self.main = main
+        self.policy = policy
+        self.rng = rng
+        self.wander = (0, 0)
+        self.frame = 0
+
+    def control(self, player):
+        main = self.main
+        self.frame += 1
+        if self.frame % 60 == 0:
+            self.wander = (self.rng.choice((-1, 0, 1)), self.rng.choice((-1, 0, 1)))
+
+        x, y = player.rect.center
+        target = min(main.enemies, key=lambda e: (e.rect.centerx - x) ** 2 + (e.rect.centery - y) ** 2,
+                     default=None)
+        threat = target is not None and math.hypot(target.rect.centerx - x, target.rect.centery - y) < 200
+
+        move_x = move_y = 0
+        if self.policy != "stand":
+            move_x, move_y = self.wander
+            if threat:
+                move_x = -1 if target.rect.centerx > x else 1
+                move_y = -1 if target.rect.centery > y else 1
+            elif self.policy == "collector" and main.gem_field.count:
+                gems = main.gem_field.position[:main.gem_field.count]
+                gem_x, gem_y = gems[((gems - (x, y)) ** 2).sum(axis=1).argmin()].tolist()
+                move_x = (gem_x > x + 4) - (gem_x < x - 4)
+                move_y = (gem_y > y + 4) - (gem_y < y - 4)
+
+        pressed = player.controls.keys.pressed
+        pressed.clear()
+        if move_x:
+            pressed.add(main.pygame.K_a if move_x < 0 else main.pygame.K_d)
+        if move_y:
+            pressed.add(main.pygame.K_w if move_y < 0 else main.pygame.K_s)
+
+        if target is None:
+            return (x, y), False
+        return target.rect.center, True
+
+    def choose(self, options, upgrade_policy):
+        if upgrade_policy == "weapons":
+            preferred = [o for o in options if o["type"] in ("weapon_unlock", "weapon_specific")]
+        elif upgrade_policy == "general":
+            preferred = [o for o in options if o["type"] == "general"]
+        else:
+            preferred = []
+        return self.rng.choice(preferred or options)
+
+
+_worker = {}
+
+
+def upgrade_labels():
+    """Label per weapon upgrade entry, so the shared names ("Damage Up") are told apart by weapon"""
+    import weapons
+
+    labels = {}
+    for weapon in vars(weapons).values():
+        for entry in getattr(weapon, "UPGRADES", None) or []:
+            labels[id(entry)] = f"{weapon.__name__}: {entry['name']}"
+    return labels
+
+
+def option_label(option):
+    return _worker["labels"].get(id(option["entry"]), option["name"])
+
+
+def init_worker(overrides, duration, arena):
+    """Set up the game once per worker process"""
+    import gameclock
+    import main
+    import netplay
+
+    apply_overrides(overrides)
+    if duration:
+        main.GAME_DURATION = duration
+    main.args = main.parser.parse_args(["--no-run-db", "--render-mode", "60"])
+    main.init_display()
+    main.font, main.small_font, main.title_font = main.load_fonts()
+    main.load_explosion_texture()
+    main.load_sprites()
+    main.set_arena(arena)
+    main.spawn_queue.budget_ms = None  # Spawn by count only, so results don't depend on machine load
+    _worker.update(main=main, gameclock=gameclock, netplay=netplay, labels=upgrade_labels())
+
+
+def play_game(seed, policy, upgrade_policy):
+    """One seeded game to victory or death; returns a plain dict of results"""
+    main = _worker["main"]
+    # A fresh clock per game, so nothing (float drift included) carries over from the worker's last game
+    clock = _worker["gameclock"].VirtualClock()
+    _worker["gameclock"].use_clock(clock)
+    rng = random.Random(seed)
+    random.seed(seed)
+    bot = BalanceBot(main, policy, rng)
+    started = time.perf_counter()
+
+    main.reset_game()
+    main.player.controls = _worker["netplay"].RemoteControls()
+    tick_seconds = 1.0 / main.FPS
+    level_times = [0.0]  # Game time each level was reached, from level 1
+    offered = []
+    picked = []
+
+    while True:
+        main.update_time()
+        state = main.game_state
+        if state == main.PLAYING:
+            aim, firing = bot.control(main.player)
+            main.update_playing(aim, firing)
+        elif state == main.UPGRADING:
+            option = bot.choose(main.upgrade_options, upgrade_policy)
+            offered.extend(option_label(o) for o in main.upgrade_options)
+            picked.append(option_label(option))
+            main.choose_upgrade(option)
+        else:
+            break
+        while len(level_times) < main.player.level:
+            level_times.append(round(main.elapsed_time, 2))
+        clock.advance(tick_seconds)
+
+    main.player.controls = None
+    return {
+        "seed": seed,
+        "victory": main.game_state == main.VICTORY,
+        "survived": round(main.elapsed_time, 2),
+        "score": main.player.score,
+        "level": main.player.level,
+        "level_times": level_times,
+        "weapons": list(main.player.owned_weapons),
+        "offered": offered,
+        "picked": picked,
+        "wall_seconds": round(time.perf_counter() - started, 3),
+    }
+
+
+def summarise(results, duration):
+    """Aggregate per-game results into the report's numbers"""
+    survived = sorted(r["survived"] for r in results)
+
+    def percentile(p):
+        return survived[min(len(survived) - 1, int(p * len(survived)))]
+
+    # Level curve: mean level per minute among games still going, and how many that is
+    minutes = int(duration // 60) + 1
+    curve = []
+    for minute in range(minutes + 1):
+        t = minute * 60
+        alive = [r for r in results if r["survived"] >= t]
+        if not alive:
+            break
+        levels = [sum(1 for level_time in r["level_times"] if level_time <= t) for r in alive]
+        curve.append({"minute": minute, "alive": len(alive) / len(results), "mean_level": statistics.fmean(levels)})
+
+    offered = {}
+    picked = {}
+    for r in results:
+        for name in r["offered"]:
+            offered[name] = offered.get(name, 0) + 1
+        for name in r["picked"]:
+            picked[name] = picked.get(name, 0) + 1
+    pick_rates = {name: {"offered": count, "picked": picked.get(name, 0), "rate": picked.get(name, 0) / count}
+                  for name, count in sorted(offered.items(), key=lambda item: -item[1])}
+
+    weapons = {}
+    for r in results:
+        for weapon in r["weapons"]:
+            weapons[weapon] = weapons.get(weapon, 0) + 1
+
+    return {
+        "games": len(results),
+        "victory_rate": sum(r["victory"] for r in results) / len(results),
+        "survived": {"mean": statistics.fmean(survived), "p10": percentile(0.1), "median": percentile(0.5),
+                     "p90": percentile(0.9)},
+        "final_level": statistics.fmean(r["level"] for r in results),
+        "score": statistics.fmean(r["score"] for r in results),
+        "level_curve": curve,
+        "pick_rates": pick_rates,
+        "weapon_ownership": {weapon: count / len(results) for weapon, count in sorted(weapons.items())},
+    }
+
+
+def print_report(summary, args, elapsed, game_seconds):
+    survived = summary["survived"]
+    print(f"{summary['games']} games in the {args.arena} arena, policy {args.policy}, upgrades {args.upgrades}, "
+          f"{elapsed:.1f} s wall ({game_seconds / max(elapsed, 1e-9):.0f}x real time)")
+    if args.overrides:
+        print("overrides: " + ", ".join(args.overrides))
+    print(f"victory rate {summary['victory_rate']:.1%}, final level {summary['final_level']:.1f}, "
+          f"score {summary['score']:.0f}")
+    print(f"survived: mean {survived['mean']:.0f} s, p10 {survived['p10']:.0f} s, "
+          f"median {survived['median']:.0f} s, p90 {survived['p90']:.0f} s")
+    print("level curve:")
+    for point in summary["level_curve"]:
+        print(f"  {point['minute']:>3} min  level {point['mean_level']:5.2f}  ({point['alive']:.0%} still alive)")
+    print("upgrade picks (picked / offered):")
+    for name, rate in summary["pick_rates"].items():
+        print(f"  {name:<30} {rate['picked']:>6} / {rate['offered']:<6} {rate['rate']:.0%}")
+    print("weapons owned at the end:")
+    for weapon, share in summary["weapon_ownership"].items():
+        print(f"  {weapon:<12} {share:.0%}")
+
+
+def main_balance():
+    args = parser.parse_args()
+    try:
+        apply_overrides(args.overrides)  # Fail fast on typos, before starting workers
+    except (ValueError, SyntaxError, KeyError, AttributeError, StopIteration) as e:
+        parser.error(f"bad override: {e}")
+    import main
+    duration = args.duration or main.GAME_DURATION
+
+    seeds = range(args.seed, args.seed + args.games)
+    results = []
+    started = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=args.workers, initializer=init_worker,
+                             initargs=(args.overrides, args.duration, args.arena)) as executor:
+        chunksize = max(1, args.games // (args.workers * 8))
+        games = executor.map(play_game, seeds, [args.policy] * args.games, [args.upgrades] * args.games,
+                             chunksize=chunksize)
+        for i, result in enumerate(games, 1):
+            results.append(result)
+            if i % max(1, args.games // 10) == 0:
+                print(f"  {i}/{args.games} games", file=sys.stderr)
+    elapsed = time.perf_counter() - started
+
+    summary = summarise(results, duration)
+    print_report(summary, args, elapsed, sum(r["survived"] for r in results))
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"args": vars(args), "summary": summary, "games": results}, f, indent=1)
+
+
+if __name__ == "__main__":
+    main_balance()
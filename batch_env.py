@@ -0,0 +1,329 @@
+"""Many copies of the game stepped in lockstep, for automated playtesting agents.
+
+All per-game state lives in NumPy arrays with the game index as the first axis,
+so one step() advances every game with a handful of array operations instead
+of one Python game loop per instance. The rules mirror the PLAYING state in
+main.py (same spawn curve, enemy stats, pistol and collision rules), but the
+player keeps the starting pistol: level-ups are tracked, not applied.
+"""
+import math
+
+import numpy as np
+
+import enemies
+from enemies import ENEMY_STATS, get_enemy_image
+from main import (WINDOW_WIDTH, WINDOW_HEIGHT, FPS, GAME_DURATION, MINI_BOSS_SPAWN_TIME,
+                  INITIAL_SPAWN_DELAY, MIN_SPAWN_DELAY, ENEMY_SPAWN_RATE_INCREASE,
+                  ENEMY_COUNT_INCREASE_INTERVAL, ENEMY_COUNT_INCREASE_PERCENT)
+from weapons import Pistol
+
+ENEMY_TYPES = ["basic", "fast", "tank", "ranged", "mini_boss"]
+RANGED = ENEMY_TYPES.index("ranged")
+MINI_BOSS = ENEMY_TYPES.index("mini_boss")
+
+PLAYER_SIZE = 30
+PLAYER_SPEED = 5
+PLAYER_MAX_HEALTH = 100
+SHOT_SIZE = 10
+ENEMY_SHOT_SPEED = 10
+RANGED_ATTACK_RANGE = 200
+RANGED_ATTACK_TICKS = 3000 * FPS // 1000
+
+# Actions: move x, move y (each -1..1), aim angle in radians, fire (> 0.5 fires)
+ACTION_SIZE = 4
+PLAYER_FEATURES = 5
+ENEMY_FEATURES = 5
+
+
+class BatchEnv:
+    """N independent games advanced together by step(actions)"""
+
+    def __init__(self, num_envs, max_enemies=128, max_shots=32, max_enemy_shots=32, nearest=8, seed=None):
+        self.num_envs = num_envs
+        self.max_enemies = max_enemies
+        self.max_shots = max_shots
+        self.max_enemy_shots = max_enemy_shots
+        self.nearest = nearest
+        self.rng = np.random.default_rng(seed)
+        self.observation_size = PLAYER_FEATURES + nearest * ENEMY_FEATURES
+
+        # Per-type tables, indexed by enemy type id
+        self.type_health = np.array([ENEMY_STATS[t]["health"] for t in ENEMY_TYPES], dtype=np.float32)
+        self.type_speed = np.array([ENEMY_STATS[t]["speed"] for t in ENEMY_TYPES], dtype=np.float32)
+        self.type_damage = np.array([ENEMY_STATS[t]["damage"] for t in ENEMY_TYPES], dtype=np.float32)
+        self.type_score = np.array([ENEMY_STATS[t]["score_value"] for t in ENEMY_TYPES], dtype=np.float32)
+        self.type_experience = np.array([ENEMY_STATS[t]["experience_value"] for t in ENEMY_TYPES], dtype=np.float32)
+        self.type_half = np.array([get_enemy_image(t).get_width() / 2 for t in ENEMY_TYPES], dtype=np.float32)
+
+        pistol = Pistol()
+        self.shot_damage = float(pistol.damage)
+        self.shot_speed = float(pistol.projectile_speed)
+        self.fire_ticks = int(math.ceil(pistol.fire_rate * FPS / 1000))
+
+        n, e, s, q = num_envs, max_enemies, max_shots, max_enemy_shots
+        # Player
+        self.player_pos = np.zeros((n, 2), dtype=np.float32)
+        self.player_health = np.zeros(n, dtype=np.float32)
+        self.fire_cooldown = np.zeros(n, dtype=np.int32)
+        self.score = np.zeros(n, dtype=np.float32)
+        self.experience = np.zeros(n, dtype=np.float32)
+        self.level_experience = np.zeros(n, dtype=np.float32)
+        self.experience_to_level = np.zeros(n, dtype=np.float32)
+        self.level = np.zeros(n, dtype=np.int32)
+        # Clock and spawning
+        self.tick = np.zeros(n, dtype=np.int32)
+        self.last_spawn_tick = np.zeros(n, dtype=np.int32)
+        self.mini_boss_spawned = np.zeros(n, dtype=bool)
+        # Enemies
+        self.enemy_pos = np.zeros((n, e, 2), dtype=np.float32)
+        self.enemy_health = np.zeros((n, e), dtype=np.float32)
+        self.enemy_type = np.zeros((n, e), dtype=np.int8)
+        self.enemy_alive = np.zeros((n, e), dtype=bool)
+        self.enemy_attack_tick = np.zeros((n, e), dtype=np.int32)
+        # Player shots
+        self.shot_pos = np.zeros((n, s, 2), dtype=np.float32)
+        self.shot_vel = np.zeros((n, s, 2), dtype=np.float32)
+        self.shot_alive = np.zeros((n, s), dtype=bool)
+        # Enemy shots
+        self.enemy_shot_pos = np.zeros((n, q, 2), dtype=np.float32)
+        self.enemy_shot_vel = np.zeros((n, q, 2), dtype=np.float32)
+        self.enemy_shot_alive = np.zeros((n, q), dtype=bool)
+
+        self.reset()
+
+    def reset(self, mask=None):
+        """Reset the games selected by mask (all by default) and return observations"""
+        if mask is None:
+            mask = np.ones(self.num_envs, dtype=bool)
+        self.player_pos[mask] = (WINDOW_WIDTH // 2, WINDOW_HEIGHT // 2)
+        self.player_health[mask] = PLAYER_MAX_HEALTH
+        self.fire_cooldown[mask] = 0
+        self.score[mask] = 0
+        self.experience[mask] = 0
+        self.level_experience[mask] = 0
+        self.experience_to_level[mask] = 100
+        self.level[mask] = 1
+        self.tick[mask] = 0
+        self.last_spawn_tick[mask] = 0
+        self.mini_boss_spawned[mask] = False
+        self.enemy_alive[mask] = False
+        self.shot_alive[mask] = False
+        self.enemy_shot_alive[mask] = False
+        return self.observe()
+
+    def step(self, actions):
+        """Advance every game one frame; returns (observations, rewards, dones, info)"""
+        actions = np.asarray(actions, dtype=np.float32)
+        self.tick += 1
+        elapsed = self.tick / FPS
+        score_before = self.score.copy()
+
+        self._move_player(actions)
+        self._fire(actions)
+        self._spawn(elapsed)
+        self._ranged_attacks()
+        self._move_enemies()
+        self._move_shots()
+        self._collide()
+        self._level_up()
+
+        dones = (self.player_health <= 0) | (elapsed >= GAME_DURATION)
+        rewards = self.score - score_before
+        info = {
+            "survived_seconds": np.where(dones, elapsed, 0.0),
+            "final_score": np.where(dones, self.score, 0.0),
+            "final_level": np.where(dones, self.level, 0),
+            "victory": dones & (self.player_health > 0),
+        }
+        if dones.any():
+            self.reset(dones)
+        return self.observe(), rewards, dones, info
+
+    def _move_player(self, actions):
+        move = np.clip(actions[:, 0:2], -1, 1)
+        # Same as holding the keys: each axis moves at full speed
+        self.player_pos += np.sign(move) * (np.abs(move) > 0.5) * PLAYER_SPEED
+        half = PLAYER_SIZE / 2
+        np.clip(self.player_pos[:, 0], half, WINDOW_WIDTH - half, out=self.player_pos[:, 0])
+        np.clip(self.player_pos[:, 1], half, WINDOW_HEIGHT - half, out=self.player_pos[:, 1])
+
+    def _fire(self, actions):
+        self.fire_cooldown -= 1
+        firing = (actions[:, 3] > 0.5) & (self.fire_cooldown <= 0)
+        free = ~self.shot_alive
+        firing &= free.any(axis=1)
+        if not firing.any():
+            return
+        envs = np.flatnonzero(firing)
+        slots = free[envs].argmax(axis=1)
+        angle = actions[envs, 2]
+        self.shot_pos[envs, slots] = self.player_pos[envs]
+        self.shot_vel[envs, slots, 0] = np.cos(angle) * self.shot_speed
+        self.shot_vel[envs, slots, 1] = np.sin(angle) * self.shot_speed
+        self.shot_alive[envs, slots] = True
+        self.fire_cooldown[envs] = self.fire_ticks
+
+    def _spawn(self, elapsed):
+        spawn_delay = np.maximum(MIN_SPAWN_DELAY, INITIAL_SPAWN_DELAY - elapsed * ENEMY_SPAWN_RATE_INCREASE)
+        due = (self.tick - self.last_spawn_tick) / FPS >= spawn_delay
+        multiplier = 1.0 + (elapsed // ENEMY_COUNT_INCREASE_INTERVAL) * ENEMY_COUNT_INCREASE_PERCENT
+        counts = np.where(due, np.maximum(1, multiplier.astype(np.int32)), 0)
+        self.last_spawn_tick[due] = self.tick[due]
+
+        # Same type mix over time as the real game
+        choices = np.select([elapsed < 30, elapsed < 45, elapsed < 60], [1, 2, 3], 4)
+        self._spawn_enemies(counts, choices)
+
+        boss = (elapsed >= MINI_BOSS_SPAWN_TIME) & ~self.mini_boss_spawned
+        if boss.any():
+            self.mini_boss_spawned |= boss
+            self._spawn_enemies(boss.astype(np.int32), None)
+
+    def _spawn_enemies(self, counts, choices):
+        """Fill the first counts[i] free enemy slots of each game with random types below choices[i]
+
+        choices=None spawns mini-bosses.
+        """
+        envs = np.flatnonzero(counts)
+        if len(envs) == 0:
+            return
+        free = ~self.enemy_alive[envs]
+        new = free & (np.cumsum(free, axis=1) <= counts[envs, None])
+        rows, slots = np.nonzero(new)
+        if len(rows) == 0:
+            return
+        games = envs[rows]
+        if choices is None:
+            types = np.full(len(rows), MINI_BOSS, dtype=np.int8)
+        else:
+            types = (self.rng.random(len(rows)) * choices[games]).astype(np.int8)
+
+        # Random point just outside an edge of the spawn area, as Enemy.__init__ does
+        side = self.rng.integers(0, 4, len(rows))
+        along_x = self.rng.integers(0, enemies.WINDOW_WIDTH + 1, len(rows))
+        along_y = self.rng.integers(0, enemies.WINDOW_HEIGHT + 1, len(rows))
+        x = np.select([side == 0, side == 1, side == 2], [along_x, enemies.WINDOW_WIDTH + 20, along_x], -20)
+        y = np.select([side == 0, side == 1, side == 2], [-20, along_y, enemies.WINDOW_HEIGHT + 20], along_y)
+
+        self.enemy_pos[games, slots, 0] = x
+        self.enemy_pos[games, slots, 1] = y
+        self.enemy_type[games, slots] = types
+        self.enemy_health[games, slots] = self.type_health[types]
+        self.enemy_attack_tick[games, slots] = self.tick[games]
+        self.enemy_alive[games, slots] = True
+
+    def _ranged_attacks(self):
+        offset = self.player_pos[:, None, :] - self.enemy_pos
+        dist = np.sqrt((offset * offset).sum(axis=2))
+        ready = (self.enemy_alive & (self.enemy_type == RANGED) & (dist <= RANGED_ATTACK_RANGE) & (dist > 0) &
+                 (self.tick[:, None] - self.enemy_attack_tick >= RANGED_ATTACK_TICKS))
+        free = ~self.enemy_shot_alive
+        # One new enemy shot per game per frame; others fire on the next frame
+        envs = np.flatnonzero(ready.any(axis=1) & free.any(axis=1))
+        if len(envs) == 0:
+            return
+        shooter = ready[envs].argmax(axis=1)
+        slot = free[envs].argmax(axis=1)
+        direction = offset[envs, shooter] / dist[envs, shooter][:, None]
+        self.enemy_shot_pos[envs, slot] = self.enemy_pos[envs, shooter]
+        self.enemy_shot_vel[envs, slot] = direction * ENEMY_SHOT_SPEED
+        self.enemy_shot_alive[envs, slot] = True
+        self.enemy_attack_tick[envs, shooter] = self.tick[envs]
+
+    def _move_enemies(self):
+        offset = self.player_pos[:, None, :] - self.enemy_pos
+        dist = np.sqrt((offset * offset).sum(axis=2))
+        direction = np.divide(offset, dist[:, :, None], out=np.zeros_like(offset), where=dist[:, :, None] > 0)
+        step = self.type_speed[self.enemy_type]
+
+        # Ranged enemies hold a band around their attack range
+        ranged = self.enemy_type == RANGED
+        step = np.where(ranged & (dist < RANGED_ATTACK_RANGE - 50), -step, step)
+        step = np.where(ranged & (dist <= RANGED_ATTACK_RANGE + 50) & (dist >= RANGED_ATTACK_RANGE - 50), 0, step)
+        self.enemy_pos += direction * (step * self.enemy_alive)[:, :, None]
+
+    def _move_shots(self):
+        self.shot_pos += self.shot_vel
+        self.enemy_shot_pos += self.enemy_shot_vel
+        for pos, alive in ((self.shot_pos, self.shot_alive), (self.enemy_shot_pos, self.enemy_shot_alive)):
+            inside = ((pos[:, :, 0] > -SHOT_SIZE) & (pos[:, :, 0] < WINDOW_WIDTH + SHOT_SIZE) &
+                      (pos[:, :, 1] > -SHOT_SIZE) & (pos[:, :, 1] < WINDOW_HEIGHT + SHOT_SIZE))
+            alive &= inside
+
+    def _collide(self):
+        enemy_half = self.type_half[self.enemy_type]
+
+        # Player touching an enemy: player takes its damage, the enemy is gone (no reward)
+        offset = np.abs(self.enemy_pos - self.player_pos[:, None, :])
+        reach = enemy_half + PLAYER_SIZE / 2
+        contact = self.enemy_alive & (offset[:, :, 0] <= reach) & (offset[:, :, 1] <= reach)
+        self.player_health -= (self.type_damage[self.enemy_type] * contact).sum(axis=1)
+        self.enemy_alive &= ~contact
+
+        # Player shots: each live shot hits the first enemy of its own game it overlaps
+        env_index, shot_index = np.nonzero(self.shot_alive)
+        if len(env_index):
+            offset = np.abs(self.shot_pos[env_index, shot_index][:, None, :] - self.enemy_pos[env_index])
+            reach = enemy_half[env_index] + SHOT_SIZE / 2
+            overlap = self.enemy_alive[env_index] & (offset[..., 0] <= reach) & (offset[..., 1] <= reach)
+            hit_any = overlap.any(axis=1)
+            env_index, shot_index, overlap = env_index[hit_any], shot_index[hit_any], overlap[hit_any]
+        if len(env_index):
+            target = overlap.argmax(axis=1)
+            damage = np.zeros_like(self.enemy_health)
+            np.add.at(damage, (env_index, target), self.shot_damage)
+            self.enemy_health -= damage
+            killed = self.enemy_alive & (self.enemy_health <= 0)
+            # A shot is used up when the enemy it hit dies
+            used = killed[env_index, target]
+            self.shot_alive[env_index[used], shot_index[used]] = False
+            self.score += (self.type_score[self.enemy_type] * killed).sum(axis=1)
+            gained = (self.type_experience[self.enemy_type] * killed).sum(axis=1)
+            self.experience += gained
+            self.level_experience += gained
+            self.enemy_alive &= ~killed
+
+        # Enemy shots against the player
+        offset = np.abs(self.enemy_shot_pos - self.player_pos[:, None, :])
+        reach = (PLAYER_SIZE + SHOT_SIZE) / 2
+        hit = self.enemy_shot_alive & (offset[:, :, 0] <= reach) & (offset[:, :, 1] <= reach)
+        self.player_health -= hit.sum(axis=1) * ENEMY_STATS["ranged"]["damage"]
+        self.enemy_shot_alive &= ~hit
+
+    def _level_up(self):
+        # Same curve as Player.add_experience, leftovers carry over
+        leveling = self.level_experience >= self.experience_to_level
+        while leveling.any():
+            self.level_experience[leveling] -= self.experience_to_level[leveling]
+            self.experience_to_level[leveling] = np.floor(self.experience_to_level[leveling] * 1.5)
+            self.level[leveling] += 1
+            leveling = self.level_experience >= self.experience_to_level
+
+    def observe(self):
+        """(N, observation_size) float32: player features then the nearest enemies"""
+        obs = np.zeros((self.num_envs, self.observation_size), dtype=np.float32)
+        obs[:, 0] = self.player_pos[:, 0] / WINDOW_WIDTH
+        obs[:, 1] = self.player_pos[:, 1] / WINDOW_HEIGHT
+        obs[:, 2] = self.player_health / PLAYER_MAX_HEALTH
+        obs[:, 3] = np.clip(self.fire_cooldown, 0, None) / self.fire_ticks
+        obs[:, 4] = self.tick / (GAME_DURATION * FPS)
+
+        k = min(self.nearest, self.max_enemies)
+        offset = self.enemy_pos - self.player_pos[:, None, :]
+        dist_sq = np.where(self.enemy_alive, (offset * offset).sum(axis=2), np.inf)
+        nearest = np.argpartition(dist_sq, k - 1, axis=1)[:, :k]
+        nearest_dist = np.take_along_axis(dist_sq, nearest, axis=1)
+        order = np.argsort(nearest_dist, axis=1)
+        nearest = np.take_along_axis(nearest, order, axis=1)
+        present = np.isfinite(np.take_along_axis(nearest_dist, order, axis=1))
+
+        rows = np.arange(self.num_envs)[:, None]
+        features = np.stack([
+            present.astype(np.float32),
+            offset[rows, nearest, 0] / WINDOW_WIDTH,
+            offset[rows, nearest, 1] / WINDOW_HEIGHT,
+            self.enemy_type[rows, nearest] / (len(ENEMY_TYPES) - 1),
+            self.enemy_health[rows, nearest] / self.type_health[self.enemy_type[rows, nearest]],
+        ], axis=2) * present[:, :, None]
+        obs[:, PLAYER_FEATURES:PLAYER_FEATURES + k * ENEMY_FEATURES] = features.reshape(self.num_envs, -1)
+        return obs
@@ -0,0 +1,213 @@
+import math
+
+import numpy as np
+import pygame
+
+# Collision layers
+PLAYER = "player"
+ENEMY = "enemy"
+PLAYER_SHOT = "player_shot"
+ENEMY_SHOT = "enemy_shot"
+AREA = "area"
+
+# Which layers interact: each layer and the layers it is tested against, in the order the
+# collision stage resolves them. Every pair is listed once; anything not listed is never tested.
+COLLISION_MATRIX = {
+    PLAYER: (ENEMY,),
+    PLAYER_SHOT: (ENEMY,),
+    AREA: (ENEMY,),
+    ENEMY_SHOT: (PLAYER,),
+}
+
+COLLISION_PAIRS = [(a, b) for a, targets in COLLISION_MATRIX.items() for b in targets]
+
+
+def run_collision_pairs(layers, handlers):
+    """Call handlers[(a, b)](group_a, group_b) for every interacting pair with something in both layers"""
+    for pair in COLLISION_PAIRS:
+        a, b = pair
+        group_a = layers[a]
+        group_b = layers[b]
+        if group_a and group_b:
+            handlers[pair](group_a, group_b)
+
+
+def swept_hits(starts, ends, half_sizes, boxes, radii):
+    """Swept test of moving projectiles against enemies, all pairs at once.
+
+    starts, ends: (P, 2) projectile centres at the start and end of the frame
+    half_sizes:   (P,) projectile half extents, added to every target (Minkowski sum)
+    boxes:        (E, 4) target rects as left, top, right, bottom
+    radii:        (E,) circle radius for round targets, 0 to use the box
+
+    Returns (projectile_index, target_index, t) arrays ordered by projectile and
+    then by time of impact t in [0, 1] along the projectile's path this frame.
+    """
+    empty = (np.empty(0, dtype=np.intp), np.empty(0, dtype=np.intp), np.empty(0))
+    if len(starts) == 0 or len(boxes) == 0:
+        return empty
+
+    # Broadphase: bounding box of each swept path against each target box
+    path_min = np.minimum(starts, ends) - half_sizes[:, None]
+    path_max = np.maximum(starts, ends) + half_sizes[:, None]
+    overlap = ((path_min[:, None, 0] <= boxes[None, :, 2]) & (path_max[:, None, 0] >= boxes[None, :, 0]) &
+               (path_min[:, None, 1] <= boxes[None, :, 3]) & (path_max[:, None, 1] >= boxes[None, :, 1]))
+    p, e = np.nonzero(overlap)
+    if len(p) == 0:
+        return empty
+
+    # Narrowphase only on the candidate pairs
+    start = starts[p]
+    delta = ends[p] - start
+    half = half_sizes[p]
+    t = np.full(len(p), np.inf)
+
+    round_target = radii[e] > 0
+    box_target = ~round_target
+
+    if box_target.any():
+        t[box_target] = _segment_box(start[box_target], delta[box_target],
+                                     boxes[e[box_target]], half[box_target])
+    if round_target.any():
+        rp = e[round_target]
+        centers = np.stack(((boxes[rp, 0] + boxes[rp, 2]) * 0.5, (boxes[rp, 1] + boxes[rp, 3]) * 0.5), axis=1)
+        t[round_target] = _segment_circle(start[round_target], delta[round_target],
+                                          centers, radii[rp] + half[round_target])
+
+    hit = np.isfinite(t)
+    p, e, t = p[hit], e[hit], t[hit]
+    order = np.lexsort((t, p))
+    return p[order], e[order], t[order]
+
+
+def _segment_box(start, delta, boxes, half):
+    """Slab test: entry time of each segment into its expanded box, inf on a miss"""
+    lo = boxes[:, :2] - half[:, None]
+    hi = boxes[:, 2:] + half[:, None]
+
+    moving = delta != 0
+    safe_delta = np.where(moving, delta, 1.0)
+    t1 = (lo - start) / safe_delta
+    t2 = (hi - start) / safe_delta
+    near = np.minimum(t1, t2)
+    far = np.maximum(t1, t2)
+
+    # An axis with no movement either always overlaps or never does
+    inside = (start >= lo) & (start <= hi)
+    near = np.where(moving, near, np.where(inside, -np.inf, np.inf))
+    far = np.where(moving, far, np.where(inside, np.inf, -np.inf))
+
+    t_enter = near.max(axis=1)
+    t_exit = far.min(axis=1)
+    hit = (t_enter <= t_exit) & (t_exit >= 0) & (t_enter <= 1)
+    return np.where(hit, np.maximum(t_enter, 0.0), np.inf)
+
+
+def _segment_circle(start, delta, centers, radii):
+    """Entry time of each segment into its circle, inf on a miss"""
+    offset = start - centers
+    a = (delta * delta).sum(axis=1)
+    b = 2 * (offset * delta).sum(axis=1)
+    c = (offset * offset).sum(axis=1) - radii * radii
+
+    t = np.full(len(start), np.inf)
+    # Already overlapping at the start of the frame
+    t[c <= 0] = 0.0
+
+    moving = (c > 0) & (a > 0)
+    disc = b * b - 4 * a * c
+    moving &= disc >= 0
+    if moving.any():
+        entry = (-b[moving] - np.sqrt(disc[moving])) / (2 * a[moving])
+        t[moving] = np.where((entry >= 0) & (entry <= 1), entry, np.inf)
+    return t
+
+
+_solid_masks = {}  # size -> fully set mask
+
+
+def sprite_mask(sprite):
+    """The sprite's shape mask; sprites without a mask attribute are solid over their rect"""
+    mask = getattr(sprite, "mask", None)
+    if mask is None:
+        size = sprite.rect.size
+        mask = _solid_masks.get(size)
+        if mask is None:
+            mask = pygame.mask.Mask(size, fill=True)
+            _solid_masks[size] = mask
+    return mask
+
+
+def masks_overlap(a, b):
+    """Narrowphase: pixel test between two sprites, for pairs whose rects already overlap"""
+    if getattr(a, "mask", None) is None and getattr(b, "mask", None) is None:
+        return True  # Both solid, the rect test was exact
+    offset = (b.rect.x - a.rect.x, b.rect.y - a.rect.y)
+    return sprite_mask(a).overlap(sprite_mask(b), offset) is not None
+
+
+def _mask_hit_time(projectile, target, t):
+    """First time from t along the projectile's path where it touches the target's mask, None if never.
+
+    Steps half a projectile width at a time, so the shot can't skip over a pixel of the shape.
+    """
+    shot_mask = sprite_mask(projectile)
+    width, height = projectile.rect.size
+    start_x, start_y = projectile.prev_x, projectile.prev_y
+    dx, dy = projectile.x - start_x, projectile.y - start_y
+    steps = max(1, math.ceil(math.hypot(dx, dy) * (1 - t) / max(1, width // 2)))
+    target_x, target_y = target.rect.topleft
+    target_mask = target.mask
+    for i in range(steps + 1):
+        step_t = t + (1 - t) * i / steps
+        left = round(start_x + dx * step_t - width / 2)
+        top = round(start_y + dy * step_t - height / 2)
+        if shot_mask.overlap(target_mask, (target_x - left, target_y - top)) is not None:
+            return step_t
+    return None
+
+
+def find_wall_hits(projectiles, boxes):
+    """(projectile, t) for every projectile whose path this frame runs into one of the static boxes,
+    t being where along the path it first does"""
+    if not projectiles or len(boxes) == 0:
+        return []
+    starts = np.array([(p.prev_x, p.prev_y) for p in projectiles], dtype=float)
+    ends = np.array([(p.x, p.y) for p in projectiles], dtype=float)
+    half_sizes = np.array([p.rect.width * 0.5 for p in projectiles], dtype=float)
+    p, _, t = swept_hits(starts, ends, half_sizes, boxes, np.zeros(len(boxes)))
+    hits = {}
+    for i, hit_t in zip(p.tolist(), t.tolist()):
+        hits.setdefault(i, hit_t)  # Ordered by time of impact, so the first is the nearest wall
+    return [(projectiles[i], hit_t) for i, hit_t in hits.items()]
+
+
+def find_projectile_hits(projectiles, targets):
+    """Swept hits between projectile and target sprites, as (projectile, target) pairs in impact order.
+
+    Targets with a mask and no collision radius (polygons) are then checked pixel by pixel
+    along the part of the path after the box was entered.
+    """
+    if not projectiles or not targets:
+        return []
+
+    starts = np.array([(p.prev_x, p.prev_y) for p in projectiles], dtype=float)
+    ends = np.array([(p.x, p.y) for p in projectiles], dtype=float)
+    half_sizes = np.array([p.rect.width * 0.5 for p in projectiles], dtype=float)
+    boxes = np.array([(t.rect.left, t.rect.top, t.rect.right, t.rect.bottom) for t in targets], dtype=float)
+    radii = np.array([t.collision_radius for t in targets], dtype=float)
+
+    p, e, t = swept_hits(starts, ends, half_sizes, boxes, radii)
+    hits = []
+    refined = False
+    for i, j, hit_t in zip(p.tolist(), e.tolist(), t.tolist()):
+        target = targets[j]
+        if getattr(target, "mask", None) is not None and not target.collision_radius:
+            hit_t = _mask_hit_time(projectiles[i], target, hit_t)
+            if hit_t is None:
+                continue
+            refined = True
+        hits.append((i, hit_t, projectiles[i], target))
+    if refined:
+        hits.sort(key=lambda hit: hit[:2])
+    return [(projectile, target) for _, _, projectile, target in hits]
@@ -0,0 +1,88 @@
+class CombatEvents:
+    """Per-frame buffer of damage events; collisions emit, resolve() applies them all at once"""
+
+    def __init__(self):
+        self.damage = {}  # target -> total damage this frame
+        self.sources = {}  # target -> {weapon: damage} for analytics
+        self.removed = []  # Enemies that despawn without a reward (e.g. touching the player)
+        self.hooks = []
+
+    def add_hook(self, hook):
+        """hook(result) is called after every resolve() that did something"""
+        self.hooks.append(hook)
+
+    def emit(self, target, amount, weapon=None):
+        """Queue damage; returns True once the queued total is enough to kill the target"""
+        total = self.damage.get(target, 0) + amount
+        self.damage[target] = total
+        by_weapon = self.sources.setdefault(target, {})
+        by_weapon[weapon] = by_weapon.get(weapon, 0) + amount
+        return target.health - total <= 0
+
+    def is_lethal(self, target):
+        """True if damage already queued this frame will kill the target"""
+        return target.health - self.damage.get(target, 0) <= 0
+
+    def remove(self, enemy):
+        self.removed.append(enemy)
+
+    def resolve(self, player, players=(), gems=None):
+        """Apply all queued damage, then deaths, then score and experience in one go.
+
+        Score and experience go to `player`; anything in `players` (co-op) only takes damage.
+        With `gems`, experience is dropped as gems where each enemy died instead.
+        """
+        if not self.damage and not self.removed:
+            return None
+
+        kills = []
+        hits = []
+        score = 0
+        experience = 0
+        damage_by_weapon = {}
+
+        for enemy in self.removed:
+            enemy.kill()
+
+        for target, amount in self.damage.items():
+            if target is player or target in players:
+                target.take_damage(amount)
+                continue
+            for weapon, weapon_damage in self.sources[target].items():
+                damage_by_weapon[weapon] = damage_by_weapon.get(weapon, 0) + weapon_damage
+            if not target.alive():
+                continue
+            hits.append((target, amount))
+            if target.take_damage(amount):
+                # Credit the kill to whichever weapon did the most damage this frame
+                by_weapon = self.sources[target]
+                kills.append((target, max(by_weapon, key=by_weapon.get)))
+                score += target.score_value
+                experience += target.experience_value
+                target.kill()
+
+        if score:
+            player.score += score
+        if experience:
+            if gems is not None:
+                gems.drop([enemy.rect.center for enemy, _ in kills], [enemy.experience_value for enemy, _ in kills])
+            else:
+                player.add_experience(experience)
+
+        result = {
+            "kills": kills,
+            "hits": hits,  # (enemy, total damage this frame)
+            "damage": damage_by_weapon,
+            "score": score,
+            "experience": experience,
+            "removed": len(self.removed),
+        }
+        self.clear()
+        for hook in self.hooks:
+            hook(result)
+        return result
+
+    def clear(self):
+        self.damage.clear()
+        self.sources.clear()
+        self.removed.clear()
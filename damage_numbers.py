@@ -0,0 +1,120 @@
+import numpy as np
+
+ALPHA_LEVELS = 8  # Fade is drawn in this many steps, one pre-rendered glyph set each
+MAX_DIGITS = 7
+
+
+class DigitAtlas:
+    """The digits 0-9 rendered once, at every fade level"""
+
+    def __init__(self, font, color=(255, 255, 255)):
+        strip = font.render("0123456789", True, color)
+        # Cut the strip at each digit's advance so kerning matches font.render of the whole number
+        edges = [font.size("0123456789"[:i])[0] for i in range(11)]
+        self.widths = np.array([edges[i + 1] - edges[i] for i in range(10)])
+        self.height = strip.get_height()
+        self.glyphs = []  # [alpha level][digit] -> surface
+        for level in range(ALPHA_LEVELS):
+            row = []
+            for digit in range(10):
+                glyph = strip.subsurface((edges[digit], 0, self.widths[digit], self.height)).copy()
+                glyph.set_alpha((level + 1) * 255 // ALPHA_LEVELS)
+                row.append(glyph)
+            self.glyphs.append(row)
+
+    def blits(self, values, xs, ys, levels):
+        """(glyph, top-left) pairs drawing each value centred on its (x, y) at its alpha level"""
+        if len(values) == 0:
+            return []
+        values = np.maximum(np.asarray(values, dtype=np.int64), 0)
+        # Digits of every number at once, most significant first; leading zeros masked off
+        powers = 10 ** np.arange(MAX_DIGITS - 1, -1, -1, dtype=np.int64)
+        digits = (values[:, None] // powers[None]) % 10
+        lengths = np.maximum(1, np.floor(np.log10(np.maximum(values, 1))).astype(np.int64) + 1)
+        used = np.arange(MAX_DIGITS)[None] >= (MAX_DIGITS - lengths)[:, None]
+
+        widths = np.where(used, self.widths[digits], 0)
+        offsets = np.cumsum(widths, axis=1) - widths  # Left edge of each digit within its number
+        lefts = np.asarray(xs)[:, None] - widths.sum(axis=1)[:, None] / 2 + offsets
+        tops = np.asarray(ys) - self.height / 2
+
+        number, column = np.nonzero(used)
+        glyphs = self.glyphs
+        return [(glyphs[level][digit], (int(left), int(top)))
+                for level, digit, left, top in zip(np.asarray(levels)[number].tolist(),
+                                                   digits[number, column].tolist(),
+                                                   lefts[number, column].tolist(),
+                                                   tops[number].tolist())]
+
+
+class DamageNumbers:
+    """Floating damage numbers in a fixed ring of slots.
+
+    Every number lives for the same `lifetime`, so the next slot in the ring
+    is always the oldest one and reusing it when full just drops the number
+    closest to fading out. Hits on a target that already got a number within
+    `window` ticks are added to that number instead of spawning another.
+    """
+
+    def __init__(self, capacity=512, lifetime=40, window=8, rise=0.8):
+        self.capacity = capacity
+        self.lifetime = lifetime
+        self.window = window
+        self.rise = rise
+        self.atlas = None  # Set once fonts are loaded; nothing is drawn before that
+        self.x = np.zeros(capacity, dtype=np.float32)
+        self.y = np.zeros(capacity, dtype=np.float32)
+        self.value = np.zeros(capacity, dtype=np.int64)
+        self.age = np.full(capacity, lifetime, dtype=np.int32)  # >= lifetime means the slot is free
+        self.target = np.zeros(capacity, dtype=np.int64)  # Spawn serial of the enemy the number belongs to
+        self._next = 0
+        self._recent = {}  # target serial -> slot, for aggregation
+
+    def clear(self):
+        self.age[:] = self.lifetime
+        self._recent.clear()
+
+    def add_hits(self, hits):
+        """Show (enemy, amount) hits at each enemy's position"""
+        for target, amount in hits:
+            key = target.serial  # Not id(): a pooled enemy is the same object in its next life
+            slot = self._recent.get(key)
+            if slot is not None and self.target[slot] == key and self.age[slot] < self.window:
+                self.value[slot] += amount
+                continue
+            slot = self._next
+            self._next = (slot + 1) % self.capacity
+            x, y = target.rect.midtop
+            self.x[slot] = x
+            self.y[slot] = y
+            self.value[slot] = amount
+            self.age[slot] = 0
+            self.target[slot] = key
+            self._recent[key] = slot
+
+    def update(self):
+        """One tick: every number rises and ages"""
+        live = self.age < self.lifetime
+        self.y[live] -= self.rise
+        self.age[live] += 1
+        if len(self._recent) > self.capacity:
+            # Forget targets whose number can no longer take more hits
+            self._recent = {key: slot for key, slot in self._recent.items() if self.age[slot] < self.window}
+
+    def live(self):
+        """Indices of numbers on screen and their alpha levels (fading over the second half of their life)"""
+        index = np.nonzero(self.age < self.lifetime)[0]
+        remaining = self.lifetime - self.age[index]
+        levels = np.minimum(ALPHA_LEVELS - 1, remaining * 2 * ALPHA_LEVELS // self.lifetime)
+        return index, levels
+
+    def blits(self):
+        if self.atlas is None:
+            return []
+        index, levels = self.live()
+        return self.atlas.blits(self.value[index], self.x[index], self.y[index], levels)
+
+    def rows(self):
+        """(value, alpha level, x, y) per live number, for the pipelined renderer"""
+        index, levels = self.live()
+        return zip(self.value[index].tolist(), levels.tolist(), self.x[index].tolist(), self.y[index].tolist())
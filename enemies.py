@@ -1,60 +1,169 @@
 import pygame
 import random
 import math
+import itertools
+import gameclock
+from flowfield import push_out
 
 # Constants for enemy types
 WINDOW_WIDTH = 800
 WINDOW_HEIGHT = 600
 
+# Per-type stats, shared by the sprite classes below and the headless simulators
+ENEMY_STATS = {
+    "default": {"health": 30, "speed": 2, "damage": 10, "score_value": 10, "experience_value": 5},
+    "basic": {"health": 30, "speed": 2, "damage": 10, "score_value": 10, "experience_value": 5},
+    "fast": {"health": 20, "speed": 4, "damage": 5, "score_value": 15, "experience_value": 8},
+    "tank": {"health": 100, "speed": 1, "damage": 20, "score_value": 30, "experience_value": 15},
+    "ranged": {"health": 40, "speed": 1.5, "damage": 15, "score_value": 20, "experience_value": 10},
+    "mini_boss": {"health": 200, "speed": 2, "damage": 5, "score_value": 100, "experience_value": 50},
+}
+
+# Enemy sprites are never modified after creation, so every enemy of a type shares one image
+_enemy_images = {}
+_enemy_masks = {}
+
+# One serial per spawn: a pooled enemy keeps its identity across lives, its serial tells them apart
+_spawn_serials = itertools.count(1)
+
+def _build_enemy_image(enemy_type):
+    if enemy_type == "basic":
+        image = pygame.Surface((30, 30))
+        image.fill((0, 255, 0))  # Green square
+    elif enemy_type == "fast":
+        image = pygame.Surface((20, 20), pygame.SRCALPHA)
+        pygame.draw.circle(image, (255, 255, 0), (10, 10), 10)  # Yellow filled circle
+    elif enemy_type == "tank":
+        image = pygame.Surface((40, 40), pygame.SRCALPHA)
+        # Draw a red triangle
+        pygame.draw.polygon(image, (255, 0, 0), [(20, 0), (0, 40), (40, 40)])
+    elif enemy_type == "ranged":
+        image = pygame.Surface((30, 30), pygame.SRCALPHA)
+        # Draw a blue diamond
+        pygame.draw.polygon(image, (0, 0, 255), [(15, 0), (30, 15), (15, 30), (0, 15)])
+    elif enemy_type == "mini_boss":
+        image = pygame.Surface((60, 60))
+        image.fill((255, 0, 0))  # Red color for mini-boss
+    else:
+        image = pygame.Surface((30, 30))
+        image.fill((255, 0, 0))  # Default red color
+    return image
+
+def get_enemy_image(enemy_type):
+    """Return the shared image for an enemy type, building it on first use"""
+    image = _enemy_images.get(enemy_type)
+    if image is None:
+        image = _build_enemy_image(enemy_type)
+        _enemy_images[enemy_type] = image
+    return image
+
+def get_enemy_mask(enemy_type):
+    """Return the shared collision mask for an enemy type, traced from its image on first use"""
+    mask = _enemy_masks.get(enemy_type)
+    if mask is None:
+        mask = pygame.mask.from_surface(get_enemy_image(enemy_type))
+        _enemy_masks[enemy_type] = mask
+    return mask
+
+def load_enemy_images():
+    """Build every enemy image and mask up front (called by the asset loader)"""
+    for enemy_type in ("default", "basic", "fast", "tank", "ranged", "mini_boss"):
+        get_enemy_mask(enemy_type)
+
 class Enemy(pygame.sprite.Sprite):
+    enemy_type = "default"
+    collision_radius = 0  # Round enemies collide as a circle of this radius; 0 uses the rect
+    flow_field = None  # Shared FlowField around the arena's obstacles; None in an open arena
+
     def __init__(self):
         super().__init__()
-        self.health = 30
-        self.max_health = 30
-        self.speed = 2
-        self.damage = 10
-        self.score_value = 10
-        self.experience_value = 5
-        self.attack_cooldown = 0
+        self.pool = None  # EnemyPool that gets this enemy back when it dies
         self.attack_delay = 2000  # 2 seconds between attacks
-        self.is_attacking = False
-        
-        # Create a default image and rect
-        self.image = pygame.Surface((30, 30))
-        self.image.fill((255, 0, 0))  # Default red color
+        self.image = get_enemy_image(self.enemy_type)
+        self.mask = get_enemy_mask(self.enemy_type)  # Exact shape for collisions, after the rect test
         self.rect = self.image.get_rect()
-        
-        # Spawn at a random position on the edge of the screen
+        self.respawn()
+
+    def respawn(self):
+        """Full health, no AI history, at a random position on the edge of the screen"""
+        self.serial = next(_spawn_serials)
+        self.set_stats(self.enemy_type)
+        self.attack_cooldown = 0
+        self.is_attacking = False
+        self.velocity = (0, 0)  # Movement per tick, kept between steering updates
+        self.against_obstacle = False  # Pushed back out of a wall or pillar on the last move
+        self.target_distance = 0
+        self.lod_interval = 1  # Ticks between steering updates, set by the AI scheduler
+        self.lod_tick = None  # Tick of the last steering update
+
+        # Spawn points are picked for a 30x30 enemy; bigger and smaller ones share its centre
         side = random.randint(0, 3)
         if side == 0:  # Top
-            self.rect.x = random.randint(0, WINDOW_WIDTH)
-            self.rect.y = -20
+            x, y = random.randint(0, WINDOW_WIDTH), -20
         elif side == 1:  # Right
-            self.rect.x = WINDOW_WIDTH + 20
-            self.rect.y = random.randint(0, WINDOW_HEIGHT)
+            x, y = WINDOW_WIDTH + 20, random.randint(0, WINDOW_HEIGHT)
         elif side == 2:  # Bottom
-            self.rect.x = random.randint(0, WINDOW_WIDTH)
-            self.rect.y = WINDOW_HEIGHT + 20
+            x, y = random.randint(0, WINDOW_WIDTH), WINDOW_HEIGHT + 20
         else:  # Left
-            self.rect.x = -20
-            self.rect.y = random.randint(0, WINDOW_HEIGHT)
+            x, y = -20, random.randint(0, WINDOW_HEIGHT)
+        self.rect.center = (x + 15, y + 15)
+        self.last_center = self.rect.center  # Nothing to interpolate from on the first frame
+
+    def kill(self):
+        was_alive = self.alive()
+        super().kill()
+        if was_alive and self.pool is not None:
+            self.pool.release(self)
     
     def update(self, player):
+        self.steer(player)
+        self.coast()
+
+    def steer(self, player):
+        """Aim the velocity at the player and check the attack cooldown"""
         # Move towards player
         dx = player.rect.centerx - self.rect.centerx
         dy = player.rect.centery - self.rect.centery
         dist = math.sqrt(dx * dx + dy * dy)
-        
+        self.target_distance = dist
+
+        flow = self.flow_field
+        waypoint = None
+        if flow is not None and (self.against_obstacle or not flow.visible_at(*self.rect.center)):
+            waypoint = flow.waypoint(*self.rect.center)
+        if waypoint is not None:
+            # Something in the way: head for the next cell on the shared path around it
+            dx = waypoint[0] - self.rect.centerx
+            dy = waypoint[1] - self.rect.centery
+            dist = math.sqrt(dx * dx + dy * dy)
+
         if dist != 0:
-            self.rect.x += (dx / dist) * self.speed
-            self.rect.y += (dy / dist) * self.speed
+            self.velocity = ((dx / dist) * self.speed, (dy / dist) * self.speed)
+        else:
+            self.velocity = (0, 0)
         
         # Check for attack cooldown
-        current_time = pygame.time.get_ticks()
+        current_time = gameclock.ticks()
         if current_time - self.attack_cooldown >= self.attack_delay:
             self.is_attacking = True
             self.attack_cooldown = current_time
+
+    def coast(self):
+        """Move one tick along the current velocity"""
+        self.rect.x += self.velocity[0]
+        self.rect.y += self.velocity[1]
+        if self.flow_field is not None:
+            self.against_obstacle = push_out(self.rect, self.flow_field.obstacles)
     
+    def set_stats(self, enemy_type):
+        stats = ENEMY_STATS[enemy_type]
+        self.health = stats["health"]
+        self.max_health = stats["health"]
+        self.speed = stats["speed"]
+        self.damage = stats["damage"]
+        self.score_value = stats["score_value"]
+        self.experience_value = stats["experience_value"]
+
     def take_damage(self, amount):
         self.health -= amount
         return self.health <= 0
@@ -64,102 +173,65 @@ class Enemy(pygame.sprite.Sprite):
         pygame.draw.rect(surface, (255, 0, 0), self.rect)
 
 class BasicEnemy(Enemy):
-    def __init__(self):
-        super().__init__()
-        # Override the default image with a green square
-        self.image = pygame.Surface((30, 30))
-        self.image.fill((0, 255, 0))  # Green square
-        self.rect = self.image.get_rect(center=self.rect.center)  # Keep the same position
-        self.health = 30
-        self.max_health = 30
-        self.speed = 2
-        self.damage = 10
-        self.score_value = 10
-        self.experience_value = 5
+    enemy_type = "basic"  # Green square
 
 class FastEnemy(Enemy):
-    def __init__(self):
-        super().__init__()
-        # Override the default image with a yellow circle
-        self.image = pygame.Surface((20, 20), pygame.SRCALPHA)
-        pygame.draw.circle(self.image, (255, 255, 0), (10, 10), 10)  # Yellow filled circle
-        self.rect = self.image.get_rect(center=self.rect.center)  # Keep the same position
-        self.health = 20
-        self.max_health = 20
-        self.speed = 4
-        self.damage = 5
-        self.score_value = 15
-        self.experience_value = 8
+    enemy_type = "fast"  # Yellow circle
+    collision_radius = 10
 
 class TankEnemy(Enemy):
-    def __init__(self):
-        super().__init__()
-        # Override the default image with a red triangle
-        self.image = pygame.Surface((40, 40), pygame.SRCALPHA)
-        # Draw a red triangle
-        pygame.draw.polygon(self.image, (255, 0, 0), [(20, 0), (0, 40), (40, 40)])
-        self.rect = self.image.get_rect(center=self.rect.center)  # Keep the same position
-        self.health = 100
-        self.max_health = 100
-        self.speed = 1
-        self.damage = 20
-        self.score_value = 30
-        self.experience_value = 15
+    enemy_type = "tank"  # Red triangle
 
 class RangedEnemy(Enemy):
+    enemy_type = "ranged"  # Blue diamond
+    attack_range = 200  # Attack from this distance
+    keep_distance = 50  # Happy anywhere within this of attack_range
+
     def __init__(self):
         super().__init__()
-        # Override the default image with a blue diamond
-        self.image = pygame.Surface((30, 30), pygame.SRCALPHA)
-        # Draw a blue diamond
-        pygame.draw.polygon(self.image, (0, 0, 255), [(15, 0), (30, 15), (15, 30), (0, 15)])
-        self.rect = self.image.get_rect(center=self.rect.center)  # Keep the same position
-        self.health = 40
-        self.max_health = 40
-        self.speed = 1.5
-        self.damage = 15
-        self.score_value = 20
-        self.experience_value = 10
-        self.attack_range = 200  # Attack from this distance
         self.attack_delay = 3000  # 3 seconds between attacks
-    
-    def update(self, player):
+
+    @classmethod
+    def distance_band(cls):
+        """(nearest, furthest) distance the enemy stays at, for the flow field"""
+        return (cls.attack_range - cls.keep_distance, cls.attack_range + cls.keep_distance)
+
+    def steer(self, player):
         # Move towards player but keep distance
         dx = player.rect.centerx - self.rect.centerx
         dy = player.rect.centery - self.rect.centery
         dist = math.sqrt(dx * dx + dy * dy)
-        
-        if dist != 0:
+        self.target_distance = dist
+        self.velocity = (0, 0)
+        in_sight = self.flow_field is None or self.flow_field.visible_at(*self.rect.center)
+
+        if not in_sight or (self.against_obstacle and dist > self.attack_range + self.keep_distance):
+            # No line of fire from here, or stuck on a corner: make for the nearest spot in range with one
+            waypoint = self.flow_field.band_waypoint(*self.rect.center)
+            if waypoint is not None:
+                wx = waypoint[0] - self.rect.centerx
+                wy = waypoint[1] - self.rect.centery
+                length = math.sqrt(wx * wx + wy * wy)
+                if length != 0:
+                    self.velocity = ((wx / length) * self.speed, (wy / length) * self.speed)
+        elif dist != 0:
             # If too far, move closer
-            if dist > self.attack_range + 50:
-                self.rect.x += (dx / dist) * self.speed
-                self.rect.y += (dy / dist) * self.speed
+            if dist > self.attack_range + self.keep_distance:
+                self.velocity = ((dx / dist) * self.speed, (dy / dist) * self.speed)
             # If too close, move away
-            elif dist < self.attack_range - 50:
-                self.rect.x -= (dx / dist) * self.speed
-                self.rect.y -= (dy / dist) * self.speed
+            elif dist < self.attack_range - self.keep_distance:
+                self.velocity = (-(dx / dist) * self.speed, -(dy / dist) * self.speed)
         
         # Check for attack cooldown
-        current_time = pygame.time.get_ticks()
+        current_time = gameclock.ticks()
         if current_time - self.attack_cooldown >= self.attack_delay:
             # Only attack if within range
-            if dist <= self.attack_range:
+            if dist <= self.attack_range and in_sight:
                 self.is_attacking = True
                 self.attack_cooldown = current_time
 
 class MiniBoss(Enemy):
-    def __init__(self):
-        super().__init__()
-        # Override the default image with a larger red square
-        self.image = pygame.Surface((60, 60))
-        self.image.fill((255, 0, 0))  # Red color for mini-boss
-        self.rect = self.image.get_rect(center=self.rect.center)  # Keep the same position
-        self.health = 200
-        self.max_health = 200
-        self.speed = 2
-        self.damage = 5
-        self.score_value = 100
-        self.experience_value = 50
+    enemy_type = "mini_boss"  # Larger red square
 
 # Create enemy factory
 def create_enemy(enemy_type):
@@ -0,0 +1,281 @@
+import math
+from collections import OrderedDict, deque
+
+import numpy as np
+import pygame
+
+from collision import swept_hits
+
+# Obstacle layouts for the 1600x900 arena as (x, y, width, height). The middle stays
+# clear for the player's start and the edges clear for spawning.
+ARENAS = {
+    "open": [],
+    "pillars": [
+        (360, 200, 60, 60), (1180, 200, 60, 60),
+        (360, 640, 60, 60), (1180, 640, 60, 60),
+        (770, 160, 60, 60), (770, 680, 60, 60),
+    ],
+    "walls": [
+        (480, 160, 40, 260), (1080, 480, 40, 260),
+        (640, 700, 320, 40), (640, 160, 320, 40),
+    ],
+}
+DEFAULT_ARENA = "open"
+OBSTACLE_COLOR = (70, 70, 90)
+OBSTACLE_EDGE_COLOR = (120, 120, 150)
+
+# 4 straight steps, then the diagonals (only taken when both straight steps next to them are open)
+STEPS = [(1, 0), (-1, 0), (0, 1), (0, -1), (1, 1), (1, -1), (-1, 1), (-1, -1)]
+
+_obstacle_images = {}
+
+
+def get_obstacle_image(size):
+    """Return the shared image for an obstacle of this (width, height)"""
+    image = _obstacle_images.get(size)
+    if image is None:
+        image = pygame.Surface(size)
+        image.fill(OBSTACLE_COLOR)
+        pygame.draw.rect(image, OBSTACLE_EDGE_COLOR, image.get_rect(), 2)
+        _obstacle_images[size] = image
+    return image
+
+
+def obstacle_blits(obstacles):
+    """(image, top-left) pairs drawing every obstacle"""
+    return [(get_obstacle_image(rect.size), rect.topleft) for rect in obstacles]
+
+
+def push_out(rect, obstacles):
+    """Move rect out of any obstacle it overlaps, the shortest way out; True if it moved"""
+    moved = False
+    for index in rect.collidelistall(obstacles):
+        obstacle = obstacles[index]
+        if not rect.colliderect(obstacle):
+            continue  # Already pushed clear of this one by an earlier one
+        left = rect.right - obstacle.left
+        right = obstacle.right - rect.left
+        up = rect.bottom - obstacle.top
+        down = obstacle.bottom - rect.top
+        shortest = min(left, right, up, down)
+        if shortest == left:
+            rect.right = obstacle.left
+        elif shortest == right:
+            rect.left = obstacle.right
+        elif shortest == up:
+            rect.bottom = obstacle.top
+        else:
+            rect.top = obstacle.bottom
+        moved = True
+    return moved
+
+
+class Paths:
+    """One search's results: per cell, whether a player is in sight and the next cell centre to head for"""
+
+    def __init__(self, source_cells, visible, waypoints, ends):
+        self.source_cells = source_cells
+        self.visible = visible
+        self.waypoints = waypoints
+        self.ends = ends  # (cells, 2) centre of the player cell each cell's path leads to
+        self.band_waypoints = None  # Searched the first time a ranged enemy asks
+
+
+class FlowField:
+    """Paths to the players around obstacles, shared by every enemy.
+
+    The arena is a grid of `cell`-sized cells. A breadth-first search out
+    from the players' cells gives every cell the next cell to head for, so
+    steering is one list lookup per enemy however big the horde is. The
+    search only runs when a player moves into a different cell, and the last
+    `cache_size` searches are kept since players keep crossing the same cells.
+
+    Cells with a clear line to their player's cell are marked visible;
+    enemies in them can steer straight at the player as if there were no
+    obstacles. A second search, seeded from the visible cells `band` (min,
+    max) distance from a player, leads ranged enemies to the nearest spot they
+    can shoot from.
+    """
+
+    def __init__(self, bounds, obstacles, cell=40, clearance=15, band=None, cache_size=128):
+        width, height = bounds
+        self.cell = cell
+        self.columns = columns = math.ceil(width / cell)
+        self.rows = rows = math.ceil(height / cell)
+        self.obstacles = obstacles
+        self.band = band
+        self.clearance = clearance
+        self.cache_size = cache_size
+        self.boxes = np.array([(r.left, r.top, r.right, r.bottom) for r in obstacles], dtype=float).reshape(-1, 4)
+
+        # Cells an enemy centre can't be in: the obstacles grown by `clearance` (half an enemy)
+        blocked = np.zeros((rows, columns), dtype=bool)
+        for rect in obstacles:
+            grown = rect.inflate(2 * clearance, 2 * clearance)
+            blocked[max(0, grown.top // cell):min(rows, math.ceil(grown.bottom / cell)),
+                    max(0, grown.left // cell):min(columns, math.ceil(grown.right / cell))] = True
+        self.blocked = blocked.ravel().tolist()
+
+        count = rows * columns
+        self.centres = np.stack(((np.arange(count) % columns + 0.5) * cell,
+                                 (np.arange(count) // columns + 0.5) * cell), axis=1)
+        self._centres = [tuple(c) for c in self.centres.tolist()]
+
+        # Open neighbours a path can step to from each cell
+        self.links = []
+        around = []
+        for index in range(count):
+            row, column = divmod(index, columns)
+            links = []
+            around.append(([], []))  # Straight and diagonal neighbours
+            for step_x, step_y in STEPS:
+                r, c = row + step_y, column + step_x
+                if not (0 <= r < rows and 0 <= c < columns):
+                    continue
+                neighbour = r * columns + c
+                around[index][bool(step_x and step_y)].append(neighbour)
+                if self.blocked[neighbour]:
+                    continue
+                if step_x and step_y and (blocked[row, c] or blocked[r, column]):
+                    continue  # Don't cut the corner of an obstacle
+                links.append(neighbour)
+            self.links.append(links)
+
+        # Blocked cells next to open ones leave by whichever of those is nearest the players, a straight
+        # step if there is one (a diagonal can clip the obstacle's corner); cells deeper in (an enemy
+        # shoved right into an obstacle) just head out to the nearest open cell
+        self.edges = []
+        for index in range(count):
+            if self.blocked[index]:
+                straight = [n for n in around[index][0] if not self.blocked[n]]
+                diagonal = [n for n in around[index][1] if not self.blocked[n]]
+                self.edges.append((index, straight, diagonal))
+        self.exits = [None] * count
+        queue = deque(index for index in range(count) if not self.blocked[index])
+        reached = [not cell_blocked for cell_blocked in self.blocked]
+        while queue:
+            index = queue.popleft()
+            for neighbour in around[index][0] + around[index][1]:
+                if not reached[neighbour]:
+                    reached[neighbour] = True
+                    self.exits[neighbour] = self._centres[index]
+                    queue.append(neighbour)
+
+        self.source_cells = None
+        self.searches = 0
+        self._cache = OrderedDict()  # source cells -> Paths
+        self.paths = None
+        # Per cell, refreshed by update(): whether a player is in sight and the next cell centre to head for
+        self.visible = [True] * count
+        self.waypoints = [None] * count
+
+    def cell_at(self, x, y):
+        """Grid cell of a point; points off the arena use the nearest edge cell"""
+        column = min(max(int(x // self.cell), 0), self.columns - 1)
+        row = min(max(int(y // self.cell), 0), self.rows - 1)
+        return row * self.columns + column
+
+    def visible_at(self, x, y):
+        return self.visible[self.cell_at(x, y)]
+
+    def waypoint(self, x, y):
+        """Where to head from (x, y) to reach a player, or None in a player's own cell"""
+        return self.waypoints[self.cell_at(x, y)]
+
+    def band_waypoint(self, x, y):
+        """Where to head from (x, y) for a clear shot from `band` range, or None if there is one here"""
+        paths = self.paths
+        if paths is None or self.band is None:
+            return self.waypoint(x, y)
+        if paths.band_waypoints is None:
+            paths.band_waypoints = self._search_band(paths)
+        return paths.band_waypoints[self.cell_at(x, y)]
+
+    def update(self, targets):
+        """Follow the players at these (x, y) positions; True if that needed a new set of paths"""
+        source_cells = tuple(self.cell_at(x, y) for x, y in targets)
+        if source_cells == self.source_cells or not source_cells:
+            return False
+        self.source_cells = source_cells
+        paths = self._cache.get(source_cells)
+        if paths is None:
+            paths = self._search_players(source_cells)
+            self._cache[source_cells] = paths
+            if len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        else:
+            self._cache.move_to_end(source_cells)
+        self.paths = paths
+        self.visible = paths.visible
+        self.waypoints = paths.waypoints
+        return True
+
+    def _search_players(self, source_cells):
+        self.searches += 1
+        parent, origin, depth = self._search([(cell, i) for i, cell in enumerate(source_cells)])
+        # Line of sight from every cell to the centre of its player's cell, clear for a whole enemy
+        ends = self.centres[list(source_cells)][origin]
+        visible = np.ones(len(parent), dtype=bool)
+        cells, _, _ = swept_hits(self.centres, ends, np.full(len(parent), self.clearance), self.boxes,
+                                 np.zeros(len(self.boxes)))
+        visible[cells] = False
+
+        centres = self._centres
+        exits = self.exits
+        waypoints = [exits[i] if cell is None else centres[cell] for i, cell in enumerate(parent)]
+        self._leave_blocked(waypoints, parent, depth)
+        for cell in source_cells:
+            waypoints[cell] = None
+        return Paths(source_cells, visible.tolist(), waypoints, ends)
+
+    def _search_band(self, paths):
+        near, far = self.band
+        offsets = self.centres - paths.ends
+        distance = np.sqrt((offsets * offsets).sum(axis=1))
+        in_band = np.array(paths.visible) & (distance >= near) & (distance <= far)
+        seeds = [(cell, 0) for cell in np.nonzero(in_band)[0].tolist() if not self.blocked[cell]]
+        if not seeds:
+            return paths.waypoints
+        parent, _, depth = self._search(seeds)
+        centres = self._centres
+        exits = self.exits
+        waypoints = [exits[i] if cell is None else None if cell == i else centres[cell] for i, cell in enumerate(parent)]
+        self._leave_blocked(waypoints, parent, depth)
+        return waypoints
+
+    def _leave_blocked(self, waypoints, parent, depth):
+        centres = self._centres
+        for index, straight, diagonal in self.edges:
+            if parent[index] is not None:
+                continue  # A seed: a player is standing here
+            reached = [n for n in straight if parent[n] is not None] or [n for n in diagonal if parent[n] is not None]
+            if reached:
+                waypoints[index] = centres[min(reached, key=depth.__getitem__)]
+
+    def _search(self, seeds):
+        """Breadth-first search over open cells from (cell, source) seeds.
+
+        Returns each cell's next cell, source and steps from it; cells the
+        search can't reach (blocked, or walled in) get None.
+        """
+        count = len(self.links)
+        parent = [None] * count
+        origin = [0] * count
+        depth = [0] * count
+        queue = deque()
+        for cell, source in seeds:
+            if parent[cell] is None:
+                parent[cell] = cell
+                origin[cell] = source
+                queue.append(cell)
+
+        links = self.links
+        while queue:
+            cell = queue.popleft()
+            for neighbour in links[cell]:
+                if parent[neighbour] is None:
+                    parent[neighbour] = cell
+                    origin[neighbour] = origin[cell]
+                    depth[neighbour] = depth[cell] + 1
+                    queue.append(neighbour)
+        return parent, origin, depth
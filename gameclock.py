@@ -0,0 +1,62 @@
+import time
+
+import pygame
+
+
+class RealClock:
+    """Wall-clock time, what the game normally runs on"""
+
+    def now(self):
+        return time.time()
+
+    def ticks(self):
+        return pygame.time.get_ticks()
+
+    def delay(self, ms):
+        pygame.time.delay(ms)
+
+
+class VirtualClock:
+    """Time that only moves when advanced: one step per simulation tick, however long frames take"""
+
+    def __init__(self, start=1000.0, wait=False):
+        # Start well past zero so "last fired at 0" cooldowns are already over
+        self.time = start
+        self.wait = wait  # delay() also waits in real time, for the interactive game
+
+    def now(self):
+        return self.time
+
+    def ticks(self):
+        return int(self.time * 1000)
+
+    def advance(self, seconds):
+        self.time += seconds
+
+    def delay(self, ms):
+        if self.wait:
+            pygame.time.delay(ms)
+        self.time += ms / 1000
+
+
+_clock = RealClock()
+
+
+def use_clock(clock):
+    """Switch every game time lookup to another clock"""
+    global _clock
+    _clock = clock
+
+
+def now():
+    """Game time in seconds"""
+    return _clock.now()
+
+
+def ticks():
+    """Game time in milliseconds, like pygame.time.get_ticks()"""
+    return _clock.ticks()
+
+
+def delay(ms):
+    return _clock.delay(ms)
@@ -0,0 +1,117 @@
+import gc
+import time
+from collections import deque
+
+# default:  Python's own collector, only instrumented
+# tuned:    generation 2 runs ten times less often while playing
+# suspend:  no automatic generation 2 collections while playing
+# off:      no automatic collections at all while playing; young objects are
+#           collected only on frames with time to spare
+GC_MODES = ["default", "tuned", "suspend", "off"]
+
+# Generation 2 threshold that in practice never fires within a 15 minute run
+NEVER = 1000000000
+
+
+class GCManager:
+    """Keeps cyclic GC pauses out of gameplay frames and records every pause"""
+
+    def __init__(self, mode="tuned", history=1000):
+        self.mode = mode
+        self.default_thresholds = gc.get_threshold()
+        self.playing = False
+        self.frozen = False
+        self.frame = 0
+        self.frame_pause_ms = 0.0  # GC time spent in the current frame
+        self.pauses = deque(maxlen=history)  # (frame, generation, ms, collected, reason)
+        self.totals = {}  # generation -> [count, total_ms, max_ms]
+        self.hooks = []
+        self._started = None
+        self._reason = "auto"
+        gc.callbacks.append(self._callback)
+
+    def add_hook(self, hook):
+        """hook(frame, generation, ms, collected, reason) is called after every collection"""
+        self.hooks.append(hook)
+
+    def freeze(self):
+        """Collect once and move everything alive now (assets, modules, caches) out of GC tracking"""
+        if self.frozen:
+            return
+        self.frozen = True
+        self.collect("freeze")
+        gc.freeze()
+
+    def begin_frame(self, playing):
+        """Called at the start of every frame with whether gameplay is running"""
+        self.frame += 1
+        self.frame_pause_ms = 0.0
+        if playing == self.playing:
+            return
+        self.playing = playing
+        if playing:
+            self._enter_playing()
+        else:
+            self._leave_playing()
+
+    def end_frame(self, frame_ms, budget_ms):
+        """In "off" mode, clear young garbage on frames that finished well inside their budget"""
+        if self.mode != "off" or not self.playing:
+            return
+        if gc.get_count()[0] >= self.default_thresholds[0] and frame_ms < budget_ms * 0.5:
+            self.collect("idle", 0)
+
+    def collect(self, reason, generation=2):
+        self._reason = reason
+        try:
+            gc.collect(generation)
+        finally:
+            self._reason = "auto"
+
+    def close(self):
+        gc.set_threshold(*self.default_thresholds)
+        gc.enable()
+        if self._callback in gc.callbacks:
+            gc.callbacks.remove(self._callback)
+
+    def _enter_playing(self):
+        threshold0, threshold1, threshold2 = self.default_thresholds
+        if self.mode == "tuned":
+            gc.set_threshold(threshold0, threshold1, threshold2 * 10)
+        elif self.mode == "suspend":
+            gc.set_threshold(threshold0, threshold1, NEVER)
+        elif self.mode == "off":
+            gc.disable()
+
+    def _leave_playing(self):
+        if self.mode == "default":
+            return
+        gc.set_threshold(*self.default_thresholds)
+        gc.enable()
+        # Upgrade screen, pause, menu or end of run: nobody notices a full collection here
+        self.collect("safe_point")
+
+    def _callback(self, phase, info):
+        if phase == "start":
+            self._started = time.perf_counter()
+            return
+        if self._started is None:
+            return
+        ms = (time.perf_counter() - self._started) * 1000
+        self._started = None
+        generation = info["generation"]
+        self.frame_pause_ms += ms
+        self.pauses.append((self.frame, generation, ms, info["collected"], self._reason))
+        total = self.totals.setdefault(generation, [0, 0.0, 0.0])
+        total[0] += 1
+        total[1] += ms
+        total[2] = max(total[2], ms)
+        for hook in self.hooks:
+            hook(self.frame, generation, ms, info["collected"], self._reason)
+
+    def stats(self):
+        """Pause counts and times per generation"""
+        return {
+            f"gen{generation}": {"count": count, "total_ms": round(total_ms, 3), "max_ms": round(max_ms, 3)}
+            for generation, (count, total_ms, max_ms) in sorted(self.totals.items())
+        }
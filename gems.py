@@ -0,0 +1,209 @@
+import numpy as np
+import pygame
+
+# (minimum value, size, color) per gem tier; merged gems move up the tiers
+GEM_TIERS = [
+    (1, 8, (80, 160, 255)),
+    (10, 10, (80, 255, 120)),
+    (50, 12, (255, 80, 80)),
+    (250, 16, (220, 100, 255)),
+]
+GEM_TIER_VALUES = np.array([value for value, _, _ in GEM_TIERS])
+
+MAGNET_RADIUS = 100  # Player's base pull range
+PICKUP_RADIUS = 16
+
+_gem_images = {}
+
+
+def get_gem_image(tier):
+    """Return the shared diamond image for a gem tier"""
+    image = _gem_images.get(tier)
+    if image is None:
+        _, size, color = GEM_TIERS[tier]
+        half = size // 2
+        image = pygame.Surface((size, size), pygame.SRCALPHA)
+        pygame.draw.polygon(image, color, [(half, 0), (size - 1, half), (half, size - 1), (0, half)])
+        _gem_images[tier] = image
+    return image
+
+
+class GemField:
+    """Every experience gem on the ground, in flat arrays.
+
+    Live gems are kept packed at the front of the arrays. Every
+    `merge_interval` ticks, or as soon as there are more than `merge_above`,
+    gems resting in the same grid cell merge into one gem worth their total,
+    so even huge kill rates leave at most about one gem per cell. Gems inside
+    a collector's magnet radius are pulled in, speeding up as they go, and
+    collected on contact.
+    """
+
+    def __init__(self, bounds, capacity=4096, cell=40, merge_interval=30, merge_above=1024,
+                 pickup_radius=PICKUP_RADIUS, pull_speed=3.0, pull_accel=0.5):
+        self.bounds = bounds  # (width, height) gems are kept inside
+        self.capacity = capacity
+        self.cell = cell
+        self.merge_interval = merge_interval
+        self.merge_above = merge_above
+        self.pickup_radius = pickup_radius
+        self.pull_speed = pull_speed
+        self.pull_accel = pull_accel
+        self.position = np.zeros((capacity, 2), dtype=np.float32)
+        self.value = np.zeros(capacity, dtype=np.int64)
+        self.speed = np.zeros(capacity, dtype=np.float32)  # 0 while resting, > 0 once pulled
+        self.serial = np.zeros(capacity, dtype=np.int64)  # Stays with a gem while it lies there, for co-op ids
+        self.next_serial = 1
+        self.count = 0
+        self.ticks = 0
+        self.collected = 0  # Total value collected this run
+
+    def clear(self):
+        self.count = 0
+        self.ticks = 0
+        self.collected = 0
+
+    def drop(self, positions, values):
+        """Add one gem per (x, y) position with the matching value"""
+        if not len(values):
+            return
+        positions = np.asarray(positions, dtype=np.float32).reshape(-1, 2)
+        values = np.asarray(values, dtype=np.int64)
+        keep = values > 0
+        positions, values = positions[keep], values[keep]
+        width, height = self.bounds
+        # Enemies can die just off screen; their gems land where the player can reach
+        positions = np.clip(positions, (0, 0), (width - 1, height - 1))
+
+        if self.count + len(values) > self.capacity:
+            self.merge()
+        room = self.capacity - self.count
+        overflow_positions, overflow_values = positions[room:], values[room:]
+        positions, values = positions[:room], values[:room]
+
+        start, end = self.count, self.count + len(values)
+        self.position[start:end] = positions
+        self.value[start:end] = values
+        self.speed[start:end] = 0
+        self.serial[start:end] = np.arange(self.next_serial, self.next_serial + len(values))
+        self.next_serial += len(values)
+        self.count = end
+
+        if len(overflow_values):
+            # Still full after merging: hand the overflow to the nearest gems (the ones just placed
+            # included, so this works on an empty field too) instead of dropping XP
+            offsets = self.position[None, :self.count] - overflow_positions[:, None]
+            nearest = (offsets * offsets).sum(axis=2).argmin(axis=1)
+            np.add.at(self.value, nearest, overflow_values)
+
+    def update(self, collectors, magnet_radii):
+        """Pull and collect gems for this tick; returns the value collected.
+
+        collectors:   (x, y) centres of everyone who can pick gems up
+        magnet_radii: matching pull ranges
+        """
+        self.ticks += 1
+        if self.ticks % self.merge_interval == 0 or self.count > self.merge_above:
+            self.merge()
+        count = self.count
+        if count == 0 or not collectors:
+            return 0
+
+        centres = np.asarray(collectors, dtype=np.float32).reshape(-1, 2)
+        radii = np.asarray(magnet_radii, dtype=np.float32)
+        position = self.position[:count]
+        speed = self.speed[:count]
+
+        offsets = centres[None] - position[:, None]  # (gems, collectors, 2)
+        distance_sq = (offsets * offsets).sum(axis=2)
+        nearest = distance_sq.argmin(axis=1)
+        rows = np.arange(count)
+        distance = np.sqrt(distance_sq[rows, nearest])
+
+        # Once a gem is pulled it keeps coming, even if the player walks away
+        speed[(speed == 0) & (distance <= radii[nearest])] = self.pull_speed
+        pulled = speed > 0
+        if pulled.any():
+            step = np.minimum(speed[pulled], distance[pulled])
+            direction = offsets[rows[pulled], nearest[pulled]] / np.maximum(distance[pulled], 1e-6)[:, None]
+            position[pulled] += direction * step[:, None]
+            distance[pulled] -= step
+            speed[pulled] += self.pull_accel
+
+        collected = distance <= self.pickup_radius
+        if not collected.any():
+            return 0
+        total = int(self.value[:count][collected].sum())
+        self._keep(~collected)
+        self.collected += total
+        return total
+
+    def merge(self):
+        """Merge resting gems that share a grid cell into one gem at their value-weighted centre"""
+        count = self.count
+        if count < 2:
+            return
+        position = self.position[:count]
+        value = self.value[:count]
+        resting = self.speed[:count] == 0
+        if resting.sum() < 2:
+            return
+
+        cells = (position[resting] // self.cell).astype(np.int64)
+        keys = cells[:, 0] * 100003 + cells[:, 1]
+        unique, first, groups = np.unique(keys, return_index=True, return_inverse=True)
+        if len(unique) == len(keys):
+            return  # Nothing shares a cell
+
+        resting_value = value[resting]
+        totals = np.bincount(groups, weights=resting_value)
+        centre_x = np.bincount(groups, weights=position[resting, 0] * resting_value) / totals
+        centre_y = np.bincount(groups, weights=position[resting, 1] * resting_value) / totals
+
+        moving = ~resting
+        moving_position = position[moving].copy()
+        moving_value = value[moving].copy()
+        moving_speed = self.speed[:count][moving].copy()
+        moving_serial = self.serial[:count][moving].copy()
+        # A merged gem carries on as the first gem of its cell
+        merged_serial = self.serial[:count][resting][first]
+
+        merged = len(unique)
+        self.position[:merged, 0] = centre_x
+        self.position[:merged, 1] = centre_y
+        self.value[:merged] = totals.astype(np.int64)
+        self.speed[:merged] = 0
+        self.serial[:merged] = merged_serial
+        end = merged + len(moving_value)
+        self.position[merged:end] = moving_position
+        self.value[merged:end] = moving_value
+        self.speed[merged:end] = moving_speed
+        self.serial[merged:end] = moving_serial
+        self.count = end
+
+    def blits(self):
+        """(image, top-left) pairs for every gem, for one Surface.blits() call"""
+        count = self.count
+        if count == 0:
+            return []
+        tiers = np.searchsorted(GEM_TIER_VALUES, self.value[:count], side="right") - 1
+        images = [get_gem_image(tier) for tier in range(len(GEM_TIERS))]
+        half_sizes = np.array([size // 2 for _, size, _ in GEM_TIERS])[tiers]
+        corners = (self.position[:count] - half_sizes[:, None]).astype(np.int32)
+        return [(images[tier], (x, y)) for tier, (x, y) in zip(tiers.tolist(), corners.tolist())]
+
+    def rows(self):
+        """(serial, tier, x, y) per gem, for the pipelined renderer and co-op snapshots"""
+        count = self.count
+        tiers = np.searchsorted(GEM_TIER_VALUES, self.value[:count], side="right") - 1
+        return zip(self.serial[:count].tolist(), tiers.tolist(), self.position[:count, 0].tolist(),
+                   self.position[:count, 1].tolist())
+
+    def _keep(self, mask):
+        kept = int(mask.sum())
+        count = self.count
+        self.position[:kept] = self.position[:count][mask]
+        self.value[:kept] = self.value[:count][mask]
+        self.speed[:kept] = self.speed[:count][mask]
+        self.serial[:kept] = self.serial[:count][mask]
+        self.count = kept
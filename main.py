@@ -1,18 +1,93 @@
+from startup import StartupTimer, print_phase
 import pygame
 import sys
 import random
 import math
 import time
+import argparse
+import threading
+from collections import namedtuple
+import gameclock
 from weapons import create_weapon, Pistol, Shotgun, MachineGun, Bazooka
-from enemies import create_enemy, Enemy, BasicEnemy, FastEnemy, TankEnemy, RangedEnemy, MiniBoss
-
-# Initialize Pygame
-pygame.init()
+from enemies import get_enemy_image, load_enemy_images, Enemy, BasicEnemy, FastEnemy, TankEnemy, RangedEnemy, MiniBoss
+from render import ScaledRenderer
+from quality import QualityGovernor, QUALITY_NAMES
+from assets import AssetLoader
+from stats import StatBlock, Stat
+from upgrades import UpgradeCatalog
+from combat import CombatEvents
+from telemetry import TelemetryWriter, NullTelemetry
+from gcmanager import GCManager, GC_MODES
+from ailod import AIScheduler
+from runstore import RunStore
+from metrics import GameMetrics, MetricsServer
+from profiler import SamplingProfiler
+from pipeline import RenderPipeline, SnapshotBuffers, SnapshotImages, KIND_PARTICLE, KIND_DAMAGE
+from gems import GemField, get_gem_image, MAGNET_RADIUS
+from damage_numbers import DamageNumbers, DigitAtlas
+from spawning import EnemyPool, SpawnQueue
+from flowfield import FlowField, ARENAS, DEFAULT_ARENA, obstacle_blits, push_out
+import netplay
+from collision import find_projectile_hits, find_wall_hits, masks_overlap, run_collision_pairs, PLAYER, ENEMY, PLAYER_SHOT, ENEMY_SHOT, AREA
 
 # Constants
 WINDOW_WIDTH = 1600
 WINDOW_HEIGHT = 900
 FPS = 60
+RENDER_SCALE = 1.0  # Fraction of the window resolution used for the gameplay layer
+TICK_RATE = FPS  # Simulation steps per second, whatever the render rate
+TICK_SECONDS = 1.0 / TICK_RATE
+MAX_TICKS_PER_FRAME = 5  # Below TICK_RATE / 5 fps the game slows down instead of falling further behind
+# Frame rate cap, 0 for none. SDL can ignore a vsync request without an error and pygame can't tell us
+# whether it took, so vsync mode keeps a 60 fps cap rather than risk an uncapped busy loop
+RENDER_MODES = {"60": 60, "144": 144, "uncapped": 0, "vsync": 60}
+
+# Command line options
+parser = argparse.ArgumentParser(description="Vibe Survivors")
+parser.add_argument("--render-scale", type=float, default=RENDER_SCALE,
+                    help="render gameplay at this fraction of the window size (e.g. 0.5 or 0.75)")
+parser.add_argument("--smooth-scale", action="store_true",
+                    help="use smoothscale instead of scale when upscaling the gameplay layer")
+parser.add_argument("--render-mode", choices=list(RENDER_MODES), default="60",
+                    help="frame rate cap for drawing; the game itself always runs at a fixed tick rate")
+parser.add_argument("--quality", choices=["auto"] + QUALITY_NAMES, default="auto",
+                    help="fixed quality level, or 'auto' to adapt to the frame budget")
+parser.add_argument("--startup-report", action="store_true",
+                    help="print how long each startup phase took")
+parser.add_argument("--telemetry", metavar="DIR",
+                    help="write gameplay and performance events to gzipped JSONL files in DIR")
+parser.add_argument("--host", type=int, nargs="?", const=netplay.DEFAULT_PORT, metavar="PORT",
+                    help="host a co-op game for up to 3 more players on this UDP port")
+parser.add_argument("--join", metavar="HOST[:PORT]",
+                    help="join a co-op game hosted at HOST")
+parser.add_argument("--net-latency", type=float, default=0, metavar="MS",
+                    help="simulated one-way network latency, for testing co-op locally")
+parser.add_argument("--net-jitter", type=float, default=0, metavar="MS",
+                    help="simulated random variation in latency")
+parser.add_argument("--net-loss", type=float, default=0.0, metavar="FRACTION",
+                    help="simulated packet loss, e.g. 0.05")
+parser.add_argument("--gc-mode", choices=GC_MODES, default="tuned",
+                    help="how much cyclic garbage collection is held back during gameplay")
+parser.add_argument("--gc-report", action="store_true",
+                    help="print garbage collection pause totals on exit")
+parser.add_argument("--pipeline", action="store_true",
+                    help="draw each gameplay frame on a render thread while the next one is simulated")
+parser.add_argument("--no-ai-lod", action="store_true",
+                    help="steer every enemy every tick instead of less often for distant ones")
+parser.add_argument("--run-db", default="runs.db", metavar="PATH",
+                    help="SQLite file that keeps the history of finished runs")
+parser.add_argument("--no-run-db", action="store_true",
+                    help="don't record finished runs")
+parser.add_argument("--metrics-port", type=int, metavar="PORT",
+                    help="serve live counters in Prometheus format at http://localhost:PORT/metrics")
+parser.add_argument("--profile-seconds", type=float, metavar="SECONDS",
+                    help="profile the first SECONDS of gameplay; also how long F9 profiles for (default 5)")
+parser.add_argument("--profile-slow-ms", type=float, metavar="MS",
+                    help="keep profiling the last 10 seconds and save them whenever a frame takes longer than MS")
+parser.add_argument("--profile-dir", default="profiles", metavar="DIR",
+                    help="where profiles are written")
+parser.add_argument("--arena", choices=list(ARENAS), default=DEFAULT_ARENA,
+                    help="obstacle layout to play in")
 
 # Colors
 BLACK = (0, 0, 0)
@@ -25,15 +100,33 @@ PURPLE = (128, 0, 128)
 GRAY = (100, 100, 100)
 HIGHLIGHT = (200, 200, 200)
 
-# Set up the game window
-screen = pygame.display.set_mode((WINDOW_WIDTH, WINDOW_HEIGHT))
-pygame.display.set_caption("Vibe Survivors")
-clock = pygame.time.Clock()
+SCREEN_RECT = pygame.Rect(0, 0, WINDOW_WIDTH, WINDOW_HEIGHT)
+
+# What the gameplay HUD shows; plain values so a render thread can draw it
+HudState = namedtuple("HudState", "health max_health xp_fraction score level time_remaining weapon_names weapon_index")
 
-# Font setup
-font = pygame.font.Font(None, 36)
-small_font = pygame.font.Font(None, 24)
-title_font = pygame.font.Font(None, 72)
+# The window, fonts and player are created lazily so importing this module stays cheap
+screen = None
+clock = None
+renderer = None
+quality = QualityGovernor(FPS)
+startup = StartupTimer()
+telemetry = NullTelemetry()
+coop_host = None
+gc_manager = None
+render_pipeline = None  # Set in --pipeline mode
+run_store = None
+metrics = None  # Set when --metrics-port is given
+metrics_server = None
+profiler = None
+render_snapshots = None
+snapshot_images = None
+assets = AssetLoader(startup)
+
+# Font setup (filled in by the asset loader)
+font = None
+small_font = None
+title_font = None
 
 # Game states
 MENU = 0
@@ -44,7 +137,6 @@ UPGRADING = 4
 VICTORY = 5  # New game state for victory
 
 # Game timing constants
-GAME_START_TIME = time.time()
 MINI_BOSS_SPAWN_TIME = 60  # 1 minute
 GAME_DURATION = 900  # 15 minutes in seconds
 COUNTDOWN_START = 30  # Start countdown 30 seconds before end
@@ -119,15 +211,22 @@ class UpgradeButton(Button):
             print(f"Option: {self.option}")
 
 class Player(pygame.sprite.Sprite):
+    speed = Stat()
+    max_health = Stat()
+    magnet_radius = Stat()  # How close experience gems have to be to get pulled in
+    collision_radius = 0  # Collides using its rect
+
     def __init__(self):
         super().__init__()
         self.image = pygame.Surface((30, 30))
         self.image.fill(WHITE)
         self.rect = self.image.get_rect()
         self.rect.center = (WINDOW_WIDTH // 2, WINDOW_HEIGHT // 2)
+        self.stats = StatBlock()
         self.speed = 5
         self.health = 100
         self.max_health = 100
+        self.magnet_radius = MAGNET_RADIUS
         self.score = 0
         self.experience = 0
         self.level = 1
@@ -138,10 +237,12 @@ class Player(pygame.sprite.Sprite):
         self.current_weapon_index = 0  # Index of currently selected weapon
         self.weapon_type = "pistol"
         self.leveled_up = False
+        self.pending_level_ups = 0  # Level-ups still waiting for an upgrade choice
         self.owned_weapons = ["pistol"]  # Track which weapons the player owns
+        self.controls = None  # Input from a co-op client; None means this machine's keyboard
 
     def update(self):
-        keys = pygame.key.get_pressed()
+        keys = self.controls.keys if self.controls else pygame.key.get_pressed()
         # WASD controls
         if keys[pygame.K_a] or keys[pygame.K_LEFT]:
             self.rect.x -= self.speed
@@ -166,11 +267,12 @@ class Player(pygame.sprite.Sprite):
             self.current_weapon_index = 3
             self.weapon_type = self.weapons[3].__class__.__name__.lower()
 
-        # Keep player on screen
-        self.rect.clamp_ip(screen.get_rect())
+        # Keep player on screen and out of the walls
+        push_out(self.rect, arena_obstacles)
+        self.rect.clamp_ip(SCREEN_RECT)
 
         # Update weapon cooldowns
-        current_time = pygame.time.get_ticks()
+        current_time = gameclock.ticks()
         for weapon_type, cooldown_time in list(self.weapon_cooldowns.items()):
             if current_time >= cooldown_time:
                 del self.weapon_cooldowns[weapon_type]
@@ -178,18 +280,25 @@ class Player(pygame.sprite.Sprite):
     def add_experience(self, amount):
         self.experience += amount
         self.current_level_experience += amount
-        if self.current_level_experience >= self.experience_to_level:
+        # A big batch of experience can be worth several levels; leftovers carry over
+        while self.current_level_experience >= self.experience_to_level:
+            self.current_level_experience -= self.experience_to_level
             self.level_up()
 
     def level_up(self):
         self.level += 1
-        self.current_level_experience = 0
         self.experience_to_level = int(self.experience_to_level * 1.5)
+        self.pending_level_ups += 1
         self.leveled_up = True
         return True
 
+    def finish_level_up(self):
+        """Called once an upgrade has been picked for a level-up"""
+        self.pending_level_ups = max(0, self.pending_level_ups - 1)
+        self.leveled_up = self.pending_level_ups > 0
+
     def shoot(self, target_x, target_y):
-        current_time = pygame.time.get_ticks()
+        current_time = gameclock.ticks()
         projectiles_created = False
         
         # Try to fire all weapons that are off cooldown
@@ -213,7 +322,7 @@ class Player(pygame.sprite.Sprite):
                         target_x = self.rect.centerx + math.cos(angle) * 1000
                         target_y = self.rect.centery + math.sin(angle) * 1000
                         projectile = Projectile(self.rect.centerx, self.rect.centery, target_x, target_y,
-                                             weapon.damage, weapon.projectile_color)
+                                             weapon.damage, weapon.projectile_color, weapon=weapon_type)
                         projectiles.add(projectile)
                         all_sprites.add(projectile)
                 elif weapon_type == "bazooka":
@@ -226,6 +335,7 @@ class Player(pygame.sprite.Sprite):
                         weapon.particle_count,
                         weapon.particle_size
                     )
+                    explosions.add(explosion)
                     all_sprites.add(explosion)
                 else:
                     angle = math.atan2(target_y - self.rect.centery, target_x - self.rect.centerx)
@@ -235,7 +345,8 @@ class Player(pygame.sprite.Sprite):
                     target_x = self.rect.centerx + math.cos(angle) * 1000
                     target_y = self.rect.centery + math.sin(angle) * 1000
                     projectile = Projectile(self.rect.centerx, self.rect.centery, target_x, target_y,
-                                         weapon.damage, weapon.projectile_color)
+                                         weapon.damage, weapon.projectile_color,
+                                         speed=getattr(weapon, "projectile_speed", 10), weapon=weapon_type)
                     projectiles.add(projectile)
                     all_sprites.add(projectile)
         
@@ -245,6 +356,13 @@ class Player(pygame.sprite.Sprite):
         self.health -= amount
         return self.health <= 0
 
+    def reset_weapons(self):
+        self.weapons = [create_weapon("pistol")]  # Reset to pistol
+        self.current_weapon_index = 0  # Reset to pistol
+        self.weapon_type = "pistol"
+        self.owned_weapons = ["pistol"]  # Reset owned weapons
+        self.weapon_cooldowns = {}
+
     def add_weapon(self, weapon_type):
         """Add a new weapon if the player doesn't already have it and has less than 4 weapons"""
         if weapon_type not in self.owned_weapons and len(self.weapons) < 4:
@@ -262,14 +380,19 @@ class Player(pygame.sprite.Sprite):
         return None
 
 class Projectile(pygame.sprite.Sprite):
-    def __init__(self, x, y, target_x, target_y, damage, color, is_rocket=False):
+    def __init__(self, x, y, target_x, target_y, damage, color, is_rocket=False, speed=10, weapon=None):
         super().__init__()
         self.image = pygame.Surface((10, 10))
         self.image.fill(color)
+        self.color = color
         self.rect = self.image.get_rect()
         self.rect.center = (x, y)
-        self.speed = 10
+        # Exact centre this frame and last frame, for swept collision
+        self.x = self.prev_x = float(x)
+        self.y = self.prev_y = float(y)
+        self.speed = speed
         self.damage = damage
+        self.weapon = weapon  # Weapon type that fired this, for kill credit
         self.is_rocket = is_rocket
         
         # Calculate direction
@@ -281,11 +404,14 @@ class Projectile(pygame.sprite.Sprite):
             self.dy = dy / dist
 
     def update(self):
-        self.rect.x += self.dx * self.speed
-        self.rect.y += self.dy * self.speed
+        self.prev_x = self.x
+        self.prev_y = self.y
+        self.x += self.dx * self.speed
+        self.y += self.dy * self.speed
+        self.rect.center = (self.x, self.y)
         
         # Remove if off screen
-        if not screen.get_rect().colliderect(self.rect):
+        if not SCREEN_RECT.colliderect(self.rect):
             self.kill()
 
 class ExplosionParticle(pygame.sprite.Sprite):
@@ -293,6 +419,8 @@ class ExplosionParticle(pygame.sprite.Sprite):
         super().__init__()
         self.image = pygame.Surface((size, size))
         self.image.fill(color)
+        self.size = size
+        self.color = color
         self.rect = self.image.get_rect()
         self.rect.center = (x, y)
         self.speed = speed
@@ -312,30 +440,66 @@ class ExplosionParticle(pygame.sprite.Sprite):
         if self.alpha <= 0:
             self.kill()
 
+explosion_texture = None
+explosion_images = {}
+explosion_masks = {}
+
+def get_explosion_image(radius, simple=False):
+    """Return a cached explosion image for this radius"""
+    global explosion_texture
+    key = (radius, simple)
+    if key in explosion_images:
+        return explosion_images[key]
+    
+    if simple:
+        # Cheap to blit: no per-pixel alpha, just a colorkeyed circle
+        image = pygame.Surface((radius * 2, radius * 2))
+        image.set_colorkey(BLACK)
+        pygame.draw.circle(image, (255, 100, 0), (radius, radius), radius, max(2, radius // 10))
+    else:
+        # Load explosion image
+        try:
+            if explosion_texture is None:
+                explosion_texture = pygame.image.load("resources/explosion.png").convert_alpha()
+            # Scale the image to match the explosion radius
+            image = pygame.transform.scale(explosion_texture, (radius * 2, radius * 2))
+        except Exception as e:
+            print(f"Error loading explosion image: {e}")
+            # Fallback to a simple circle if image loading fails
+            image = pygame.Surface((radius * 2, radius * 2), pygame.SRCALPHA)
+            pygame.draw.circle(image, (255, 100, 0, 200), (radius, radius), radius)
+    
+    explosion_images[key] = image
+    return image
+
+def get_explosion_mask(radius):
+    """Return a cached filled-circle collision mask for this radius"""
+    mask = explosion_masks.get(radius)
+    if mask is None:
+        surface = pygame.Surface((radius * 2, radius * 2), pygame.SRCALPHA)
+        pygame.draw.circle(surface, WHITE, (radius, radius), radius)
+        mask = pygame.mask.from_surface(surface)
+        explosion_masks[radius] = mask
+    return mask
+
 class Explosion(pygame.sprite.Sprite):
     def __init__(self, x, y, radius, damage, particle_count, particle_size):
         super().__init__()
         self.rect = pygame.Rect(x - radius, y - radius, radius * 2, radius * 2)
         self.radius = radius
         self.damage = damage
+        self.weapon = "bazooka"
         self.particle_count = particle_count
         self.particle_size = particle_size
         self.lifetime = 30  # frames
         self.current_frame = 0
+        self.simple = quality.settings["simple_explosions"]
+        self.image = get_explosion_image(radius, self.simple)
+        self.mask = get_explosion_mask(radius)
         
-        # Load explosion image
-        try:
-            self.image = pygame.image.load("resources/explosion.png")
-            # Scale the image to match the explosion radius
-            self.image = pygame.transform.scale(self.image, (radius * 2, radius * 2))
-        except Exception as e:
-            print(f"Error loading explosion image: {e}")
-            # Fallback to a simple circle if image loading fails
-            self.image = pygame.Surface((radius * 2, radius * 2), pygame.SRCALPHA)
-            pygame.draw.circle(self.image, (255, 100, 0, 200), (radius, radius), radius)
-        
-        # Create explosion particles
-        self.particles = pygame.sprite.Group()
+        # Create explosion particles, keeping the total under the current quality cap.
+        # They live only in the global particles group so nothing keeps them after they fade.
+        particle_count = min(particle_count, max(0, quality.settings["particle_cap"] - len(particles)))
         for _ in range(particle_count):
             particle = ExplosionParticle(
                 x, y, 
@@ -344,61 +508,22 @@ class Explosion(pygame.sprite.Sprite):
                 random.uniform(1, 3),
                 random.randint(10, 20)
             )
-            self.particles.add(particle)
-            all_sprites.add(particle)
+            particles.add(particle)
 
     def update(self):
         self.current_frame += 1
         if self.current_frame >= self.lifetime:
             self.kill()
-        
-        # Check for enemy collisions
-        enemies_hit = pygame.sprite.spritecollide(self, enemies, False)
-        for enemy in enemies_hit:
-            # Calculate distance from explosion center to enemy
-            dx = enemy.rect.centerx - self.rect.centerx
-            dy = enemy.rect.centery - self.rect.centery
-            distance = math.sqrt(dx * dx + dy * dy)
-            
-            # Apply damage based on distance (more damage closer to center)
-            if distance <= self.radius:
-                damage_multiplier = 1 - (distance / self.radius) * 0.5  # 50% damage reduction at edge
-                enemy.take_damage(int(self.damage * damage_multiplier))
-
-class MiniBoss(Enemy):
-    def __init__(self, player):
-        super().__init__(player)
-        self.image = pygame.Surface((60, 60))
-        self.image.fill((255, 0, 0))  # Red color for mini-boss
-        self.rect = self.image.get_rect()
-        self.health = 200
-        self.max_health = 200
-        self.speed = 2
-        self.damage = 5
-        self.score_value = 100
-        self.experience_value = 50
-        
-        # Spawn at a random position on the edge of the screen
-        side = random.randint(0, 3)
-        if side == 0:  # Top
-            self.rect.x = random.randint(0, WINDOW_WIDTH)
-            self.rect.y = -self.rect.height
-        elif side == 1:  # Right
-            self.rect.x = WINDOW_WIDTH
-            self.rect.y = random.randint(0, WINDOW_HEIGHT)
-        elif side == 2:  # Bottom
-            self.rect.x = random.randint(0, WINDOW_WIDTH)
-            self.rect.y = WINDOW_HEIGHT
-        else:  # Left
-            self.rect.x = -self.rect.width
-            self.rect.y = random.randint(0, WINDOW_HEIGHT)
 
 # Create sprite groups
 all_sprites = pygame.sprite.Group()
 enemies = pygame.sprite.Group()
-projectiles = pygame.sprite.Group()
-player = Player()
-all_sprites.add(player)
+players = pygame.sprite.Group()
+projectiles = pygame.sprite.Group()  # Player shots
+enemy_projectiles = pygame.sprite.Group()  # Shots fired by ranged enemies, only tested against players
+explosions = pygame.sprite.Group()
+particles = pygame.sprite.Group()  # Decorative explosion particles, drawn only when quality allows
+player = None  # Created when the first game starts
 
 # Game state
 game_state = MENU
@@ -412,508 +537,1037 @@ upgrade_buttons = []
 start_button = Button(WINDOW_WIDTH // 2 - 100, WINDOW_HEIGHT // 2 - 25, 200, 50, "Start Game")
 quit_button = Button(WINDOW_WIDTH // 2 - 100, WINDOW_HEIGHT // 2 + 50, 200, 50, "Quit")
 
-# Add these variables at the top of the game loop
-game_start_time = time.time()
+# Run timing and spawning state, advanced by update_time() and update_playing()
+game_start_time = gameclock.now()
+current_time = game_start_time
+elapsed_time = 0.0
+time_remaining = GAME_DURATION
+last_enemy_spawn = game_start_time
+spawn_delay = INITIAL_SPAWN_DELAY
 mini_boss_spawned = False
 mini_boss_spawn_time = 60000  # 1 minute in milliseconds
+enemy_count_multiplier = 1.0  # Start with normal enemy count
+countdown_active = False
+victory_celebration = False
+celebration_particles = []
+frame_stalled = False  # Set when the frame deliberately pauses (warnings), so it isn't timed
+
+# Collision handlers only queue damage; combat_events.resolve() applies it once per frame
+combat_events = CombatEvents()
+gem_field = GemField((WINDOW_WIDTH, WINDOW_HEIGHT))  # Experience dropped by kills
+damage_numbers = DamageNumbers()
+enemy_pool = EnemyPool()
+spawn_queue = SpawnQueue(enemy_pool)
+combat_events.add_hook(lambda result: damage_numbers.add_hits(result["hits"]))
+
+# Distant enemies steer less often than nearby ones
+ai_scheduler = AIScheduler()
+
+# Walls and pillars, set by set_arena(); the flow field takes enemies around them
+arena_obstacles = []
+arena_blits = []
+flow_field = None
+
+# Co-op players controlled by network clients (the host's own player is `player`)
+remote_players = []
+
+def set_arena(name):
+    """Lay out the arena's obstacles and share a flow field around them with every enemy"""
+    global arena_obstacles, arena_blits, flow_field
+    arena_obstacles = [pygame.Rect(rect) for rect in ARENAS[name]]
+    arena_blits = obstacle_blits(arena_obstacles)
+    flow_field = None
+    if arena_obstacles:
+        flow_field = FlowField((WINDOW_WIDTH, WINDOW_HEIGHT), arena_obstacles, band=RangedEnemy.distance_band())
+    Enemy.flow_field = flow_field
+
+def remote_spawn_point(index):
+    return (WINDOW_WIDTH // 2 + 60 * (index + 1), WINDOW_HEIGHT // 2)
+
+def add_remote_player():
+    remote = Player()
+    remote.rect.center = remote_spawn_point(len(remote_players))
+    remote_players.append(remote)
+    all_sprites.add(remote)
+    players.add(remote)
+    return remote
+
+def remove_remote_player(remote):
+    remote.kill()
+    if remote in remote_players:
+        remote_players.remove(remote)
+
+def nearest_player(sprite):
+    """The player an enemy goes after; only searches when there is more than one"""
+    if len(players) < 2:
+        return player
+    x, y = sprite.rect.center
+    return min(players, key=lambda p: (p.rect.centerx - x) ** 2 + (p.rect.centery - y) ** 2)
+
+NET_ENEMY_KINDS = {
+    BasicEnemy: netplay.KIND_BASIC,
+    FastEnemy: netplay.KIND_FAST,
+    TankEnemy: netplay.KIND_TANK,
+    RangedEnemy: netplay.KIND_RANGED,
+    MiniBoss: netplay.KIND_MINI_BOSS,
+}
+
+def net_entities():
+    """Everything co-op clients can see, as (key, kind, x, y, extra)"""
+    entities = [(("gem", serial), netplay.KIND_GEM, x, y, tier) for serial, tier, x, y in gem_field.rows()]
+    for p in players:
+        entities.append((p, netplay.KIND_PLAYER, p.rect.centerx, p.rect.centery,
+                         100 * max(0, p.health) // max(1, p.max_health)))
+    for enemy in enemies:
+        # Keyed by spawn, so a pooled enemy that dies and respawns gets a new id instead of sliding across
+        entities.append((("enemy", enemy.serial), NET_ENEMY_KINDS.get(enemy.__class__, netplay.KIND_BASIC),
+                         enemy.rect.centerx, enemy.rect.centery,
+                         100 * max(0, enemy.health) // max(1, enemy.max_health)))
+    for projectile in projectiles:
+        entities.append((projectile, netplay.KIND_SHOT, projectile.x, projectile.y, 0))
+    for projectile in enemy_projectiles:
+        entities.append((projectile, netplay.KIND_ENEMY_SHOT, projectile.x, projectile.y, 0))
+    for explosion in explosions:
+        entities.append((explosion, netplay.KIND_EXPLOSION, explosion.rect.centerx, explosion.rect.centery,
+                         explosion.radius))
+    return entities
+
+def collide_player_enemy(player_group, enemy_group):
+    for enemy in enemy_group:
+        for target in player_group:
+            # Check if player collides with enemy: rects first, then the enemy's actual shape
+            if target.rect.colliderect(enemy.rect) and masks_overlap(target, enemy):
+                combat_events.emit(target, enemy.damage, "contact")
+                combat_events.remove(enemy)
+                break
+
+def collide_shots_enemy(shot_group, enemy_group):
+    # Swept along each projectile's path this frame so fast bullets can't tunnel through small enemies
+    for projectile, enemy in find_projectile_hits(shot_group.sprites(), enemy_group.sprites()):
+        if not projectile.alive() or combat_events.is_lethal(enemy):
+            continue
+        # A projectile stops at the first enemy it kills
+        if combat_events.emit(enemy, projectile.damage, projectile.weapon):
+            projectile.kill()
+
+def collide_area_enemy(area_group, enemy_group):
+    for explosion in area_group:
+        enemies_hit = pygame.sprite.spritecollide(explosion, enemy_group, False)
+        for enemy in enemies_hit:
+            # The blast circle has to touch the enemy's shape, not just its rect
+            if not masks_overlap(explosion, enemy):
+                continue
+
+            # Calculate distance from explosion center to enemy
+            dx = enemy.rect.centerx - explosion.rect.centerx
+            dy = enemy.rect.centery - explosion.rect.centery
+            distance = min(math.sqrt(dx * dx + dy * dy), explosion.radius)
+
+            # Apply damage based on distance (more damage closer to center)
+            damage_multiplier = 1 - (distance / explosion.radius) * 0.5  # 50% damage reduction at edge
+            combat_events.emit(enemy, int(explosion.damage * damage_multiplier), explosion.weapon)
+
+def collide_enemy_shots_player(shot_group, player_group):
+    # One swept test per enemy shot against the player box - never against the horde
+    for projectile, target in find_projectile_hits(shot_group.sprites(), player_group.sprites()):
+        if projectile.alive():
+            combat_events.emit(target, projectile.damage, projectile.weapon)
+            projectile.kill()
+
+collision_layers = {
+    PLAYER: players,
+    ENEMY: enemies,
+    PLAYER_SHOT: projectiles,
+    ENEMY_SHOT: enemy_projectiles,
+    AREA: explosions,
+}
+
+collision_handlers = {
+    (PLAYER, ENEMY): collide_player_enemy,
+    (PLAYER_SHOT, ENEMY): collide_shots_enemy,
+    (AREA, ENEMY): collide_area_enemy,
+    (ENEMY_SHOT, PLAYER): collide_enemy_shots_player,
+}
+
+upgrade_catalog = UpgradeCatalog()
 
 def generate_upgrade_options():
-    # Create a pool of all possible upgrades
-    all_upgrades = []
-    
-    # General upgrades (always available)
-    all_upgrades.append({
-        "name": "Speed Boost",
-        "description": "Increase movement speed by 1",
-        "apply": lambda: setattr(player, 'speed', player.speed + 1),
-        "number": 1,
-        "type": "general"
-    })
-    
-    all_upgrades.append({
-        "name": "Health Boost",
-        "description": "Increase max health by 20",
-        "apply": lambda: setattr(player, 'max_health', player.max_health + 20),
-        "number": 2,
-        "type": "general"
-    })
-    
-    # Weapon unlocks (only if player doesn't have the weapon and has less than 4 weapons)
-    if "shotgun" not in player.owned_weapons and len(player.weapons) < 4:
-        all_upgrades.append({
-            "name": "Shotgun",
-            "description": "Unlock shotgun weapon",
-            "apply": lambda: player.add_weapon("shotgun"),
-            "number": 3,
-            "type": "weapon_unlock"
-        })
-    
-    if "machine_gun" not in player.owned_weapons and len(player.weapons) < 4:
-        all_upgrades.append({
-            "name": "Machine Gun",
-            "description": "Unlock machine gun weapon",
-            "apply": lambda: player.add_weapon("machine_gun"),
-            "number": 4,
-            "type": "weapon_unlock"
-        })
-    
-    if "bazooka" not in player.owned_weapons and len(player.weapons) < 4:
-        all_upgrades.append({
-            "name": "Bazooka",
-            "description": "Unlock bazooka weapon",
-            "apply": lambda: player.add_weapon("bazooka"),
-            "number": 5,
-            "type": "weapon_unlock"
-        })
-    
-    # Add weapon-specific upgrades for all owned weapons
-    for weapon in player.weapons:
-        weapon_upgrades = weapon.get_upgrades()
-        for upgrade in weapon_upgrades:
-            upgrade["type"] = "weapon_specific"
-            all_upgrades.append(upgrade)
-    
-    # Shuffle all upgrades
-    random.shuffle(all_upgrades)
-    
-    # Select 3 upgrades, prioritizing variety
-    selected_upgrades = []
-    types_selected = set()
-    
-    # First pass: try to get one of each type
-    for upgrade in all_upgrades:
-        if len(selected_upgrades) >= 3:
-            break
-            
-        upgrade_type = upgrade.get("type", "general")
-        if upgrade_type not in types_selected:
-            selected_upgrades.append(upgrade)
-            types_selected.add(upgrade_type)
-    
-    # Second pass: fill remaining slots with random upgrades
-    remaining_upgrades = [u for u in all_upgrades if u not in selected_upgrades]
-    while len(selected_upgrades) < 3 and remaining_upgrades:
-        selected_upgrades.append(remaining_upgrades.pop(0))
-    
-    # If we still don't have 3 upgrades, duplicate some
-    while len(selected_upgrades) < 3 and all_upgrades:
-        selected_upgrades.append(random.choice(all_upgrades))
-    
-    # Assign numbers 1-3 to the options
-    for i, option in enumerate(selected_upgrades[:3]):
-        option['number'] = i + 1
-    
-    return selected_upgrades[:3]
+    """Pick three upgrade options for the level-up screen"""
+    return upgrade_catalog.choose(player, 3)
+
+def choose_upgrade(option):
+    """Apply the picked upgrade and go back to the game"""
+    global game_state
+    try:
+        option["apply"]()
+        run_upgrades.append((option["name"], option["type"], player.level, round(elapsed_time, 2)))
+        telemetry.emit("upgrade", name=option["name"], type=option["type"], level=player.level,
+                       t=round(elapsed_time, 2))
+    except Exception as e:
+        print(f"Error applying upgrade: {e}")
+    game_state = PLAYING
+    player.finish_level_up()
+
+def end_run(outcome):
+    """Leave PLAYING for GAME_OVER or VICTORY"""
+    global game_state
+    game_state = outcome
+    telemetry.emit("run_end", outcome="victory" if outcome == VICTORY else "game_over",
+                   score=player.score, level=player.level, duration=round(elapsed_time, 2),
+                   weapons=list(player.owned_weapons))
+    if run_store:
+        run_store.record("victory" if outcome == VICTORY else "game_over", player.score, player.level,
+                         round(elapsed_time, 2), player.owned_weapons, run_upgrades, run_kills)
+
+# This run's history for the run store
+run_upgrades = []  # (name, type, level, t) per upgrade picked
+run_kills = {}  # minute -> kills
+
+def record_run_kills(result):
+    """Combat hook: count kills per minute of the run"""
+    if result["kills"]:
+        minute = int(elapsed_time // 60)
+        run_kills[minute] = run_kills.get(minute, 0) + len(result["kills"])
+
+# Per-second telemetry accumulators
+second_damage = {}
+second_kills = {}
+second_frame_ms = []
+
+def record_combat(result):
+    """Combat hook: collect kills and damage per weapon for telemetry"""
+    for enemy, weapon in result["kills"]:
+        second_kills[weapon] = second_kills.get(weapon, 0) + 1
+        telemetry.emit("kill", enemy=enemy.__class__.__name__, weapon=weapon, t=round(elapsed_time, 2))
+    for weapon, amount in result["damage"].items():
+        second_damage[weapon] = second_damage.get(weapon, 0) + amount
+
+def record_sample():
+    """Once a second while playing: entity counts, frame times, damage per weapon and the quality governor"""
+    telemetry.emit(
+        "sample",
+        t=round(elapsed_time, 2),
+        fps=round(clock.get_fps(), 1),
+        frame_ms_avg=round(sum(second_frame_ms) / len(second_frame_ms), 3) if second_frame_ms else 0,
+        frame_ms_max=round(max(second_frame_ms), 3) if second_frame_ms else 0,
+        enemies=len(enemies),
+        projectiles=len(projectiles),
+        enemy_projectiles=len(enemy_projectiles),
+        particles=len(particles),
+        gems=gem_field.count,
+        all_sprites=len(all_sprites),
+        ai_steered=ai_scheduler.steered,
+        ai_coasted=ai_scheduler.coasted,
+        spawn_delay=round(spawn_delay, 3),
+        enemy_count_multiplier=round(enemy_count_multiplier, 2),
+        damage=dict(second_damage),
+        kills=dict(second_kills),
+        **quality.stats(),
+    )
+    second_damage.clear()
+    second_kills.clear()
+    second_frame_ms.clear()
+
+def metrics_snapshot():
+    """Gauges and entity counts for the metrics page; read on the game thread"""
+    gauges = {
+        "fps": round(clock.get_fps(), 2),
+        "state": game_state,
+        "elapsed_seconds": round(elapsed_time, 2),
+        "spawn_delay_seconds": round(spawn_delay, 4),
+        "enemy_count_multiplier": round(enemy_count_multiplier, 3),
+        "quality_level": quality.level,
+        "ai_steered": ai_scheduler.steered,
+        "score": player.score if player else 0,
+        "level": player.level if player else 0,
+    }
+    groups = {
+        "enemies": len(enemies),
+        "projectiles": len(projectiles),
+        "enemy_projectiles": len(enemy_projectiles),
+        "explosions": len(explosions),
+        "particles": len(particles),
+        "gems": gem_field.count,
+        "all_sprites": len(all_sprites),
+    }
+    return gauges, groups
+
+def profile_metadata(reason, frame_ms=None):
+    """What the game was doing when a profile was taken"""
+    return {
+        "reason": reason,
+        "game_time": round(elapsed_time, 2),
+        "state": game_state,
+        "frame_ms": round(frame_ms, 3) if frame_ms is not None else None,
+        "fps": round(clock.get_fps(), 1),
+        "quality_level": quality.level,
+        "enemies": len(enemies),
+        "projectiles": len(projectiles),
+        "enemy_projectiles": len(enemy_projectiles),
+        "particles": len(particles),
+        "all_sprites": len(all_sprites),
+        "score": player.score if player else 0,
+        "level": player.level if player else 0,
+    }
 
 def reset_game():
-    global game_state, game_over, showing_upgrades, game_paused, upgrade_buttons, GAME_START_TIME, mini_boss_spawned, enemy_count_multiplier
+    global game_state, game_over, showing_upgrades, game_paused, upgrade_options, upgrade_buttons, mini_boss_spawned, enemy_count_multiplier, player
+    global game_start_time, last_enemy_spawn, countdown_active, victory_celebration
+    if player is None:
+        player = Player()
+        all_sprites.add(player)
+        players.add(player)
     game_state = PLAYING
     game_over = False
     showing_upgrades = False
     game_paused = False
+    upgrade_options = []
     upgrade_buttons = []
-    GAME_START_TIME = time.time()  # Reset game start time
+    game_start_time = gameclock.now()
+    last_enemy_spawn = game_start_time - INITIAL_SPAWN_DELAY  # First wave right away
     mini_boss_spawned = False  # Reset mini-boss spawned flag
     enemy_count_multiplier = 1.0  # Reset enemy count multiplier
+    countdown_active = False
+    victory_celebration = False
+    celebration_particles.clear()
     
     # Reset player
+    player.stats.clear_modifiers()
+    player.speed = 5
     player.health = player.max_health
     player.score = 0
     player.experience = 0
     player.level = 1
     player.experience_to_level = 100
-    player.speed = 5
-    player.weapons = [create_weapon("pistol")]  # Reset to pistol
-    player.current_weapon_index = 0  # Reset to pistol
-    player.weapon_type = "pistol"
+    player.reset_weapons()
     player.leveled_up = False
-    player.owned_weapons = ["pistol"]  # Reset owned weapons
+    player.pending_level_ups = 0
+    player.current_level_experience = 0
+    player.rect.center = (WINDOW_WIDTH // 2, WINDOW_HEIGHT // 2)
+    player.last_center = player.rect.center
     
-    # Clear sprites
+    # Bring co-op players back in
+    for i, remote in enumerate(remote_players):
+        remote.stats.clear_modifiers()
+        remote.speed = 5
+        remote.health = remote.max_health
+        remote.reset_weapons()
+        remote.rect.center = remote_spawn_point(i)
+        all_sprites.add(remote)
+        players.add(remote)
+    
+    # Clear sprites; dead enemies go back to the pool
+    spawn_queue.clear()
     for enemy in enemies:
         enemy.kill()
     for projectile in projectiles:
         projectile.kill()
+    for projectile in enemy_projectiles:
+        projectile.kill()
+    for explosion in explosions:
+        explosion.kill()
+    combat_events.clear()
+    ai_scheduler.reset()
+    gem_field.clear()
+    damage_numbers.clear()
+    run_upgrades.clear()
+    run_kills.clear()
+    telemetry.emit("run_start")
+    for particle in particles:
+        particle.kill()
 
-# Game loop
-running = True
-last_enemy_spawn = time.time()
-spawn_delay = INITIAL_SPAWN_DELAY
-mini_boss_spawned = False
-enemy_count_multiplier = 1.0  # Start with normal enemy count
-countdown_active = False
-victory_celebration = False
-celebration_particles = []
-game_start_time = time.time()  # Initialize game start time
-
-while running:
-    # Calculate time at the start of each frame
-    current_time = time.time()
+def update_time():
+    """Read the game clock into the per-frame timing globals"""
+    global current_time, elapsed_time, time_remaining
+    current_time = gameclock.now()
     elapsed_time = current_time - game_start_time
     time_remaining = max(0, GAME_DURATION - elapsed_time)
-    
-    mouse_pos = pygame.mouse.get_pos()
-    mouse_clicked = False
-    
-    # Event handling
-    for event in pygame.event.get():
-        if event.type == pygame.QUIT:
-            running = False
-        elif event.type == pygame.MOUSEBUTTONDOWN:
-            mouse_clicked = True
-        elif event.type == pygame.KEYDOWN:
-            if event.key == pygame.K_ESCAPE:
-                if game_state == PLAYING:
-                    game_state = PAUSED
-                elif game_state == PAUSED:
-                    game_state = PLAYING
-            elif event.key == pygame.K_r and game_state == GAME_OVER:
-                reset_game()
 
-    # Handle menu
-    if game_state == MENU:
-        start_button.check_hover(mouse_pos)
-        quit_button.check_hover(mouse_pos)
-        
-        if mouse_clicked:
-            if start_button.is_clicked(mouse_pos, mouse_clicked):
-                reset_game()
-                game_start_time = time.time()  # Reset game start time when starting new game
-            elif quit_button.is_clicked(mouse_pos, mouse_clicked):
-                running = False
+def show_warning(text, y, duration_ms):
+    """Put a warning over the current frame and hold it there"""
+    global frame_stalled
+    if render_pipeline:
+        render_pipeline.wait()  # The render thread may still be drawing into the screen
+    warning_text = font.render(text, True, RED)
+    screen.blit(warning_text, (WINDOW_WIDTH // 2 - warning_text.get_width() // 2, y))
+    pygame.display.flip()
+    gameclock.delay(duration_ms)
+    frame_stalled = True
 
-    # Handle game over
-    elif game_state == GAME_OVER:
-        if mouse_clicked:
-            reset_game()
-            game_start_time = time.time()  # Reset game start time when restarting
+def add_enemy(enemy):
+    enemies.add(enemy)
+    all_sprites.add(enemy)
+    if metrics:
+        metrics.record_spawns()
 
-    # Handle victory
-    elif game_state == VICTORY:
-        # Create celebration particles
-        if not victory_celebration:
-            victory_celebration = True
-            for _ in range(100):
-                x = random.randint(0, WINDOW_WIDTH)
-                y = random.randint(0, WINDOW_HEIGHT)
-                color = random.choice([(255, 215, 0), (255, 0, 0), (0, 255, 0), (0, 0, 255), (255, 255, 255)])
-                size = random.randint(5, 15)
-                speed_x = random.uniform(-3, 3)
-                speed_y = random.uniform(-3, 3)
-                celebration_particles.append({
-                    'x': x,
-                    'y': y,
-                    'color': color,
-                    'size': size,
-                    'speed_x': speed_x,
-                    'speed_y': speed_y,
-                    'life': random.randint(30, 60)
-                })
-        
-        # Update celebration particles
-        for particle in celebration_particles[:]:
-            particle['x'] += particle['speed_x']
-            particle['y'] += particle['speed_y']
-            particle['life'] -= 1
-            if particle['life'] <= 0:
-                celebration_particles.remove(particle)
-        
-        if mouse_clicked:
-            reset_game()
-            game_start_time = time.time()  # Reset game start time when restarting
+def update_playing(mouse_pos, firing):
+    """One frame of gameplay: spawning, movement, collisions, combat and level-ups"""
+    global game_state, upgrade_options, upgrade_buttons, countdown_active
+    global enemy_count_multiplier, spawn_delay, last_enemy_spawn, mini_boss_spawned
+    # Check for countdown
+    if time_remaining <= COUNTDOWN_START and not countdown_active:
+        countdown_active = True
+        show_warning(f"{int(time_remaining)} seconds remaining!", 50, 1000)  # Show for 1 second
 
-    # Handle upgrades
-    elif game_state == UPGRADING:
-        for button in upgrade_buttons:
-            button.check_hover(mouse_pos)
-            if button.is_clicked(mouse_pos, mouse_clicked):
-                try:
-                    button.option["apply"]()
-                    game_state = PLAYING
-                    player.leveled_up = False
-                except Exception as e:
-                    print(f"Error applying upgrade: {e}")
-                    game_state = PLAYING
-                    player.leveled_up = False
-        
-        # Handle keyboard selection for upgrades
-        keys = pygame.key.get_pressed()
-        if keys[pygame.K_1] and len(upgrade_buttons) > 0:
-            try:
-                upgrade_buttons[0].option["apply"]()
-                game_state = PLAYING
-                player.leveled_up = False
-            except Exception as e:
-                print(f"Error applying upgrade: {e}")
-                game_state = PLAYING
-                player.leveled_up = False
-        elif keys[pygame.K_2] and len(upgrade_buttons) > 1:
-            try:
-                upgrade_buttons[1].option["apply"]()
-                game_state = PLAYING
-                player.leveled_up = False
-            except Exception as e:
-                print(f"Error applying upgrade: {e}")
-                game_state = PLAYING
-                player.leveled_up = False
-        elif keys[pygame.K_3] and len(upgrade_buttons) > 2:
-            try:
-                upgrade_buttons[2].option["apply"]()
-                game_state = PLAYING
-                player.leveled_up = False
-            except Exception as e:
-                print(f"Error applying upgrade: {e}")
-                game_state = PLAYING
-                player.leveled_up = False
-
-    # Handle gameplay
-    elif game_state == PLAYING:
-        # Check for countdown
-        if time_remaining <= COUNTDOWN_START and not countdown_active:
-            countdown_active = True
-            countdown_text = font.render(f"{int(time_remaining)} seconds remaining!", True, RED)
-            screen.blit(countdown_text, (WINDOW_WIDTH // 2 - countdown_text.get_width() // 2, 50))
-            pygame.display.flip()
-            pygame.time.delay(1000)  # Show for 1 second
-        
-        if elapsed_time >= GAME_DURATION:
-            game_state = VICTORY
-            continue
-        
-        # Handle continuous fire
-        if pygame.mouse.get_pressed()[0]:  # Left mouse button
-            player.shoot(*mouse_pos)
+    if elapsed_time >= GAME_DURATION:
+        end_run(VICTORY)
+        return
+
+    # Handle continuous fire
+    if firing:
+        player.shoot(*mouse_pos)
+
+    # Update enemy count multiplier every 10 seconds
+    enemy_count_multiplier = 1.0 + (elapsed_time // ENEMY_COUNT_INCREASE_INTERVAL) * ENEMY_COUNT_INCREASE_PERCENT
+
+    # Calculate spawn delay (decreases over time)
+    spawn_delay = max(MIN_SPAWN_DELAY, INITIAL_SPAWN_DELAY - (elapsed_time * ENEMY_SPAWN_RATE_INCREASE))
+
+    # Queue enemies; the spawn queue lets them in a few per tick
+    if current_time - last_enemy_spawn >= spawn_delay:
+        # Determine how many enemies to spawn based on the multiplier
+        num_enemies = max(1, int(enemy_count_multiplier))
+
+        for _ in range(num_enemies):
+            # Determine enemy type based on elapsed time
+            if elapsed_time < 30:  # First 30 seconds
+                enemy_type = "basic"
+            elif elapsed_time < 45:  # 30-45 seconds
+                enemy_type = random.choice(["basic", "fast"])
+            elif elapsed_time < 60:  # 45-60 seconds
+                enemy_type = random.choice(["basic", "fast", "tank"])
+            else:  # After 60 seconds
+                enemy_type = random.choice(["basic", "fast", "tank", "ranged"])
+
+            spawn_queue.push(enemy_type)
+
+        last_enemy_spawn = current_time
+
+    # Spawn mini-boss after 1 minute if not already spawned
+    if elapsed_time >= MINI_BOSS_SPAWN_TIME and not mini_boss_spawned:
+        spawn_queue.push("mini_boss", urgent=True)
+        mini_boss_spawned = True
+
+        # Display mini-boss warning
+        show_warning("MINI-BOSS INCOMING!", 100, 2000)  # Show warning for 2 seconds
+
+    spawn_queue.drain(add_enemy)
+
+    # Co-op players fire from their own input
+    for remote in remote_players:
+        if remote.controls and remote.controls.fire and remote.alive():
+            remote.shoot(*remote.controls.aim)
+
+    # Handle ranged enemy attacks
+    for enemy in enemies:
+        if isinstance(enemy, RangedEnemy) and enemy.is_attacking:
+            target = nearest_player(enemy)
+            # Create enemy projectile
+            dx = target.rect.centerx - enemy.rect.centerx
+            dy = target.rect.centery - enemy.rect.centery
+            dist = math.sqrt(dx * dx + dy * dy)
+
+            if dist != 0:
+                # Create a projectile that moves toward the player
+                projectile = Projectile(
+                    enemy.rect.centerx, 
+                    enemy.rect.centery, 
+                    target.rect.centerx, 
+                    target.rect.centery, 
+                    enemy.damage, 
+                    (0, 0, 255),  # Blue color for enemy projectiles
+                    weapon="ranged_enemy"
+                )
+                enemy_projectiles.add(projectile)
+                all_sprites.add(projectile)
+
+            enemy.is_attacking = False  # Reset attack flag
+
+    # Update all sprites; the flow field only searches again when a player changes cell
+    if flow_field:
+        flow_field.update([p.rect.center for p in players])
+    ai_scheduler.begin_tick()
+    for sprite in all_sprites:
+        if isinstance(sprite, Enemy):
+            ai_scheduler.update(sprite, nearest_player)
+        else:
+            sprite.update()
+    particles.update()
+    damage_numbers.update()
+    # Walls stop shots from both sides, tested along each shot's whole path so fast ones can't skip
+    # through. A stopped shot is cut short at the wall and can still hit an enemy in front of it
+    stopped_shots = []
+    if flow_field:
+        for shot, t in find_wall_hits(projectiles.sprites() + enemy_projectiles.sprites(), flow_field.boxes):
+            shot.x = shot.prev_x + (shot.x - shot.prev_x) * t
+            shot.y = shot.prev_y + (shot.y - shot.prev_y) * t
+            shot.rect.center = (shot.x, shot.y)
+            stopped_shots.append(shot)
+
+    # Check for collisions, only between layers that interact
+    run_collision_pairs(collision_layers, collision_handlers)
+    for shot in stopped_shots:
+        shot.kill()
+
+    # Apply this frame's damage, deaths, score and experience in one pass
+    combat_events.resolve(player, players, gem_field)
+    # Anyone can pick gems up; the experience is shared
+    collected = gem_field.update([p.rect.center for p in players], [p.magnet_radius for p in players])
+    if collected:
+        player.add_experience(collected)
+    for remote in remote_players:
+        if remote.health <= 0 and remote.alive():
+            remote.kill()  # Down until the next run
+    if player.health <= 0:
+        end_run(GAME_OVER)
+
+    # Check for level up
+    if player.leveled_up:
+        telemetry.emit("level_up", level=player.level, t=round(elapsed_time, 2))
+        game_state = UPGRADING
+        upgrade_options = generate_upgrade_options()
+        upgrade_buttons = []
+
+        # Create upgrade buttons
+        for i, option in enumerate(upgrade_options):
+            x = WINDOW_WIDTH // 2 - 300 + (i * 200)  # Increased spacing between buttons
+            y = WINDOW_HEIGHT // 2 - 100  # Moved up more
+            upgrade_buttons.append(UpgradeButton(x, y, 180, 180, option))  # Increased button size
+
+def update_victory():
+    """Victory screen celebration particles"""
+    global victory_celebration
+    # Create celebration particles
+    if not victory_celebration:
+        victory_celebration = True
+        for _ in range(quality.settings["victory_particles"]):
+            x = random.randint(0, WINDOW_WIDTH)
+            y = random.randint(0, WINDOW_HEIGHT)
+            color = random.choice([(255, 215, 0), (255, 0, 0), (0, 255, 0), (0, 0, 255), (255, 255, 255)])
+            size = random.randint(5, 15)
+            speed_x = random.uniform(-3, 3)
+            speed_y = random.uniform(-3, 3)
+            celebration_particles.append({
+                'x': x,
+                'y': y,
+                'color': color,
+                'size': size,
+                'speed_x': speed_x,
+                'speed_y': speed_y,
+                'life': random.randint(30, 60)
+            })
+
+    # Update celebration particles
+    for particle in celebration_particles[:]:
+        particle['x'] += particle['speed_x']
+        particle['y'] += particle['speed_y']
+        particle['life'] -= 1
+        if particle['life'] <= 0:
+            celebration_particles.remove(particle)
+
+def remember_positions():
+    """Note where every sprite is before a simulation tick, so frames can be drawn between ticks"""
+    for sprite in all_sprites:
+        sprite.last_center = sprite.rect.center
+    for sprite in particles:
+        sprite.last_center = sprite.rect.center
+
+def draw_frame(blend=1.0):
+    """Draw the current state to the screen; the caller flips the display.
+
+    blend is how far real time has got from the last simulation tick towards the next one.
+    """
+    if game_state != PLAYING:
+        screen.fill(BLACK)
 
-        # Update enemy count multiplier every 10 seconds
-        enemy_count_multiplier = 1.0 + (elapsed_time // ENEMY_COUNT_INCREASE_INTERVAL) * ENEMY_COUNT_INCREASE_PERCENT
-        
-        # Calculate spawn delay (decreases over time)
-        spawn_delay = max(MIN_SPAWN_DELAY, INITIAL_SPAWN_DELAY - (elapsed_time * ENEMY_SPAWN_RATE_INCREASE))
-        
-        # Spawn enemies
-        if current_time - last_enemy_spawn >= spawn_delay:
-            # Determine how many enemies to spawn based on the multiplier
-            num_enemies = max(1, int(enemy_count_multiplier))
-            
-            for _ in range(num_enemies):
-                # Determine enemy type based on elapsed time
-                if elapsed_time < 30:  # First 30 seconds
-                    enemy_type = "basic"
-                elif elapsed_time < 45:  # 30-45 seconds
-                    enemy_type = random.choice(["basic", "fast"])
-                elif elapsed_time < 60:  # 45-60 seconds
-                    enemy_type = random.choice(["basic", "fast", "tank"])
-                else:  # After 60 seconds
-                    enemy_type = random.choice(["basic", "fast", "tank", "ranged"])
-                
-                enemy = create_enemy(enemy_type)
-                enemies.add(enemy)
-                all_sprites.add(enemy)
-            
-            last_enemy_spawn = current_time
-        
-        # Spawn mini-boss after 1 minute if not already spawned
-        if elapsed_time >= MINI_BOSS_SPAWN_TIME and not mini_boss_spawned:
-            mini_boss = create_enemy("mini_boss")
-            enemies.add(mini_boss)
-            all_sprites.add(mini_boss)
-            mini_boss_spawned = True
-            
-            # Display mini-boss warning
-            warning_text = font.render("MINI-BOSS INCOMING!", True, RED)
-            screen.blit(warning_text, (WINDOW_WIDTH // 2 - warning_text.get_width() // 2, 100))
-            pygame.display.flip()
-            pygame.time.delay(2000)  # Show warning for 2 seconds
-        
-        # Handle ranged enemy attacks
-        for enemy in enemies:
-            if isinstance(enemy, RangedEnemy) and enemy.is_attacking:
-                # Create enemy projectile
-                dx = player.rect.centerx - enemy.rect.centerx
-                dy = player.rect.centery - enemy.rect.centery
-                dist = math.sqrt(dx * dx + dy * dy)
-                
-                if dist != 0:
-                    # Create a projectile that moves toward the player
-                    projectile = Projectile(
-                        enemy.rect.centerx, 
-                        enemy.rect.centery, 
-                        player.rect.centerx, 
-                        player.rect.centery, 
-                        enemy.damage, 
-                        (0, 0, 255)  # Blue color for enemy projectiles
-                    )
-                    projectiles.add(projectile)
-                    all_sprites.add(projectile)
-                
-                enemy.is_attacking = False  # Reset attack flag
-        
-        # Update all sprites
-        for sprite in all_sprites:
-            if isinstance(sprite, Enemy):
-                sprite.update(player)
-            else:
-                sprite.update()
-        
-        # Check for collisions
-        # Player-enemy collisions
-        for enemy in enemies:
-            # Check if player collides with enemy
-            if player.rect.colliderect(enemy.rect):
-                player.take_damage(enemy.damage)
-                enemy.kill()
-                enemies.remove(enemy)
-                continue
-            
-            # Check if projectile collides with enemy
-            for projectile in projectiles:
-                if projectile.rect.colliderect(enemy.rect):
-                    if enemy.take_damage(projectile.damage):
-                        player.score += enemy.score_value
-                        player.add_experience(enemy.experience_value)
-                        enemy.kill()
-                        enemies.remove(enemy)
-                        projectiles.remove(projectile)
-                        break
-        
-        # Check for level up
-        if player.leveled_up:
-            game_state = UPGRADING
-            upgrade_options = generate_upgrade_options()
-            upgrade_buttons = []
-            
-            # Create upgrade buttons
-            for i, option in enumerate(upgrade_options):
-                x = WINDOW_WIDTH // 2 - 300 + (i * 200)  # Increased spacing between buttons
-                y = WINDOW_HEIGHT // 2 - 100  # Moved up more
-                upgrade_buttons.append(UpgradeButton(x, y, 180, 180, option))  # Increased button size
-    
-    # Draw
-    screen.fill(BLACK)
-    
     if game_state == MENU:
         # Draw menu
-        title_text = font.render("Vibe Game", True, WHITE)
-        screen.blit(title_text, (WINDOW_WIDTH // 2 - title_text.get_width() // 2, 100))
-        
-        start_button.draw(screen)
-        quit_button.draw(screen)
-    
+        if font is not None:
+            title_text = font.render("Vibe Game", True, WHITE)
+            screen.blit(title_text, (WINDOW_WIDTH // 2 - title_text.get_width() // 2, 100))
+
+        if menu_ready():
+            start_button.draw(screen)
+            quit_button.draw(screen)
+        else:
+            # Stays up if the fonts failed to load (the loader printed why); Start would crash without them
+            draw_loading_bar(screen, assets.progress)
+
     elif game_state == VICTORY:
         # Draw victory screen
         victory_text = font.render("VICTORY! You survived for 15 minutes!", True, GREEN)
         screen.blit(victory_text, (WINDOW_WIDTH // 2 - victory_text.get_width() // 2, WINDOW_HEIGHT // 2 - 50))
-        
+
         score_text = font.render(f"Final Score: {player.score}", True, WHITE)
         screen.blit(score_text, (WINDOW_WIDTH // 2 - score_text.get_width() // 2, WINDOW_HEIGHT // 2))
-        
+
         level_text = font.render(f"Final Level: {player.level}", True, WHITE)
         screen.blit(level_text, (WINDOW_WIDTH // 2 - level_text.get_width() // 2, WINDOW_HEIGHT // 2 + 50))
-        
+
         restart_text = font.render("Click to play again", True, WHITE)
         screen.blit(restart_text, (WINDOW_WIDTH // 2 - restart_text.get_width() // 2, WINDOW_HEIGHT // 2 + 100))
-        
+
         # Draw celebration particles
         for particle in celebration_particles:
             pygame.draw.circle(screen, particle['color'], (int(particle['x']), int(particle['y'])), particle['size'])
-    
+
     elif game_state == GAME_OVER:
         # Draw game over screen
         game_over_text = font.render("GAME OVER", True, RED)
         screen.blit(game_over_text, (WINDOW_WIDTH // 2 - game_over_text.get_width() // 2, WINDOW_HEIGHT // 2 - 50))
-        
+
         score_text = font.render(f"Final Score: {player.score}", True, WHITE)
         screen.blit(score_text, (WINDOW_WIDTH // 2 - score_text.get_width() // 2, WINDOW_HEIGHT // 2))
-        
+
         restart_text = font.render("Press R to restart", True, WHITE)
         screen.blit(restart_text, (WINDOW_WIDTH // 2 - restart_text.get_width() // 2, WINDOW_HEIGHT // 2 + 50))
-    
+
     elif game_state == UPGRADING:
         # Draw upgrade screen
         upgrade_text = font.render("Choose an Upgrade", True, WHITE)
         screen.blit(upgrade_text, (WINDOW_WIDTH // 2 - upgrade_text.get_width() // 2, 50))
-        
+
         for button in upgrade_buttons:
             button.draw(screen)
-    
+
     elif game_state == PAUSED:
         # Draw pause screen
         pause_text = font.render("PAUSED", True, WHITE)
         screen.blit(pause_text, (WINDOW_WIDTH // 2 - pause_text.get_width() // 2, WINDOW_HEIGHT // 2))
-        
+
         resume_text = font.render("Press ESC to resume", True, WHITE)
         screen.blit(resume_text, (WINDOW_WIDTH // 2 - resume_text.get_width() // 2, WINDOW_HEIGHT // 2 + 50))
-    
+
     elif game_state == PLAYING:
-        # Draw game elements
-        all_sprites.draw(screen)
-        
-        # Draw health bar
-        health_width = 200
-        health_height = 20
-        health_x = 10
-        health_y = 10
-        pygame.draw.rect(screen, RED, (health_x, health_y, health_width, health_height))
-        pygame.draw.rect(screen, GREEN, (health_x, health_y, health_width * (player.health / player.max_health), health_height))
-        
-        # Draw experience bar
-        exp_width = 200
-        exp_height = 10
-        exp_x = 10
-        exp_y = 40
-        pygame.draw.rect(screen, BLUE, (exp_x, exp_y, exp_width, exp_height))
-        # Calculate the percentage of XP progress, not the actual width
-        xp_percentage = min(1.0, player.current_level_experience / player.experience_to_level)
-        pygame.draw.rect(screen, YELLOW, (exp_x, exp_y, exp_width * xp_percentage, exp_height))
-        
-        # Draw score and level
-        score_text = font.render(f'Score: {player.score}', True, WHITE)
-        level_text = font.render(f'Level: {player.level}', True, WHITE)
-        screen.blit(score_text, (WINDOW_WIDTH - 150, 10))
-        screen.blit(level_text, (WINDOW_WIDTH - 150, 40))
-        
-        # Draw time remaining
-        minutes = int(time_remaining // 60)
-        seconds = int(time_remaining % 60)
-        
-        # Change color based on time remaining
-        if time_remaining <= COUNTDOWN_START:
-            time_color = RED
-            if int(time_remaining) % 2 == 0:  # Blink every second
-                time_text = font.render(f'Time: {minutes:02d}:{seconds:02d}', True, time_color)
-                screen.blit(time_text, (WINDOW_WIDTH // 2 - time_text.get_width() // 2, 10))
-        else:
-            time_color = WHITE
+        # Draw game elements into the (possibly downscaled) gameplay layer
+        renderer.begin(BLACK)
+        renderer.draw_blits(arena_blits)
+        renderer.draw_blits(gem_field.blits())  # Under everything else
+        renderer.draw_sprites(all_sprites, blend)
+        if quality.settings["decorative_draws"]:
+            renderer.draw_sprites(particles, blend)
+            renderer.draw_blits(damage_numbers.blits())
+        renderer.present()
+
+        draw_hud(hud_state())
+
+def hud_state():
+    """Everything the gameplay HUD shows, as plain values"""
+    return HudState(
+        health=player.health,
+        max_health=player.max_health,
+        # Fraction of XP progress, not the actual width
+        xp_fraction=min(1.0, player.current_level_experience / player.experience_to_level),
+        score=player.score,
+        level=player.level,
+        time_remaining=time_remaining,
+        weapon_names=tuple(weapon.__class__.__name__.capitalize() for weapon in player.weapons),
+        weapon_index=player.current_weapon_index,
+    )
+
+def render_rows():
+    """Every sprite to draw as plain numbers, for the pipelined renderer's snapshots"""
+    rows = [(netplay.KIND_GEM, tier, 0, x, y, x, y, 0, 0, 0, 255) for _, tier, x, y in gem_field.rows()]
+    for sprite in all_sprites:
+        x, y = sprite.rect.center
+        last_x, last_y = getattr(sprite, "last_center", (x, y))
+        if isinstance(sprite, Enemy):
+            kind = NET_ENEMY_KINDS.get(sprite.__class__, netplay.KIND_BASIC)
+            rows.append((kind, 0, 0, last_x, last_y, x, y, 0, 0, 0, 255))
+        elif isinstance(sprite, Projectile):
+            r, g, b = sprite.color
+            rows.append((netplay.KIND_SHOT, 0, 0, last_x, last_y, x, y, r, g, b, 255))
+        elif isinstance(sprite, Explosion):
+            rows.append((netplay.KIND_EXPLOSION, sprite.simple, sprite.radius, x, y, x, y, 0, 0, 0, 255))
+        elif isinstance(sprite, Player):
+            rows.append((netplay.KIND_PLAYER, 0, 0, last_x, last_y, x, y, 255, 255, 255, 255))
+    if quality.settings["decorative_draws"]:
+        for sprite in particles:
+            x, y = sprite.rect.center
+            last_x, last_y = getattr(sprite, "last_center", (x, y))
+            r, g, b = sprite.color
+            rows.append((KIND_PARTICLE, 0, sprite.size, last_x, last_y, x, y, r, g, b, int(sprite.alpha)))
+        for value, level, x, y in damage_numbers.rows():
+            rows.append((KIND_DAMAGE, level, value, x, y, x, y, 255, 255, 255, 255))
+    return rows
+
+def draw_snapshot_frame(snapshot):
+    """Pipelined mode: draw a gameplay snapshot (runs on the render thread)"""
+    renderer.begin(BLACK)
+    renderer.draw_blits(arena_blits)
+    renderer.draw_blits(snapshot_images.blits(snapshot))
+    renderer.present()
+    draw_hud(snapshot.hud)
+
+def draw_hud(hud):
+    """Health, experience, score, time and weapons over the gameplay layer"""
+    # Draw health bar
+    health_width = 200
+    health_height = 20
+    health_x = 10
+    health_y = 10
+    pygame.draw.rect(screen, RED, (health_x, health_y, health_width, health_height))
+    pygame.draw.rect(screen, GREEN, (health_x, health_y, health_width * (hud.health / hud.max_health), health_height))
+
+    # Draw experience bar
+    exp_width = 200
+    exp_height = 10
+    exp_x = 10
+    exp_y = 40
+    pygame.draw.rect(screen, BLUE, (exp_x, exp_y, exp_width, exp_height))
+    pygame.draw.rect(screen, YELLOW, (exp_x, exp_y, exp_width * hud.xp_fraction, exp_height))
+
+    # Draw score and level
+    score_text = font.render(f'Score: {hud.score}', True, WHITE)
+    level_text = font.render(f'Level: {hud.level}', True, WHITE)
+    screen.blit(score_text, (WINDOW_WIDTH - 150, 10))
+    screen.blit(level_text, (WINDOW_WIDTH - 150, 40))
+
+    # Draw time remaining
+    minutes = int(hud.time_remaining // 60)
+    seconds = int(hud.time_remaining % 60)
+
+    # Change color based on time remaining
+    if hud.time_remaining <= COUNTDOWN_START:
+        time_color = RED
+        if int(hud.time_remaining) % 2 == 0:  # Blink every second
             time_text = font.render(f'Time: {minutes:02d}:{seconds:02d}', True, time_color)
             screen.blit(time_text, (WINDOW_WIDTH // 2 - time_text.get_width() // 2, 10))
-        
-        # Draw weapon display
-        weapon_y = 70
-        for i, weapon in enumerate(player.weapons):
-            # Draw weapon box
-            box_width = 150
-            box_height = 30
-            box_x = 10
-            box_y = weapon_y + (i * (box_height + 5))
-            
-            # Highlight current weapon
-            if i == player.current_weapon_index:
-                pygame.draw.rect(screen, HIGHLIGHT, (box_x, box_y, box_width, box_height), 2)
-            else:
-                pygame.draw.rect(screen, WHITE, (box_x, box_y, box_width, box_height), 1)
-            
-            # Draw weapon name and number
-            weapon_name = weapon.__class__.__name__.capitalize()
-            weapon_text = small_font.render(f"{i+1}: {weapon_name}", True, WHITE)
-            screen.blit(weapon_text, (box_x + 5, box_y + 5))
-        
-        # Draw weapon switching instructions
-        if len(player.weapons) > 1:
-            switch_text = small_font.render("Press 1-4 to switch weapons", True, WHITE)
-            screen.blit(switch_text, (WINDOW_WIDTH - 200, 70))
+    else:
+        time_color = WHITE
+        time_text = font.render(f'Time: {minutes:02d}:{seconds:02d}', True, time_color)
+        screen.blit(time_text, (WINDOW_WIDTH // 2 - time_text.get_width() // 2, 10))
+
+    # Draw weapon display
+    weapon_y = 70
+    for i, weapon_name in enumerate(hud.weapon_names):
+        # Draw weapon box
+        box_width = 150
+        box_height = 30
+        box_x = 10
+        box_y = weapon_y + (i * (box_height + 5))
+
+        # Highlight current weapon
+        if i == hud.weapon_index:
+            pygame.draw.rect(screen, HIGHLIGHT, (box_x, box_y, box_width, box_height), 2)
+        else:
+            pygame.draw.rect(screen, WHITE, (box_x, box_y, box_width, box_height), 1)
+
+        # Draw weapon name and number
+        weapon_text = small_font.render(f"{i+1}: {weapon_name}", True, WHITE)
+        screen.blit(weapon_text, (box_x + 5, box_y + 5))
+
+    # Draw weapon switching instructions
+    if len(hud.weapon_names) > 1:
+        switch_text = small_font.render("Press 1-4 to switch weapons", True, WHITE)
+        screen.blit(switch_text, (WINDOW_WIDTH - 200, 70))
+
+def menu_ready():
+    """Start can be offered once everything has loaded and the fonts actually did (buttons need them)"""
+    return assets.ready and font is not None
+
+def load_fonts():
+    pygame.font.init()
+    return pygame.font.Font(None, 36), pygame.font.Font(None, 24), pygame.font.Font(None, 72)
+
+def load_explosion_texture():
+    global explosion_texture
+    explosion_texture = pygame.image.load("resources/explosion.png").convert_alpha()
+    return explosion_texture
+
+def load_damage_digits():
+    return DigitAtlas(pygame.font.Font(None, 22))
+
+def load_sprites():
+    load_enemy_images()
+    # Pre-build the starting bazooka explosion so the first shot doesn't pay for the scale
+    get_explosion_image(100, False)
+    get_explosion_image(100, True)
+
+def init_display():
+    """Open the window; everything else loads in the background afterwards"""
+    global screen, clock, renderer
+    pygame.display.init()
+    if args.render_mode == "vsync":
+        try:
+            screen = pygame.display.set_mode((WINDOW_WIDTH, WINDOW_HEIGHT), pygame.SCALED, vsync=1)
+        except pygame.error as e:
+            print(f"Error enabling vsync: {e}")
+            args.render_mode = "60"
+    if screen is None:
+        screen = pygame.display.set_mode((WINDOW_WIDTH, WINDOW_HEIGHT))
+    pygame.display.set_caption("Vibe Survivors")
+    clock = pygame.time.Clock()  # Also starts the SDL timer used by pygame.time.get_ticks
+    renderer = ScaledRenderer(screen, args.render_scale, args.smooth_scale)
+
+def draw_loading_bar(surface, progress):
+    """Progress indicator shown on the menu until assets are loaded"""
+    bar_width = 400
+    bar_height = 12
+    bar_x = WINDOW_WIDTH // 2 - bar_width // 2
+    bar_y = WINDOW_HEIGHT // 2
+    pygame.draw.rect(surface, GRAY, (bar_x, bar_y, bar_width, bar_height), 1)
+    pygame.draw.rect(surface, WHITE, (bar_x, bar_y, int(bar_width * progress), bar_height))
+
+if __name__ == "__main__":
+    args = parser.parse_args()
+    if args.startup_report:
+        startup.add_hook(print_phase)
+    startup.mark("imports")
     
-    pygame.display.flip()
-    clock.tick(FPS)
+    if args.no_ai_lod:
+        ai_scheduler.enabled = False
+    set_arena(args.arena)
+
+    if args.quality != "auto":
+        quality = QualityGovernor(FPS, adaptive=False, level=QUALITY_NAMES.index(args.quality))
+    
+    init_display()
+    startup.mark("display")
+
+    if args.pipeline:
+        render_snapshots = SnapshotBuffers()
+        snapshot_images = SnapshotImages(get_enemy_image, get_explosion_image, get_gem_image)
+        render_pipeline = RenderPipeline(draw_snapshot_frame)
+
+    if args.telemetry:
+        telemetry = TelemetryWriter(args.telemetry)
+        combat_events.add_hook(record_combat)
+        record_startup = lambda name, duration_ms, since_start_ms: telemetry.emit(
+            "startup", phase=name, ms=round(duration_ms, 3), since_start_ms=round(since_start_ms, 3))
+        for phase in startup.phases:
+            record_startup(*phase)
+        startup.add_hook(record_startup)
+
+    if not args.no_run_db:
+        run_store = RunStore(args.run_db)
+        combat_events.add_hook(record_run_kills)
+
+    profiler = SamplingProfiler(threading.get_ident(), args.profile_dir, rolling=args.profile_slow_ms is not None)
+    profile_pending = args.profile_seconds is not None  # Starts with the first gameplay frame
+
+    gc_manager = GCManager(args.gc_mode)
+    if args.metrics_port is not None:
+        metrics = GameMetrics()
+        combat_events.add_hook(metrics.record_combat)
+        gc_manager.add_hook(metrics.record_gc)
+        try:
+            metrics_server = MetricsServer(metrics, args.metrics_port)
+            print(f"Serving metrics on http://127.0.0.1:{metrics_server.port}/metrics")
+        except OSError as e:
+            print(f"Error starting metrics server: {e}")
+    if telemetry.enabled:
+        gc_manager.add_hook(lambda frame, generation, ms, collected, reason: telemetry.emit(
+            "gc_pause", frame=frame, generation=generation, ms=round(ms, 3), collected=collected, reason=reason))
+    
+    # Fonts first so the menu title shows up as early as possible
+    assets.add("fonts", load_fonts)
+    assets.add("explosion", load_explosion_texture)
+    assets.add("damage_digits", load_damage_digits)
+    assets.add("sprites", load_sprites)
+    assets.start()
+
+    if args.join:
+        # Co-op client: no local simulation, just input out and snapshots in
+        join_host, _, join_port = args.join.partition(":")
+        assets.wait()
+        if not assets.has("fonts"):
+            print("Error: can't join without fonts")
+            pygame.quit()
+            sys.exit(1)
+        font, small_font, title_font = assets.get("fonts")
+        netplay.run_client(screen, clock, (font, small_font), join_host,
+                           int(join_port) if join_port else netplay.DEFAULT_PORT, FPS,
+                           args.net_latency, args.net_jitter, args.net_loss, arena_obstacles)
+        pygame.quit()
+        sys.exit()
+
+    if args.host:
+        coop_host = netplay.CoopHost(args.host, add_remote_player, remove_remote_player,
+                                     args.net_latency, args.net_jitter, args.net_loss)
+        print(f"Hosting co-op on UDP port {args.host}")
+    first_frame = True
+    last_sample_time = 0.0
+
+    # Gameplay runs on its own clock, advanced one fixed tick at a time
+    sim_clock = gameclock.VirtualClock(wait=True)
+    gameclock.use_clock(sim_clock)
+    game_start_time = sim_clock.now()
+    accumulator = 0.0  # Real time not yet simulated
+    frame_cap = RENDER_MODES[args.render_mode]
+    
+    # Game loop
+    running = True
+    last_frame = time.perf_counter()
+
+    while running:
+        # Calculate time at the start of each frame
+        frame_start = time.perf_counter()
+        frame_seconds = min(frame_start - last_frame, MAX_TICKS_PER_FRAME * TICK_SECONDS)
+        last_frame = frame_start
+        frame_stalled = False
+        update_time()
+        gc_manager.begin_frame(game_state == PLAYING)
+
+        mouse_pos = pygame.mouse.get_pos()
+        mouse_clicked = False
+
+        if coop_host:
+            coop_host.poll()
+
+        # Pick up fonts as soon as the loader has them
+        if font is None and assets.has("fonts"):
+            font, small_font, title_font = assets.get("fonts")
+        if damage_numbers.atlas is None and assets.has("damage_digits"):
+            damage_numbers.atlas = assets.get("damage_digits")
+            if snapshot_images:
+                snapshot_images.digit_atlas = damage_numbers.atlas
+        # Everything loaded at startup lives for the whole session; keep it out of every future collection
+        if assets.ready:
+            gc_manager.freeze()
+            # Nothing moving on screen: build spare enemies so spawning later is cheap
+            if game_state != PLAYING:
+                enemy_pool.prewarm()
+
+        # Event handling
+        for event in pygame.event.get():
+            if event.type == pygame.QUIT:
+                running = False
+            elif event.type == pygame.MOUSEBUTTONDOWN:
+                mouse_clicked = True
+            elif event.type == pygame.KEYDOWN:
+                if event.key == pygame.K_ESCAPE:
+                    if game_state == PLAYING:
+                        game_state = PAUSED
+                    elif game_state == PAUSED:
+                        game_state = PLAYING
+                elif event.key == pygame.K_r and game_state == GAME_OVER:
+                    reset_game()
+                elif event.key == pygame.K_F9 and not profiler.capturing:
+                    profiler.capture(args.profile_seconds or 5, profile_metadata("hotkey"))
+                    print("Profiling...")
+
+        # Handle menu
+        if game_state == MENU:
+            start_button.check_hover(mouse_pos)
+            quit_button.check_hover(mouse_pos)
+
+            if mouse_clicked and menu_ready():
+                if start_button.is_clicked(mouse_pos, mouse_clicked):
+                    reset_game()
+                elif quit_button.is_clicked(mouse_pos, mouse_clicked):
+                    running = False
+
+        # Handle game over
+        elif game_state == GAME_OVER:
+            if mouse_clicked:
+                reset_game()
+
+        # Handle victory
+        elif game_state == VICTORY:
+            if mouse_clicked:
+                reset_game()
+
+        # Handle upgrades
+        elif game_state == UPGRADING:
+            for button in upgrade_buttons:
+                button.check_hover(mouse_pos)
+                if button.is_clicked(mouse_pos, mouse_clicked):
+                    choose_upgrade(button.option)
+                    break
+            else:
+                # Handle keyboard selection for upgrades
+                keys = pygame.key.get_pressed()
+                if keys[pygame.K_1] and len(upgrade_buttons) > 0:
+                    choose_upgrade(upgrade_buttons[0].option)
+                elif keys[pygame.K_2] and len(upgrade_buttons) > 1:
+                    choose_upgrade(upgrade_buttons[1].option)
+                elif keys[pygame.K_3] and len(upgrade_buttons) > 2:
+                    choose_upgrade(upgrade_buttons[2].option)
+
+        # Gameplay: as many fixed ticks as the real time since the last frame calls for
+        if game_state in (PLAYING, VICTORY):
+            accumulator += frame_seconds
+            firing = pygame.mouse.get_pressed()[0]
+            while accumulator >= TICK_SECONDS:
+                accumulator -= TICK_SECONDS
+                remember_positions()
+                update_time()
+                if game_state == PLAYING:
+                    update_playing(mouse_pos, firing)
+                elif game_state == VICTORY:
+                    update_victory()
+                else:
+                    break  # Level-up or game over; the rest of this frame's time is dropped
+                sim_clock.advance(TICK_SECONDS)
+        else:
+            accumulator = 0.0
+
+        blend = accumulator / TICK_SECONDS if game_state == PLAYING else 1.0
+        if render_pipeline and game_state == PLAYING:
+            # Capture this frame, show the one the render thread just finished, then hand it the new one
+            snapshot = render_snapshots.capture(render_rows(), blend, hud_state())
+            render_pipeline.wait()
+            pygame.display.flip()
+            render_pipeline.submit(snapshot)
+        else:
+            if render_pipeline:
+                render_pipeline.wait()
+            draw_frame(blend)
+            pygame.display.flip()
+        if coop_host:
+            coop_host.broadcast(net_entities(), {
+                "score": player.score if player else 0,
+                "level": player.level if player else 1,
+                "time_remaining": int(time_remaining),
+                "state": game_state,
+            })
+        if first_frame:
+            startup.mark("first_frame")
+            first_frame = False
+
+        # Feed the quality governor with the time the frame actually took to produce
+        if game_state == PLAYING and not frame_stalled:
+            frame_ms = (time.perf_counter() - frame_start) * 1000
+            quality.record(frame_ms)
+            gc_manager.end_frame(frame_ms, quality.budget_ms)
+            if metrics:
+                metrics.record_frame(frame_ms)
+            if profile_pending:
+                profiler.capture(args.profile_seconds, profile_metadata("start"))
+                profile_pending = False
+            if args.profile_slow_ms is not None and frame_ms > args.profile_slow_ms:
+                profiler.dump_window(profile_metadata("slow_frame", frame_ms))
+            if telemetry.enabled:
+                second_frame_ms.append(frame_ms)
+                if frame_ms > quality.budget_ms * 2:
+                    telemetry.emit("frame_spike", ms=round(frame_ms, 3), t=round(elapsed_time, 2),
+                                   enemies=len(enemies), all_sprites=len(all_sprites),
+                                   gc_ms=round(gc_manager.frame_pause_ms, 3))
+                # elapsed_time starts again from zero on a new run
+                if elapsed_time - last_sample_time >= 1.0 or elapsed_time < last_sample_time:
+                    record_sample()
+                    last_sample_time = elapsed_time
+        if metrics:
+            metrics.publish_due(metrics_snapshot)
+        if frame_stalled:
+            last_frame = time.perf_counter()  # Don't fast-forward through a warning
+        clock.tick(frame_cap)
 
-pygame.quit()
-sys.exit() 
\ No newline at end of file
+    if args.gc_report:
+        for generation, totals in gc_manager.stats().items():
+            print(f"GC {generation}: {totals['count']} collections, {totals['total_ms']:.1f} ms total, "
+                  f"{totals['max_ms']:.2f} ms max")
+    if render_pipeline:
+        render_pipeline.close()
+    gc_manager.close()
+    telemetry.close()
+    if run_store:
+        run_store.close()
+    if metrics_server:
+        metrics_server.close()
+    profiler.close()
+    if coop_host:
+        coop_host.close()
+    pygame.quit()
+    sys.exit() 
\ No newline at end of file
@@ -0,0 +1,142 @@
+import bisect
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Upper bounds of the frame time histogram buckets, in seconds
+FRAME_SECONDS_BUCKETS = (0.004, 0.008, 0.012, 0.0167, 0.02, 0.025, 0.0333, 0.05, 0.1, 0.25)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+class GameMetrics:
+    """Counters gathered on the game thread and published as a Prometheus text page.
+
+    Everything is counted on the game thread. publish() renders the whole page
+    and replaces `page` in a single assignment, so the server thread only ever
+    reads a finished bytes object and never touches game state.
+    """
+
+    def __init__(self, buckets=FRAME_SECONDS_BUCKETS, interval=1.0):
+        self.buckets = buckets
+        self.interval = interval  # Seconds between published snapshots
+        self.frame_counts = [0] * (len(buckets) + 1)  # Last slot is +Inf
+        self.frame_seconds = 0.0
+        self.spawns = 0
+        self.kills = 0
+        self.gc_pauses = {}  # generation -> [count, seconds]
+        self.page = b""
+        self._published_at = None
+        self._published_spawns = 0
+        self._published_kills = 0
+
+    def record_frame(self, frame_ms):
+        seconds = frame_ms / 1000
+        self.frame_counts[bisect.bisect_left(self.buckets, seconds)] += 1
+        self.frame_seconds += seconds
+
+    def record_spawns(self, count=1):
+        self.spawns += count
+
+    def record_combat(self, result):
+        """Combat hook"""
+        self.kills += len(result["kills"])
+
+    def record_gc(self, frame, generation, ms, collected, reason):
+        """GCManager hook; can run on whichever thread triggered the collection"""
+        totals = self.gc_pauses.setdefault(generation, [0, 0.0])
+        totals[0] += 1
+        totals[1] += ms / 1000
+
+    def publish_due(self, snapshot):
+        """Publish if the last page is older than the interval; snapshot() -> (gauges, groups) is only called then"""
+        now = time.perf_counter()
+        if self._published_at is None or now - self._published_at >= self.interval:
+            gauges, groups = snapshot()
+            self.publish(gauges, groups, now)
+
+    def publish(self, gauges, groups, now=None):
+        """Render a new page.
+
+        gauges: {name: value}, each exported as game_<name>
+        groups: {sprite group name: entity count}, exported as game_entities{group="..."}
+        """
+        now = time.perf_counter() if now is None else now
+        elapsed = now - self._published_at if self._published_at is not None else 0.0
+        spawn_rate = (self.spawns - self._published_spawns) / elapsed if elapsed > 0 else 0.0
+        kill_rate = (self.kills - self._published_kills) / elapsed if elapsed > 0 else 0.0
+        self._published_at = now
+        self._published_spawns = self.spawns
+        self._published_kills = self.kills
+
+        lines = []
+        for name, value in gauges.items():
+            lines.append(f"# TYPE game_{name} gauge")
+            lines.append(f"game_{name} {value}")
+        lines.append("# TYPE game_entities gauge")
+        for group, count in groups.items():
+            lines.append(f'game_entities{{group="{group}"}} {count}')
+
+        lines.append("# HELP game_frame_seconds Time spent producing each gameplay frame, not counting the frame cap wait")
+        lines.append("# TYPE game_frame_seconds histogram")
+        cumulative = 0
+        for bound, count in zip(self.buckets, self.frame_counts):
+            cumulative += count
+            lines.append(f'game_frame_seconds_bucket{{le="{bound}"}} {cumulative}')
+        cumulative += self.frame_counts[-1]
+        lines.append(f'game_frame_seconds_bucket{{le="+Inf"}} {cumulative}')
+        lines.append(f"game_frame_seconds_sum {self.frame_seconds:.6f}")
+        lines.append(f"game_frame_seconds_count {cumulative}")
+
+        lines.append("# TYPE game_spawns_total counter")
+        lines.append(f"game_spawns_total {self.spawns}")
+        lines.append("# TYPE game_kills_total counter")
+        lines.append(f"game_kills_total {self.kills}")
+        lines.append("# TYPE game_spawns_per_second gauge")
+        lines.append(f"game_spawns_per_second {spawn_rate:.3f}")
+        lines.append("# TYPE game_kills_per_second gauge")
+        lines.append(f"game_kills_per_second {kill_rate:.3f}")
+
+        lines.append("# TYPE game_gc_pauses_total counter")
+        for generation, (count, _) in sorted(self.gc_pauses.items()):
+            lines.append(f'game_gc_pauses_total{{generation="{generation}"}} {count}')
+        lines.append("# TYPE game_gc_pause_seconds_total counter")
+        for generation, (_, seconds) in sorted(self.gc_pauses.items()):
+            lines.append(f'game_gc_pause_seconds_total{{generation="{generation}"}} {seconds:.6f}')
+
+        self.page = ("\n".join(lines) + "\n").encode("utf-8")
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?")[0] != "/metrics":
+            self.send_error(404)
+            return
+        page = self.server.metrics.page
+        self.send_response(200)
+        self.send_header("Content-Type", CONTENT_TYPE)
+        self.send_header("Content-Length", str(len(page)))
+        self.end_headers()
+        self.wfile.write(page)
+
+    def log_message(self, format, *args):
+        pass  # Scrapes every few seconds would flood the console
+
+
+class MetricsServer:
+    """Serves GameMetrics.page at http://host:port/metrics from a background thread"""
+
+    def __init__(self, metrics, port, host="127.0.0.1"):
+        self.httpd = ThreadingHTTPServer((host, port), _MetricsHandler)
+        self.httpd.daemon_threads = True
+        self.httpd.metrics = metrics
+        self._thread = threading.Thread(target=self.httpd.serve_forever, name="metrics-server", daemon=True)
+        self._thread.start()
+
+    @property
+    def port(self):
+        return self.httpd.server_address[1]
+
+    def close(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
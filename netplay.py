@@ -0,0 +1,619 @@
+"""Co-op over UDP: the host runs the real game loop, clients send input and draw snapshots.
+
+Snapshots are quantised (half-pixel int16 positions, 0-100 health) and delta
+encoded against the last snapshot the client acknowledged, so a quiet frame
+costs a few bytes. Each client only receives entities near its own player.
+"""
+import heapq
+import random
+import socket
+import struct
+import time
+import zlib
+
+import pygame
+
+from enemies import get_enemy_image
+from flowfield import obstacle_blits
+from gems import get_gem_image
+
+DEFAULT_PORT = 47777
+MAX_PLAYERS = 4
+SNAPSHOT_RATE = 30  # Snapshots per second sent to each client
+INTEREST_RADIUS = 1000  # Entities further than this from a client's player aren't sent to it
+MAX_SNAPSHOT_ENTITIES = 800  # Nearest first if there are more than this in range
+HISTORY = 64  # Snapshots kept per client as delta baselines
+CLIENT_TIMEOUT = 5.0  # Seconds of silence before a client is dropped
+INTERP_DELAY_MS = 100  # Clients draw this far behind the newest snapshot
+COMPRESS_MIN_BYTES = 256
+
+# Message types
+HELLO = 1
+WELCOME = 2
+INPUT = 3
+SNAPSHOT = 4
+BYE = 5
+
+MAGIC = 0x56  # 'V'
+
+# Entity kinds
+KIND_PLAYER = 0
+KIND_BASIC = 1
+KIND_FAST = 2
+KIND_TANK = 3
+KIND_RANGED = 4
+KIND_MINI_BOSS = 5
+KIND_SHOT = 6
+KIND_ENEMY_SHOT = 7
+KIND_EXPLOSION = 8
+KIND_GEM = 9  # extra is the gem tier
+
+ENEMY_KIND_IMAGES = {
+    KIND_BASIC: "basic",
+    KIND_FAST: "fast",
+    KIND_TANK: "tank",
+    KIND_RANGED: "ranged",
+    KIND_MINI_BOSS: "mini_boss",
+}
+
+# Input buttons
+BUTTON_UP = 1
+BUTTON_DOWN = 2
+BUTTON_LEFT = 4
+BUTTON_RIGHT = 8
+BUTTON_FIRE = 16
+
+HEADER = struct.Struct("!BB")
+WELCOME_FORMAT = struct.Struct("!H")
+INPUT_FORMAT = struct.Struct("!IIBhhB")
+SNAPSHOT_HEADER = struct.Struct("!IIIHhHIHHBB")
+COUNTS = struct.Struct("!HH")
+RECORD = struct.Struct("!HBhhH")
+REMOVED_ID = struct.Struct("!H")
+
+
+def quantize(value):
+    """World pixels to half-pixel int16"""
+    return max(-32768, min(32767, int(round(value * 2))))
+
+
+def dequantize(value):
+    return value * 0.5
+
+
+class LossyLink:
+    """UDP socket wrapper that can add latency, jitter and packet loss for local testing"""
+
+    def __init__(self, sock, latency_ms=0, jitter_ms=0, loss=0.0, seed=None):
+        self.sock = sock
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.loss = loss
+        self.rng = random.Random(seed)
+        self.pending = []
+        self.counter = 0
+        self.sent_packets = 0
+        self.sent_bytes = 0
+        self.dropped_packets = 0
+
+    def sendto(self, data, address):
+        self.sent_packets += 1
+        self.sent_bytes += len(data)
+        if self.loss and self.rng.random() < self.loss:
+            self.dropped_packets += 1
+            return
+        delay = self.latency_ms + (self.rng.uniform(-self.jitter_ms, self.jitter_ms) if self.jitter_ms else 0)
+        if delay <= 0:
+            self._send(data, address)
+            return
+        self.counter += 1
+        heapq.heappush(self.pending, (time.perf_counter() + delay / 1000.0, self.counter, data, address))
+
+    def pump(self):
+        """Send delayed packets that are due"""
+        now = time.perf_counter()
+        while self.pending and self.pending[0][0] <= now:
+            _, _, data, address = heapq.heappop(self.pending)
+            self._send(data, address)
+
+    def flush(self):
+        """Send everything still held back, ignoring the simulated delay"""
+        while self.pending:
+            _, _, data, address = heapq.heappop(self.pending)
+            self._send(data, address)
+
+    def receive(self):
+        """All datagrams waiting on the socket, as (data, address)"""
+        packets = []
+        while True:
+            try:
+                packets.append(self.sock.recvfrom(65535))
+            except (BlockingIOError, InterruptedError):
+                return packets
+            except ConnectionResetError:
+                # Windows reports ICMP port unreachable on the next recv; just skip it
+                continue
+
+    def _send(self, data, address):
+        try:
+            self.sock.sendto(data, address)
+        except OSError:
+            pass
+
+    def close(self):
+        self.sock.close()
+
+
+def open_link(bind_address, latency_ms=0, jitter_ms=0, loss=0.0):
+    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    sock.setblocking(False)
+    sock.bind(bind_address)
+    return LossyLink(sock, latency_ms, jitter_ms, loss)
+
+
+# Snapshot encoding
+
+def encode_snapshot(seq, baseline_seq, baseline, entities, hud):
+    """Pack entities (id -> (kind, qx, qy, extra)) as a delta against baseline (same shape, or None)"""
+    changed = []
+    if baseline is None:
+        baseline_seq = 0
+        changed = list(entities.items())
+        removed = []
+    else:
+        for entity_id, record in entities.items():
+            if baseline.get(entity_id) != record:
+                changed.append((entity_id, record))
+        removed = [entity_id for entity_id in baseline if entity_id not in entities]
+
+    body = [COUNTS.pack(len(changed), len(removed))]
+    for entity_id, (kind, qx, qy, extra) in changed:
+        body.append(RECORD.pack(entity_id, kind, qx, qy, extra))
+    for entity_id in removed:
+        body.append(REMOVED_ID.pack(entity_id))
+    body = b"".join(body)
+
+    flags = 0
+    if len(body) >= COMPRESS_MIN_BYTES:
+        compressed = zlib.compress(body, 1)
+        if len(compressed) < len(body):
+            body = compressed
+            flags |= 1
+
+    header = SNAPSHOT_HEADER.pack(seq, baseline_seq, hud["server_ms"], hud["you"], hud["health"],
+                                  hud["max_health"], hud["score"], hud["level"], hud["time_remaining"],
+                                  hud["state"], flags)
+    return HEADER.pack(MAGIC, SNAPSHOT) + header + body
+
+
+def decode_snapshot(payload, baselines):
+    """Rebuild (seq, entities, hud) from a snapshot packet; None if its baseline is unknown"""
+    (seq, baseline_seq, server_ms, you, health, max_health, score, level, time_remaining,
+     state, flags) = SNAPSHOT_HEADER.unpack_from(payload)
+    body = payload[SNAPSHOT_HEADER.size:]
+    if flags & 1:
+        body = zlib.decompress(body)
+
+    if baseline_seq == 0:
+        entities = {}
+    elif baseline_seq in baselines:
+        entities = dict(baselines[baseline_seq])
+    else:
+        return None
+
+    changed_count, removed_count = COUNTS.unpack_from(body)
+    offset = COUNTS.size
+    for _ in range(changed_count):
+        entity_id, kind, qx, qy, extra = RECORD.unpack_from(body, offset)
+        entities[entity_id] = (kind, qx, qy, extra)
+        offset += RECORD.size
+    for _ in range(removed_count):
+        (entity_id,) = REMOVED_ID.unpack_from(body, offset)
+        entities.pop(entity_id, None)
+        offset += REMOVED_ID.size
+
+    hud = {
+        "server_ms": server_ms,
+        "you": you,
+        "health": health,
+        "max_health": max_health,
+        "score": score,
+        "level": level,
+        "time_remaining": time_remaining,
+        "state": state,
+    }
+    return seq, entities, hud
+
+
+def encode_input(seq, ack, buttons, aim_x, aim_y, weapon_slot):
+    aim_x = max(-32768, min(32767, int(aim_x)))
+    aim_y = max(-32768, min(32767, int(aim_y)))
+    return HEADER.pack(MAGIC, INPUT) + INPUT_FORMAT.pack(seq, ack, buttons, aim_x, aim_y, weapon_slot)
+
+
+class RemoteKeys:
+    """Looks like pygame.key.get_pressed() but is driven by a remote player's buttons"""
+
+    def __init__(self):
+        self.pressed = set()
+
+    def __getitem__(self, key):
+        return key in self.pressed
+
+
+class RemoteControls:
+    """Latest input received from one client"""
+
+    BUTTON_KEYS = {
+        BUTTON_UP: pygame.K_w,
+        BUTTON_DOWN: pygame.K_s,
+        BUTTON_LEFT: pygame.K_a,
+        BUTTON_RIGHT: pygame.K_d,
+    }
+    SLOT_KEYS = [None, pygame.K_1, pygame.K_2, pygame.K_3, pygame.K_4]
+
+    def __init__(self):
+        self.keys = RemoteKeys()
+        self.seq = 0
+        self.fire = False
+        self.aim = (0, 0)
+
+    def apply(self, seq, buttons, aim_x, aim_y, weapon_slot):
+        if seq <= self.seq:
+            return  # Older than what we already have (reordered datagram)
+        self.seq = seq
+        pressed = {key for button, key in self.BUTTON_KEYS.items() if buttons & button}
+        if 0 < weapon_slot < len(self.SLOT_KEYS):
+            pressed.add(self.SLOT_KEYS[weapon_slot])
+        self.keys.pressed = pressed
+        self.fire = bool(buttons & BUTTON_FIRE)
+        self.aim = (aim_x, aim_y)
+
+
+class ClientSlot:
+    def __init__(self, address, player, net_id):
+        self.address = address
+        self.player = player
+        self.net_id = net_id
+        self.controls = RemoteControls()
+        self.acked = 0
+        self.history = {}
+        self.last_heard = time.perf_counter()
+
+
+class CoopHost:
+    """Authoritative side: accepts clients, applies their input, sends them snapshots"""
+
+    def __init__(self, port=DEFAULT_PORT, create_player=None, remove_player=None,
+                 latency_ms=0, jitter_ms=0, loss=0.0):
+        self.link = open_link(("0.0.0.0", port), latency_ms, jitter_ms, loss)
+        self.create_player = create_player
+        self.remove_player = remove_player
+        self.clients = {}
+        self.seq = 0
+        self.started = time.perf_counter()
+        self.last_broadcast = 0.0
+        self._ids = {}  # Entity key -> net id, for everything in the last broadcast
+        self._next_id = 1
+
+    def net_id(self, key):
+        """Net id of an entity; key is its sprite, or a hashable stand-in for things without one"""
+        entity_id = self._ids.get(key)
+        if entity_id is None:
+            entity_id = self._next_id
+            self._next_id = self._next_id % 65535 + 1
+            self._ids[key] = entity_id
+        return entity_id
+
+    def poll(self):
+        """Handle joins, inputs and timeouts; call once per frame"""
+        self.link.pump()
+        now = time.perf_counter()
+        for data, address in self.link.receive():
+            if len(data) < HEADER.size:
+                continue
+            magic, kind = HEADER.unpack_from(data)
+            if magic != MAGIC:
+                continue
+            client = self.clients.get(address)
+
+            if kind == HELLO:
+                if client is None:
+                    if len(self.clients) >= MAX_PLAYERS - 1:
+                        continue
+                    player = self.create_player()
+                    client = ClientSlot(address, player, self.net_id(player))
+                    player.controls = client.controls
+                    self.clients[address] = client
+                    print(f"Co-op player joined from {address[0]}:{address[1]}")
+                client.last_heard = now
+                # Resent on every HELLO in case the previous WELCOME was lost
+                self.link.sendto(HEADER.pack(MAGIC, WELCOME) + WELCOME_FORMAT.pack(client.net_id), address)
+            elif kind == INPUT and client is not None:
+                seq, ack, buttons, aim_x, aim_y, weapon_slot = INPUT_FORMAT.unpack_from(data, HEADER.size)
+                client.controls.apply(seq, buttons, aim_x, aim_y, weapon_slot)
+                client.acked = max(client.acked, ack)
+                client.last_heard = now
+            elif kind == BYE and client is not None:
+                self._drop(client)
+
+        for client in list(self.clients.values()):
+            if now - client.last_heard > CLIENT_TIMEOUT:
+                self._drop(client)
+
+    def _drop(self, client):
+        print(f"Co-op player left ({client.address[0]}:{client.address[1]})")
+        del self.clients[client.address]
+        if self.remove_player:
+            self.remove_player(client.player)
+
+    def broadcast(self, entities, hud):
+        """Send every client its snapshot; entities is a list of (key, kind, x, y, extra), key as for net_id()"""
+        if not self.clients:
+            return
+        now = time.perf_counter()
+        if now - self.last_broadcast < 1.0 / SNAPSHOT_RATE:
+            return
+        self.last_broadcast = now
+        self.seq += 1
+
+        hud = dict(hud)
+        hud["server_ms"] = int((now - self.started) * 1000) & 0xFFFFFFFF
+        records = [(self.net_id(key), kind, x, y, max(0, min(65535, int(extra))))
+                   for key, kind, x, y, extra in entities]
+        # Forget whatever is gone, so its key can't hand a stale id to something new
+        self._ids = {key: self._ids[key] for key, _, _, _, _ in entities}
+
+        for client in self.clients.values():
+            player = client.player
+            px, py = player.rect.center
+            radius_sq = INTEREST_RADIUS * INTEREST_RADIUS
+            nearby = []
+            for entity_id, kind, x, y, extra in records:
+                dist_sq = (x - px) * (x - px) + (y - py) * (y - py)
+                if kind == KIND_PLAYER or dist_sq <= radius_sq:
+                    nearby.append((0 if kind == KIND_PLAYER else dist_sq, entity_id, kind, x, y, extra))
+            if len(nearby) > MAX_SNAPSHOT_ENTITIES:
+                nearby.sort(key=lambda item: item[0])
+                del nearby[MAX_SNAPSHOT_ENTITIES:]
+            snapshot = {entity_id: (kind, quantize(x), quantize(y), extra)
+                        for _, entity_id, kind, x, y, extra in nearby}
+
+            client_hud = dict(hud)
+            client_hud["you"] = client.net_id
+            client_hud["health"] = max(-32768, min(32767, int(player.health)))
+            client_hud["max_health"] = int(player.max_health)
+
+            baseline = client.history.get(client.acked)
+            packet = encode_snapshot(self.seq, client.acked if baseline is not None else 0, baseline,
+                                     snapshot, client_hud)
+            client.history[self.seq] = snapshot
+            # Forget baselines the client can no longer ask for
+            stale = self.seq - HISTORY
+            if stale in client.history:
+                del client.history[stale]
+            self.link.sendto(packet, client.address)
+        self.link.pump()
+
+    def close(self):
+        for client in self.clients.values():
+            self.link.sendto(HEADER.pack(MAGIC, BYE), client.address)
+        self.link.flush()
+        self.link.close()
+
+
+class CoopClient:
+    """Sends local input to the host and keeps an interpolation buffer of snapshots"""
+
+    def __init__(self, host, port=DEFAULT_PORT, latency_ms=0, jitter_ms=0, loss=0.0):
+        self.address = (socket.gethostbyname(host), port)
+        self.link = open_link(("0.0.0.0", 0), latency_ms, jitter_ms, loss)
+        self.net_id = None
+        self.input_seq = 0
+        self.latest_seq = 0
+        self.baselines = {}
+        self.buffer = []  # (server_ms, entities, hud), oldest first
+        self.clock_offset = None
+        self.last_hello = 0.0
+        self.last_heard = time.perf_counter()
+        self.received_bytes = 0
+        self.host_left = False
+
+    def local_ms(self):
+        return time.perf_counter() * 1000
+
+    def poll(self):
+        self.link.pump()
+        now = time.perf_counter()
+        if self.net_id is None and now - self.last_hello > 0.25:
+            self.link.sendto(HEADER.pack(MAGIC, HELLO), self.address)
+            self.last_hello = now
+
+        for data, address in self.link.receive():
+            if address != self.address or len(data) < HEADER.size:
+                continue
+            magic, kind = HEADER.unpack_from(data)
+            if magic != MAGIC:
+                continue
+            self.last_heard = now
+            self.received_bytes += len(data)
+            if kind == WELCOME:
+                (self.net_id,) = WELCOME_FORMAT.unpack_from(data, HEADER.size)
+            elif kind == SNAPSHOT:
+                self._receive_snapshot(data[HEADER.size:])
+            elif kind == BYE:
+                self.host_left = True
+
+    def _receive_snapshot(self, payload):
+        decoded = decode_snapshot(payload, self.baselines)
+        if decoded is None:
+            return
+        seq, entities, hud = decoded
+        self.baselines[seq] = entities
+        for old in [s for s in self.baselines if s < seq - HISTORY]:
+            del self.baselines[old]
+        if seq <= self.latest_seq:
+            return  # Late arrival: good as a baseline, too old to draw
+        self.latest_seq = seq
+
+        # Track the host clock against ours; the smallest apparent delay is the best estimate
+        offset = hud["server_ms"] - self.local_ms()
+        if self.clock_offset is None or offset > self.clock_offset:
+            self.clock_offset = offset
+        else:
+            # Drift slowly towards newer samples so a single lucky packet doesn't stick forever
+            self.clock_offset += (offset - self.clock_offset) * 0.01
+
+        self.buffer.append((hud["server_ms"], entities, hud))
+        if len(self.buffer) > 32:
+            del self.buffer[0]
+
+    def send_input(self, buttons, aim, weapon_slot):
+        if self.net_id is None:
+            return
+        self.input_seq += 1
+        self.link.sendto(encode_input(self.input_seq, self.latest_seq, buttons, aim[0], aim[1], weapon_slot),
+                         self.address)
+
+    def render_state(self):
+        """Entities (id -> (kind, x, y, extra)) interpolated to INTERP_DELAY_MS in the past, plus HUD"""
+        if not self.buffer:
+            return None, None
+        render_ms = self.local_ms() + self.clock_offset - INTERP_DELAY_MS
+        newest_ms, newest, hud = self.buffer[-1]
+
+        older = None
+        newer = None
+        for snapshot in self.buffer:
+            if snapshot[0] <= render_ms:
+                older = snapshot
+            else:
+                newer = snapshot
+                break
+        if older is None:
+            older = self.buffer[0]
+        if newer is None:
+            # Nothing newer to blend towards; hold the latest state
+            return _dequantized(older[1]), hud
+
+        span = newer[0] - older[0]
+        alpha = 0.0 if span <= 0 else max(0.0, min(1.0, (render_ms - older[0]) / span))
+        blended = {}
+        for entity_id, (kind, qx, qy, extra) in newer[1].items():
+            previous = older[1].get(entity_id)
+            if previous is not None and previous[0] == kind:
+                qx = previous[1] + (qx - previous[1]) * alpha
+                qy = previous[2] + (qy - previous[2]) * alpha
+            blended[entity_id] = (kind, dequantize(qx), dequantize(qy), extra)
+        return blended, hud
+
+    def close(self):
+        self.link.sendto(HEADER.pack(MAGIC, BYE), self.address)
+        self.link.flush()
+        self.link.close()
+
+
+def _dequantized(entities):
+    return {entity_id: (kind, dequantize(qx), dequantize(qy), extra)
+            for entity_id, (kind, qx, qy, extra) in entities.items()}
+
+
+def read_buttons(keys, mouse_buttons):
+    buttons = 0
+    if keys[pygame.K_w] or keys[pygame.K_UP]:
+        buttons |= BUTTON_UP
+    if keys[pygame.K_s] or keys[pygame.K_DOWN]:
+        buttons |= BUTTON_DOWN
+    if keys[pygame.K_a] or keys[pygame.K_LEFT]:
+        buttons |= BUTTON_LEFT
+    if keys[pygame.K_d] or keys[pygame.K_RIGHT]:
+        buttons |= BUTTON_RIGHT
+    if mouse_buttons[0]:
+        buttons |= BUTTON_FIRE
+    return buttons
+
+
+def read_weapon_slot(keys):
+    for slot, key in enumerate((pygame.K_1, pygame.K_2, pygame.K_3, pygame.K_4), start=1):
+        if keys[key]:
+            return slot
+    return 0
+
+
+def draw_snapshot(surface, entities, you, fonts):
+    """Draw an interpolated snapshot the same way the host draws its sprites"""
+    font, small_font = fonts
+    # Gems first, under everything else like on the host
+    for kind, x, y, extra in entities.values():
+        if kind == KIND_GEM:
+            image = get_gem_image(extra)
+            surface.blit(image, image.get_rect(center=(x, y)))
+    for entity_id, (kind, x, y, extra) in entities.items():
+        if kind == KIND_PLAYER:
+            rect = pygame.Rect(0, 0, 30, 30)
+            rect.center = (x, y)
+            pygame.draw.rect(surface, (255, 255, 255), rect)
+            if entity_id == you:
+                pygame.draw.rect(surface, (0, 255, 0), rect.inflate(6, 6), 2)
+        elif kind in ENEMY_KIND_IMAGES:
+            image = get_enemy_image(ENEMY_KIND_IMAGES[kind])
+            surface.blit(image, image.get_rect(center=(x, y)))
+        elif kind == KIND_SHOT:
+            surface.fill((255, 255, 0), (x - 5, y - 5, 10, 10))
+        elif kind == KIND_ENEMY_SHOT:
+            surface.fill((0, 0, 255), (x - 5, y - 5, 10, 10))
+        elif kind == KIND_EXPLOSION:
+            pygame.draw.circle(surface, (255, 100, 0), (int(x), int(y)), max(1, extra), 2)
+
+
+def run_client(screen, clock, fonts, host, port=DEFAULT_PORT, fps=60, latency_ms=0, jitter_ms=0, loss=0.0,
+               obstacles=()):
+    """Client main loop: no simulation, just input out and interpolated snapshots in"""
+    font, small_font = fonts
+    walls = obstacle_blits(obstacles)  # The arena layout is static, so it isn't sent
+    client = CoopClient(host, port, latency_ms, jitter_ms, loss)
+    width, height = screen.get_size()
+    running = True
+    while running:
+        for event in pygame.event.get():
+            if event.type == pygame.QUIT:
+                running = False
+
+        client.poll()
+        keys = pygame.key.get_pressed()
+        client.send_input(read_buttons(keys, pygame.mouse.get_pressed()), pygame.mouse.get_pos(),
+                          read_weapon_slot(keys))
+
+        screen.fill((0, 0, 0))
+        entities, hud = client.render_state()
+        if client.host_left or time.perf_counter() - client.last_heard > CLIENT_TIMEOUT:
+            text = font.render("Host disconnected", True, (255, 0, 0))
+            screen.blit(text, (width // 2 - text.get_width() // 2, height // 2))
+        elif entities is None:
+            text = font.render(f"Connecting to {host}:{port}...", True, (255, 255, 255))
+            screen.blit(text, (width // 2 - text.get_width() // 2, height // 2))
+        else:
+            screen.blits(walls, doreturn=False)
+            draw_snapshot(screen, entities, hud["you"], fonts)
+            # HUD
+            pygame.draw.rect(screen, (255, 0, 0), (10, 10, 200, 20))
+            if hud["max_health"] > 0:
+                health_ratio = max(0.0, min(1.0, hud["health"] / hud["max_health"]))
+                pygame.draw.rect(screen, (0, 255, 0), (10, 10, 200 * health_ratio, 20))
+            score_text = font.render(f'Score: {hud["score"]}', True, (255, 255, 255))
+            level_text = font.render(f'Level: {hud["level"]}', True, (255, 255, 255))
+            screen.blit(score_text, (width - 150, 10))
+            screen.blit(level_text, (width - 150, 40))
+            minutes, seconds = divmod(hud["time_remaining"], 60)
+            time_text = font.render(f"Time: {minutes:02d}:{seconds:02d}", True, (255, 255, 255))
+            screen.blit(time_text, (width // 2 - time_text.get_width() // 2, 10))
+            if hud["you"] not in entities:
+                down_text = font.render("You are down - wait for the next run", True, (255, 0, 0))
+                screen.blit(down_text, (width // 2 - down_text.get_width() // 2, height // 2))
+            stats_text = small_font.render(f"{client.received_bytes // 1024} KB received", True, (100, 100, 100))
+            screen.blit(stats_text, (10, height - 30))
+
+        pygame.display.flip()
+        clock.tick(fps)
+
+    client.close()
@@ -0,0 +1,189 @@
+import threading
+
+import numpy as np
+import pygame
+
+from netplay import KIND_PLAYER, KIND_SHOT, KIND_EXPLOSION, KIND_GEM, ENEMY_KIND_IMAGES
+
+KIND_PARTICLE = 10
+KIND_DAMAGE = 11  # Damage number: variant is the alpha level, extra the value
+ALPHA_LEVELS = 16  # Particle fade is drawn in this many steps, one cached image each
+
+# Row layout handed to SnapshotBuffers.capture()
+# (kind, variant, extra, last_x, last_y, x, y, r, g, b, a); positions are centres.
+# For KIND_GEM the variant is the gem tier
+ROW_FIELDS = 11
+
+
+class RenderSnapshot:
+    """One frame of drawable state in flat arrays; read-only once published"""
+
+    def __init__(self, capacity=256):
+        self.count = 0
+        self.blend = 1.0
+        self.hud = None
+        self._allocate(capacity)
+
+    def _allocate(self, capacity):
+        self.kind = np.zeros(capacity, dtype=np.uint8)
+        self.variant = np.zeros(capacity, dtype=np.uint8)  # e.g. 1 for simple explosions
+        self.extra = np.zeros(capacity, dtype=np.int32)  # Explosion radius, particle size
+        self.position = np.zeros((capacity, 4), dtype=np.float32)  # last x, last y, x, y
+        self.color = np.zeros((capacity, 4), dtype=np.uint8)
+
+    def arrays(self):
+        return (self.kind, self.variant, self.extra, self.position, self.color)
+
+    def fill(self, rows, blend, hud):
+        count = len(rows)
+        if count > len(self.kind):
+            self._allocate(max(count, len(self.kind) * 2))
+        for array in self.arrays():
+            array.flags.writeable = True
+        if count:
+            table = np.array(rows, dtype=np.float32)
+            self.kind[:count] = table[:, 0]
+            self.variant[:count] = table[:, 1]
+            self.extra[:count] = table[:, 2]
+            self.position[:count] = table[:, 3:7]
+            self.color[:count] = table[:, 7:11]
+        self.count = count
+        self.blend = blend
+        self.hud = hud
+        for array in self.arrays():
+            array.flags.writeable = False
+
+
+class SnapshotBuffers:
+    """Two snapshots used in turn: one is drawn while the next frame is captured into the other"""
+
+    def __init__(self):
+        self.buffers = [RenderSnapshot(), RenderSnapshot()]
+        self.next = 0
+
+    def capture(self, rows, blend, hud):
+        snapshot = self.buffers[self.next]
+        self.next ^= 1
+        snapshot.fill(rows, blend, hud)
+        return snapshot
+
+
+class SnapshotImages:
+    """Turns snapshot entries into blits; every image it makes belongs to the render thread"""
+
+    def __init__(self, get_enemy_image, get_explosion_image, get_gem_image):
+        self.get_enemy_image = get_enemy_image
+        self.get_explosion_image = get_explosion_image
+        self.get_gem_image = get_gem_image
+        self.digit_atlas = None  # damage_numbers.DigitAtlas, once fonts are loaded
+        self.player_image = pygame.Surface((30, 30))
+        self.player_image.fill((255, 255, 255))
+        self.shot_images = {}  # color -> image
+        self.particle_images = {}  # (size, color, alpha level) -> image
+
+    def blits(self, snapshot):
+        """(image, top-left) pairs for the snapshot, interpolated by its blend"""
+        count = snapshot.count
+        if count == 0:
+            return []
+        position = snapshot.position[:count]
+        centres = position[:, :2] + (position[:, 2:] - position[:, :2]) * snapshot.blend
+        blits = []
+        numbers = []
+        for kind, variant, extra, (x, y), color in zip(snapshot.kind[:count].tolist(),
+                                                      snapshot.variant[:count].tolist(),
+                                                      snapshot.extra[:count].tolist(),
+                                                      centres.tolist(),
+                                                      snapshot.color[:count].tolist()):
+            if kind == KIND_DAMAGE:
+                numbers.append((extra, x, y, variant))
+                continue
+            image = self._image(kind, variant, extra, color)
+            if image is not None:
+                width, height = image.get_size()
+                blits.append((image, (x - width / 2, y - height / 2)))
+        if numbers and self.digit_atlas:
+            # On top of everything, like the direct renderer
+            values, xs, ys, levels = zip(*numbers)
+            blits.extend(self.digit_atlas.blits(values, xs, ys, levels))
+        return blits
+
+    def _image(self, kind, variant, extra, color):
+        if kind == KIND_PLAYER:
+            return self.player_image
+        if kind in ENEMY_KIND_IMAGES:
+            return self.get_enemy_image(ENEMY_KIND_IMAGES[kind])
+        if kind == KIND_SHOT:
+            key = tuple(color[:3])
+            image = self.shot_images.get(key)
+            if image is None:
+                image = pygame.Surface((10, 10))
+                image.fill(key)
+                self.shot_images[key] = image
+            return image
+        if kind == KIND_EXPLOSION:
+            return self.get_explosion_image(extra, bool(variant))
+        if kind == KIND_GEM:
+            return self.get_gem_image(variant)
+        if kind == KIND_PARTICLE:
+            level = color[3] * ALPHA_LEVELS // 256
+            if level == 0:
+                return None
+            key = (extra, tuple(color[:3]), level)
+            image = self.particle_images.get(key)
+            if image is None:
+                image = pygame.Surface((extra, extra))
+                image.fill(key[1])
+                image.set_alpha(level * 256 // ALPHA_LEVELS)
+                self.particle_images[key] = image
+            return image
+        return None
+
+
+class RenderPipeline:
+    """Draws one frame's snapshot on a worker thread while the main thread simulates the next.
+
+    draw(snapshot) runs on the worker. The main thread calls wait() before it
+    touches the screen itself (flip, warnings, non-gameplay screens).
+    """
+
+    def __init__(self, draw):
+        self.draw = draw
+        self.frames_drawn = 0
+        self._snapshot = None
+        self._stop = False
+        self._work = threading.Event()
+        self._done = threading.Event()
+        self._done.set()
+        self._thread = threading.Thread(target=self._run, name="render", daemon=True)
+        self._thread.start()
+
+    def submit(self, snapshot):
+        self.wait()
+        self._snapshot = snapshot
+        self._done.clear()
+        self._work.set()
+
+    def wait(self):
+        """Block until the submitted frame has been drawn"""
+        self._done.wait()
+
+    def close(self):
+        self.wait()
+        self._stop = True
+        self._work.set()
+        self._thread.join()
+
+    def _run(self):
+        while True:
+            self._work.wait()
+            self._work.clear()
+            if self._stop:
+                return
+            try:
+                self.draw(self._snapshot)
+                self.frames_drawn += 1
+            except Exception as e:
+                print(f"Error drawing frame: {e}")
+            finally:
+                self._done.set()
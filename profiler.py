@@ -0,0 +1,174 @@
+import json
+import marshal
+import os
+import queue
+import sys
+import threading
+import time
+from collections import deque
+
+
+class SamplingProfiler:
+    """Statistical profiler for one thread (normally the game loop).
+
+    A background thread looks at the target thread's stack every `interval`
+    seconds through sys._current_frames(), so the game itself runs no
+    profiling code at all. Samples are kept for captures started with
+    capture(), and in rolling mode the last `window` seconds are always kept
+    so dump_window() can save what led up to a slow frame.
+
+    Each dump writes three files sharing one name:
+      .collapsed  one "outer;inner;leaf count" line per stack, for flamegraph.pl or speedscope
+      .pstats     marshalled stats that pstats.Stats / snakeviz can load (times are sample estimates)
+      .json       why and when it was taken, plus the game metadata passed in
+    """
+
+    def __init__(self, thread_id, directory, interval=0.005, window=10.0, rolling=False, cooldown=30.0):
+        self.thread_id = thread_id
+        self.directory = directory
+        self.interval = interval
+        self.window = window
+        self.rolling = rolling
+        self.cooldown = cooldown  # Minimum seconds between automatic dumps
+        self.dumps = 0
+        self.samples = deque()  # (perf_counter time, stack of (code, line) pairs, outermost first)
+        self._capture = None  # (start, end, metadata) of the capture in progress
+        self._last_auto_dump = None
+        self._requests = queue.Queue()
+        self._stop = False
+        self._thread = threading.Thread(target=self._run, name="profiler", daemon=True)
+        self._thread.start()
+
+    def capture(self, seconds, metadata):
+        """Profile the next `seconds` seconds, then dump them"""
+        self._requests.put(("capture", seconds, metadata))
+
+    def dump_window(self, metadata):
+        """Rolling mode: dump the last `window` seconds, unless an automatic dump happened within the cooldown"""
+        if not self.rolling:
+            return False
+        now = time.perf_counter()
+        if self._last_auto_dump is not None and now - self._last_auto_dump < self.cooldown:
+            return False
+        self._last_auto_dump = now
+        self._requests.put(("window", now, metadata))
+        return True
+
+    @property
+    def capturing(self):
+        return self._capture is not None
+
+    def close(self):
+        self._stop = True
+        self._requests.put(None)
+        self._thread.join()
+
+    def _run(self):
+        while not self._stop:
+            if not self.rolling and self._capture is None:
+                # Nothing to sample: sleep until asked for something
+                self._handle(self._requests.get())
+                continue
+            try:
+                while True:
+                    self._handle(self._requests.get_nowait())
+            except queue.Empty:
+                pass
+            self._sample()
+            time.sleep(self.interval)
+
+    def _handle(self, request):
+        if request is None:
+            return
+        kind, value, metadata = request
+        now = time.perf_counter()
+        if kind == "capture":
+            if self._capture is not None:
+                return  # Already capturing; one at a time
+            self._capture = (now, now + value, metadata)
+        elif kind == "window":
+            self._write(value - self.window, value, metadata)
+
+    def _sample(self):
+        now = time.perf_counter()
+        frame = sys._current_frames().get(self.thread_id)
+        if frame is not None:
+            stack = []
+            while frame is not None:
+                stack.append((frame.f_code, frame.f_lineno))
+                frame = frame.f_back
+            stack.reverse()
+            self.samples.append((now, tuple(stack)))
+
+        if self._capture is not None and now >= self._capture[1]:
+            start, end, metadata = self._capture
+            self._capture = None
+            self._write(start, end, metadata)
+
+        # Keep only what a later dump can still ask for
+        keep_from = now - self.window if self.rolling else self._capture[0] if self._capture else now
+        while self.samples and self.samples[0][0] < keep_from:
+            self.samples.popleft()
+
+    def _write(self, start, end, metadata):
+        stacks = [stack for when, stack in self.samples if start <= when <= end]
+        os.makedirs(self.directory, exist_ok=True)
+        self.dumps += 1
+        name = os.path.join(self.directory, f"profile-{time.strftime('%Y%m%d-%H%M%S')}-{self.dumps:03d}")
+        try:
+            with open(name + ".collapsed", "w") as f:
+                f.write(collapse(stacks))
+            with open(name + ".pstats", "wb") as f:
+                marshal.dump(pstats_table(stacks, self.interval), f)
+            with open(name + ".json", "w") as f:
+                json.dump(dict(metadata, samples=len(stacks), interval=self.interval,
+                               seconds=round(end - start, 3)), f, indent=1)
+            print(f"Profile written to {name}.collapsed ({len(stacks)} samples)")
+        except OSError as e:
+            print(f"Error writing profile: {e}")
+
+
+def code_label(code, line):
+    # The current line, not the def line: time in C calls (flip, tick) shows up on the line that made them
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{line})"
+
+
+def code_key(code):
+    return (code.co_filename, code.co_firstlineno, code.co_name)
+
+
+def collapse(stacks):
+    """Collapsed stack text: identical stacks counted once, hottest first"""
+    counts = {}
+    for stack in stacks:
+        counts[stack] = counts.get(stack, 0) + 1
+    lines = [";".join(code_label(code, line) for code, line in stack) + f" {count}"
+             for stack, count in sorted(counts.items(), key=lambda item: -item[1])]
+    return "\n".join(lines) + "\n" if lines else ""
+
+
+def pstats_table(stacks, interval):
+    """The dict pstats.Stats loads: {func: (cc, nc, tt, ct, callers)} with samples standing in for calls"""
+    table = {}  # func -> [samples, self seconds, total seconds, callers]
+    for stack in stacks:
+        keys = [code_key(code) for code, _ in stack]
+        seen = set()
+        for depth, key in enumerate(keys):
+            entry = table.setdefault(key, [0, 0.0, 0.0, {}])
+            leaf = depth == len(keys) - 1
+            if key not in seen:
+                # Recursive functions count once per sample towards their total
+                seen.add(key)
+                entry[0] += 1
+                entry[2] += interval
+            if leaf:
+                entry[1] += interval
+            if depth:
+                caller = entry[3].setdefault(keys[depth - 1], [0, 0.0, 0.0])
+                caller[0] += 1
+                caller[1] += interval if leaf else 0.0
+                caller[2] += interval
+    return {key: (samples, samples, self_time, total_time,
+                  {caller: (count, count, caller_self, caller_total)
+                   for caller, (count, caller_self, caller_total) in callers.items()})
+            for key, (samples, self_time, total_time, callers) in table.items()}
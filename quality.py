@@ -0,0 +1,114 @@
+from collections import deque
+
+# Quality levels from best to cheapest. The governor steps through these in order.
+QUALITY_LEVELS = [
+    {
+        "name": "high",
+        "particle_cap": 600,  # Max live explosion particles
+        "simple_explosions": False,  # Flat circle instead of the scaled explosion texture
+        "decorative_draws": True,  # Particles and other purely visual extras
+        "victory_particles": 100,
+    },
+    {
+        "name": "medium",
+        "particle_cap": 250,
+        "simple_explosions": False,
+        "decorative_draws": True,
+        "victory_particles": 60,
+    },
+    {
+        "name": "low",
+        "particle_cap": 80,
+        "simple_explosions": True,
+        "decorative_draws": True,
+        "victory_particles": 30,
+    },
+    {
+        "name": "minimal",
+        "particle_cap": 0,
+        "simple_explosions": True,
+        "decorative_draws": False,
+        "victory_particles": 10,
+    },
+]
+
+QUALITY_NAMES = [level["name"] for level in QUALITY_LEVELS]
+
+
+class QualityGovernor:
+    """Steps quality down when frames run over budget and back up when there is headroom"""
+
+    def __init__(self, target_fps=60, window=30, adaptive=True, level=0,
+                 down_ratio=1.1, up_ratio=0.7, down_after=15, up_after=180):
+        self.budget_ms = 1000.0 / target_fps
+        self.frame_times = deque(maxlen=window)
+        self.frame_total = 0.0
+        self.adaptive = adaptive
+        self.level = level
+        # Hysteresis: degrade quickly when over budget, recover only after a long stretch of headroom
+        self.down_threshold = self.budget_ms * down_ratio
+        self.up_threshold = self.budget_ms * up_ratio
+        self.down_after = down_after
+        self.up_after = up_after
+        self.frames_over = 0
+        self.frames_under = 0
+        self.level_changes = 0
+
+    @property
+    def settings(self):
+        return QUALITY_LEVELS[self.level]
+
+    @property
+    def level_name(self):
+        return QUALITY_LEVELS[self.level]["name"]
+
+    @property
+    def average_ms(self):
+        if not self.frame_times:
+            return 0.0
+        return self.frame_total / len(self.frame_times)
+
+    def record(self, frame_ms):
+        """Feed the time spent on the last frame (excluding the frame-cap sleep)"""
+        if len(self.frame_times) == self.frame_times.maxlen:
+            self.frame_total -= self.frame_times[0]
+        self.frame_times.append(frame_ms)
+        self.frame_total += frame_ms
+
+        if not self.adaptive or len(self.frame_times) < self.frame_times.maxlen:
+            return
+
+        average = self.average_ms
+        if average > self.down_threshold:
+            self.frames_over += 1
+            self.frames_under = 0
+        elif average < self.up_threshold:
+            self.frames_under += 1
+            self.frames_over = 0
+        else:
+            self.frames_over = 0
+            self.frames_under = 0
+
+        if self.frames_over >= self.down_after and self.level < len(QUALITY_LEVELS) - 1:
+            self._set_level(self.level + 1)
+        elif self.frames_under >= self.up_after and self.level > 0:
+            self._set_level(self.level - 1)
+
+    def _set_level(self, level):
+        self.level = level
+        self.level_changes += 1
+        self.frames_over = 0
+        self.frames_under = 0
+        # Start the next measurement from scratch so one spike can't cause two steps
+        self.frame_times.clear()
+        self.frame_total = 0.0
+
+    def stats(self):
+        """Current state for the per-second telemetry sample"""
+        return {
+            "quality_level": self.level,
+            "quality_name": self.level_name,
+            "quality_frame_ms_avg": round(self.average_ms, 3),  # Over the governor's window, not the last second
+            "quality_budget_ms": round(self.budget_ms, 3),
+            "quality_changes": self.level_changes,
+        }
@@ -0,0 +1,86 @@
+import weakref
+
+import pygame
+
+
+class ScaledRenderer:
+    """Renders the gameplay layer at a fraction of the window resolution"""
+
+    def __init__(self, display, scale=1.0, smooth=False):
+        self.display = display
+        self.scale = max(0.1, min(1.0, scale))
+        self.smooth = smooth
+
+        if self.scale < 1.0:
+            width, height = display.get_size()
+            self.surface = pygame.Surface((max(1, int(width * self.scale)), max(1, int(height * self.scale))))
+        else:
+            # Native resolution - draw straight into the window, no extra copy
+            self.surface = display
+
+        # Scaled copies of sprite images, dropped automatically with the source surface
+        self._image_cache = weakref.WeakKeyDictionary()
+
+    @property
+    def is_scaled(self):
+        return self.surface is not self.display
+
+    def begin(self, color):
+        """Clear the gameplay layer and return it"""
+        self.surface.fill(color)
+        return self.surface
+
+    def draw_sprites(self, sprites, blend=1.0):
+        """Draw a sprite group into the gameplay layer.
+
+        With blend below 1 each sprite is drawn part of the way from where it was
+        before the last simulation tick (its last_center) to where it is now.
+        """
+        if not self.is_scaled and blend >= 1.0:
+            sprites.draw(self.surface)
+            return
+
+        scale = self.scale
+        lag = 1.0 - blend
+        blits = []
+        for sprite in sprites:
+            rect = sprite.rect
+            x, y = rect.x, rect.y
+            last = getattr(sprite, "last_center", None)
+            if last is not None and lag > 0:
+                x += (last[0] - rect.centerx) * lag
+                y += (last[1] - rect.centery) * lag
+            image = self._scaled_image(sprite.image) if self.is_scaled else sprite.image
+            blits.append((image, (int(x * scale), int(y * scale))))
+        self.surface.blits(blits, doreturn=False)
+
+    def draw_blits(self, blits):
+        """Draw (image, (x, y)) pairs given in window coordinates into the gameplay layer"""
+        if not self.is_scaled:
+            self.surface.blits(blits, doreturn=False)
+            return
+        scale = self.scale
+        self.surface.blits([(self._scaled_image(image), (int(x * scale), int(y * scale)))
+                            for image, (x, y) in blits], doreturn=False)
+
+    def present(self):
+        """Upscale the gameplay layer into the window; HUD drawing happens after this"""
+        if not self.is_scaled:
+            return
+        if self.smooth:
+            pygame.transform.smoothscale(self.surface, self.display.get_size(), self.display)
+        else:
+            pygame.transform.scale(self.surface, self.display.get_size(), self.display)
+
+    def _scaled_image(self, image):
+        scaled = self._image_cache.get(image)
+        if scaled is None:
+            width, height = image.get_size()
+            size = (max(1, round(width * self.scale)), max(1, round(height * self.scale)))
+            scaled = pygame.transform.scale(image, size)
+            self._image_cache[image] = scaled
+        # Particles fade by changing the alpha of their image every frame
+        alpha = image.get_alpha()
+        if alpha != scaled.get_alpha():
+            scaled.set_alpha(alpha)
+        return scaled
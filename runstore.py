@@ -0,0 +1,189 @@
+import argparse
+import queue
+import sqlite3
+import threading
+import time
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY,
+    ended_at REAL NOT NULL,
+    outcome TEXT NOT NULL,
+    score INTEGER NOT NULL,
+    level INTEGER NOT NULL,
+    duration REAL NOT NULL,
+    build TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS run_weapons (
+    run_id INTEGER NOT NULL REFERENCES runs(id),
+    weapon TEXT NOT NULL,
+    PRIMARY KEY (run_id, weapon)
+);
+CREATE TABLE IF NOT EXISTS run_upgrades (
+    run_id INTEGER NOT NULL REFERENCES runs(id),
+    pick INTEGER NOT NULL,
+    name TEXT NOT NULL,
+    type TEXT NOT NULL,
+    level INTEGER NOT NULL,
+    t REAL NOT NULL,
+    PRIMARY KEY (run_id, pick)
+);
+CREATE TABLE IF NOT EXISTS run_kills (
+    run_id INTEGER NOT NULL REFERENCES runs(id),
+    minute INTEGER NOT NULL,
+    kills INTEGER NOT NULL,
+    PRIMARY KEY (run_id, minute)
+);
+-- Leaderboard: walk the score index from the top, no sort
+CREATE INDEX IF NOT EXISTS runs_score ON runs (score DESC);
+-- Best runs with one exact build: seek to the build, already in score order
+CREATE INDEX IF NOT EXISTS runs_build_score ON runs (build, score DESC);
+"""
+
+
+def build_key(weapons):
+    """Canonical name for a set of weapons, e.g. "bazooka+pistol+shotgun" """
+    return "+".join(sorted(set(weapons)))
+
+
+def connect(path):
+    connection = sqlite3.connect(path, timeout=10)
+    connection.execute("PRAGMA journal_mode=WAL")
+    connection.execute("PRAGMA synchronous=NORMAL")  # WAL stays consistent; only the last run may be lost on power failure
+    return connection
+
+
+class RunStore:
+    """History of finished runs in a local SQLite database.
+
+    record() only queues the run; a background thread owns the write
+    connection, so the end-of-run screen never waits on disk. Queries use
+    their own connection and, thanks to WAL, never wait for the writer.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.written = 0
+        self._queue = queue.Queue()
+        self._reader = None
+        self._ready = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="run-store", daemon=True)
+        self._thread.start()
+
+    def record(self, outcome, score, level, duration, weapons, upgrades=(), kills_per_minute=None):
+        """Queue one finished run.
+
+        upgrades:         (name, type, level, t) per upgrade picked, in order
+        kills_per_minute: minute -> kills
+        """
+        self._queue.put((time.time(), outcome, score, level, duration, list(weapons), list(upgrades),
+                         dict(kills_per_minute or {})))
+
+    def close(self):
+        """Write everything still queued and stop the writer"""
+        self._queue.put(None)
+        self._thread.join()
+        if self._reader:
+            self._reader.close()
+            self._reader = None
+
+    def leaderboard(self, limit=10, outcome=None):
+        """Top runs by score as (id, score, level, duration, outcome, build, ended_at) rows"""
+        if outcome:
+            return self._query("SELECT id, score, level, duration, outcome, build, ended_at FROM runs "
+                               "WHERE outcome = ? ORDER BY score DESC LIMIT ?", (outcome, limit))
+        return self._query("SELECT id, score, level, duration, outcome, build, ended_at FROM runs "
+                           "ORDER BY score DESC LIMIT ?", (limit,))
+
+    def best_with_build(self, weapons, limit=10):
+        """Top runs that owned exactly these weapons"""
+        return self._query("SELECT id, score, level, duration, outcome, build, ended_at FROM runs "
+                           "WHERE build = ? ORDER BY score DESC LIMIT ?", (build_key(weapons), limit))
+
+    def best_with_weapon(self, weapon, limit=10):
+        """Top runs that owned this weapon, alongside anything else.
+
+        Walks the score index and probes run_weapons' primary key, so it stops
+        as soon as `limit` runs are found.
+        """
+        return self._query("SELECT id, score, level, duration, outcome, build, ended_at FROM runs "
+                           "WHERE EXISTS (SELECT 1 FROM run_weapons WHERE run_id = runs.id AND weapon = ?) "
+                           "ORDER BY score DESC LIMIT ?", (weapon, limit))
+
+    def run_details(self, run_id):
+        """Upgrades picked and kills per minute for one run"""
+        upgrades = self._query("SELECT name, type, level, t FROM run_upgrades WHERE run_id = ? ORDER BY pick",
+                               (run_id,))
+        kills = self._query("SELECT minute, kills FROM run_kills WHERE run_id = ? ORDER BY minute", (run_id,))
+        return {"upgrades": upgrades, "kills_per_minute": dict(kills)}
+
+    def _query(self, sql, params):
+        # The writer creates the schema; wait for that before the first read
+        self._ready.wait()
+        if self._reader is None:
+            self._reader = connect(self.path)
+        return self._reader.execute(sql, params).fetchall()
+
+    def _run(self):
+        try:
+            connection = connect(self.path)
+            connection.executescript(SCHEMA)
+        except sqlite3.Error as e:
+            print(f"Error opening run store: {e}")
+            self._ready.set()
+            while self._queue.get() is not None:
+                pass  # Keep accepting runs so close() still works
+            return
+        self._ready.set()
+
+        while True:
+            run = self._queue.get()
+            if run is None:
+                break
+            try:
+                self._write(connection, run)
+                self.written += 1
+            except sqlite3.Error as e:
+                print(f"Error saving run: {e}")
+        connection.close()
+
+    def _write(self, connection, run):
+        ended_at, outcome, score, level, duration, weapons, upgrades, kills = run
+        # One transaction per run: the run and its detail rows appear together or not at all
+        with connection:
+            run_id = connection.execute(
+                "INSERT INTO runs (ended_at, outcome, score, level, duration, build) VALUES (?, ?, ?, ?, ?, ?)",
+                (ended_at, outcome, score, level, duration, build_key(weapons))).lastrowid
+            connection.executemany("INSERT INTO run_weapons (run_id, weapon) VALUES (?, ?)",
+                                   [(run_id, weapon) for weapon in sorted(set(weapons))])
+            connection.executemany(
+                "INSERT INTO run_upgrades (run_id, pick, name, type, level, t) VALUES (?, ?, ?, ?, ?, ?)",
+                [(run_id, pick, *upgrade) for pick, upgrade in enumerate(upgrades)])
+            connection.executemany("INSERT INTO run_kills (run_id, minute, kills) VALUES (?, ?, ?)",
+                                   sorted((run_id, minute, count) for minute, count in kills.items()))
+
+
+def print_runs(rows):
+    for run_id, score, level, duration, outcome, build, ended_at in rows:
+        when = time.strftime("%Y-%m-%d %H:%M", time.localtime(ended_at))
+        print(f"#{run_id:<7} {score:>7}  lvl {level:<3} {duration / 60:5.1f} min  {outcome:<9} {build:<40} {when}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Show the leaderboard from a run history database")
+    parser.add_argument("path", nargs="?", default="runs.db")
+    parser.add_argument("--limit", type=int, default=10)
+    parser.add_argument("--build", metavar="WEAPON[,WEAPON...]",
+                        help="only runs that owned exactly these weapons")
+    parser.add_argument("--weapon", help="only runs that owned this weapon")
+    parser.add_argument("--outcome", choices=["victory", "game_over"])
+    args = parser.parse_args()
+
+    store = RunStore(args.path)
+    if args.build:
+        print_runs(store.best_with_build(args.build.split(","), args.limit))
+    elif args.weapon:
+        print_runs(store.best_with_weapon(args.weapon, args.limit))
+    else:
+        print_runs(store.leaderboard(args.limit, args.outcome))
+    store.close()
@@ -0,0 +1,249 @@
+"""Soak test: several full-length runs back to back, headless and faster than real time.
+
+Game time comes from a virtual clock that advances one frame per update, so a
+15 minute run takes as long as the simulation needs, not 15 minutes. After
+every run the game is reset and memory is measured; if traced memory, object
+counts or container sizes keep growing from one run to the next, it fails.
+
+    python soak.py --runs 3
+    python soak.py --runs 5 --duration 120 --mortal
+"""
+import argparse
+import gc
+import math
+import os
+import random
+import sys
+import tempfile
+import tracemalloc
+from collections import Counter
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+
+import pygame
+
+import gameclock
+import main
+import netplay
+
+parser = argparse.ArgumentParser(description="Vibe Survivors soak test")
+parser.add_argument("--runs", type=int, default=3, help="Back-to-back runs to play (at least 2)")
+parser.add_argument("--duration", type=float, default=main.GAME_DURATION, help="Seconds per run")
+parser.add_argument("--seed", type=int, default=1)
+parser.add_argument("--mortal", action="store_true", help="Let the bot die instead of keeping it at full health")
+parser.add_argument("--draw-every", type=int, default=10, help="Render one frame in N (0 never draws)")
+parser.add_argument("--victory-frames", type=int, default=120, help="Frames to stay on the victory screen")
+parser.add_argument("--tolerance-kb", type=float, default=256.0,
+                    help="Retained memory growth allowed between the first and last run")
+parser.add_argument("--object-tolerance", type=int, default=200,
+                    help="Growth allowed in the live count of any one object type")
+
+
+def tracked_sizes():
+    """Containers that should be back to their starting size after every reset"""
+    return {
+        "all_sprites": len(main.all_sprites),
+        "enemies": len(main.enemies),
+        "players": len(main.players),
+        "projectiles": len(main.projectiles),
+        "enemy_projectiles": len(main.enemy_projectiles),
+        "explosions": len(main.explosions),
+        "particles": len(main.particles),
+        "celebration_particles": len(main.celebration_particles),
+        "combat_damage": len(main.combat_events.damage),
+        "combat_sources": len(main.combat_events.sources),
+        "weapon_cooldowns": len(main.player.weapon_cooldowns),
+        "upgrade_buttons": len(main.upgrade_buttons),
+    }
+
+
+def cache_sizes():
+    """Caches keyed by content (e.g. explosion radius); reported, but allowed to grow with new upgrades"""
+    return {
+        "explosion_images": len(main.explosion_images),
+        "scaled_images": len(main.renderer._image_cache),
+        "flow_paths": len(main.flow_field._cache) if main.flow_field else 0,
+    }
+
+
+def open_handles():
+    """Open file descriptors, where the platform lets us count them"""
+    try:
+        return len(os.listdir("/proc/self/fd"))
+    except OSError:
+        return 0
+
+
+class Measurement:
+    """Memory, object counts and container sizes at one point between runs"""
+
+    def __init__(self, run, directory):
+        gc.collect()
+        self.run = run
+        self.memory, self.peak = tracemalloc.get_traced_memory()
+        self.objects = Counter(type(o).__name__ for o in gc.get_objects())
+        self.sizes = tracked_sizes()
+        self.caches = cache_sizes()
+        self.handles = open_handles()
+        # Snapshots go to disk so their own traces don't show up as live objects in the next measurement
+        self.snapshot_path = os.path.join(directory, f"run-{run}.snapshot")
+        tracemalloc.take_snapshot().filter_traces([
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, "<frozen importlib._bootstrap*>"),
+        ]).dump(self.snapshot_path)
+        tracemalloc.reset_peak()
+
+    def load_snapshot(self):
+        return tracemalloc.Snapshot.load(self.snapshot_path)
+
+
+class SoakBot:
+    """Keeps away from the nearest enemy and shoots at it"""
+
+    def __init__(self, rng):
+        self.rng = rng
+        self.wander = (0, 0)
+        self.frame = 0
+
+    def control(self, player):
+        """Press movement keys on the player's controls; returns (aim, firing)"""
+        self.frame += 1
+        if self.frame % 60 == 0:
+            self.wander = (self.rng.choice((-1, 0, 1)), self.rng.choice((-1, 0, 1)))
+
+        x, y = player.rect.center
+        target = min(main.enemies, key=lambda e: (e.rect.centerx - x) ** 2 + (e.rect.centery - y) ** 2,
+                     default=None)
+        move_x, move_y = self.wander
+        if target is not None and math.hypot(target.rect.centerx - x, target.rect.centery - y) < 200:
+            move_x = -1 if target.rect.centerx > x else 1
+            move_y = -1 if target.rect.centery > y else 1
+
+        pressed = player.controls.keys.pressed
+        pressed.clear()
+        if move_x < 0:
+            pressed.add(pygame.K_a)
+        elif move_x > 0:
+            pressed.add(pygame.K_d)
+        if move_y < 0:
+            pressed.add(pygame.K_w)
+        elif move_y > 0:
+            pressed.add(pygame.K_s)
+
+        if target is None:
+            return (x, y), False
+        return target.rect.center, True
+
+
+def play_run(args, clock, bot, rng):
+    """Play one run to victory (or death) and return the number of frames simulated"""
+    main.reset_game()
+    main.player.controls = netplay.RemoteControls()
+    frame_seconds = 1.0 / main.FPS
+    frames = 0
+    victory_frames = 0
+
+    while True:
+        main.update_time()
+        state = main.game_state
+        if state == main.PLAYING:
+            aim, firing = bot.control(main.player)
+            main.update_playing(aim, firing)
+            if not args.mortal and main.game_state != main.GAME_OVER:
+                main.player.health = main.player.max_health
+        elif state == main.UPGRADING:
+            main.choose_upgrade(rng.choice(main.upgrade_options))
+        elif state == main.VICTORY:
+            main.update_victory()
+            victory_frames += 1
+            if victory_frames >= args.victory_frames:
+                break
+        else:
+            break
+
+        if args.draw_every and frames % args.draw_every == 0:
+            main.draw_frame()
+        clock.advance(frame_seconds)
+        frames += 1
+
+    main.player.controls = None
+    return frames
+
+
+def report(first, previous, current):
+    growth_kb = (current.memory - first.memory) / 1024
+    print(f"run {current.run}: traced {current.memory / 1024:.0f} KB (peak {current.peak / 1024:.0f} KB), "
+          f"{growth_kb:+.1f} KB since run {first.run}, {sum(current.objects.values())} objects, "
+          f"{current.handles} handles, caches {current.caches}")
+    grown = [(name, size) for name, size in current.sizes.items() if size != previous.sizes[name]]
+    if grown:
+        print("  sizes changed: " + ", ".join(f"{name} {previous.sizes[name]} -> {size}" for name, size in grown))
+    for stat in current.load_snapshot().compare_to(previous.load_snapshot(), "lineno")[:5]:
+        if stat.size_diff:
+            print(f"  {stat}")
+
+
+def check(args, first, last):
+    """Return a list of leak descriptions, empty when the last run retained no more than the first"""
+    problems = []
+    growth_kb = (last.memory - first.memory) / 1024
+    if growth_kb > args.tolerance_kb:
+        problems.append(f"retained memory grew {growth_kb:.1f} KB (tolerance {args.tolerance_kb:.0f} KB)")
+    for name, size in last.sizes.items():
+        if size > first.sizes[name]:
+            problems.append(f"{name} grew from {first.sizes[name]} to {size}")
+    for name, count in (last.objects - first.objects).most_common():
+        if count <= args.object_tolerance:
+            break
+        problems.append(f"{count} more live {name} objects")
+    if last.handles > first.handles:
+        problems.append(f"open handles grew from {first.handles} to {last.handles}")
+    return problems
+
+
+def main_soak():
+    args = parser.parse_args()
+    if args.runs < 2:
+        parser.error("--runs must be at least 2 to compare runs")
+
+    rng = random.Random(args.seed)
+    random.seed(args.seed)
+    clock = gameclock.VirtualClock()
+    gameclock.use_clock(clock)
+
+    main.args = main.parser.parse_args([])
+    main.GAME_DURATION = args.duration
+    main.init_display()
+    main.font, main.small_font, main.title_font = main.load_fonts()
+    main.load_explosion_texture()
+    main.load_sprites()
+    main.set_arena(main.args.arena)
+
+    tracemalloc.start(10)
+    bot = SoakBot(rng)
+    measurements = []
+    with tempfile.TemporaryDirectory(prefix="soak-") as directory:
+        for run in range(1, args.runs + 1):
+            frames = play_run(args, clock, bot, rng)
+            print(f"run {run}: {frames} frames, score {main.player.score}, level {main.player.level}, "
+                  f"{'victory' if main.game_state == main.VICTORY else 'game over'}")
+            # Measure from the state the next run starts in
+            main.reset_game()
+            measurements.append(Measurement(run, directory))
+            if len(measurements) > 1:
+                report(measurements[0], measurements[-2], measurements[-1])
+
+    problems = check(args, measurements[0], measurements[-1])
+    tracemalloc.stop()
+    pygame.quit()
+    if problems:
+        print("FAIL")
+        for problem in problems:
+            print(f"  {problem}")
+        sys.exit(1)
+    print("PASS")
+
+
+if __name__ == "__main__":
+    main_soak()
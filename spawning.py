@@ -0,0 +1,91 @@
+import time
+from collections import deque
+
+from enemies import create_enemy
+
+# Spare enemies of each type built ahead of time while nothing is happening on screen
+PREWARM_COUNTS = {"basic": 48, "fast": 32, "tank": 24, "ranged": 24, "mini_boss": 1}
+
+
+class EnemyPool:
+    """Enemies kept for reuse: dead ones come back here and are respawned instead of rebuilt"""
+
+    def __init__(self, prewarm_counts=PREWARM_COUNTS, max_free=256):
+        self.prewarm_counts = prewarm_counts
+        self.max_free = max_free  # Per type; past this dead enemies are just dropped
+        self.free = {}  # enemy type -> spare enemies
+        self.created = 0
+        self.reused = 0
+
+    def acquire(self, enemy_type):
+        """A respawned enemy of this type, from the spares if there is one"""
+        spares = self.free.get(enemy_type)
+        if spares:
+            enemy = spares.pop()
+            enemy.respawn()
+            self.reused += 1
+            return enemy
+        return self._create(enemy_type)
+
+    def release(self, enemy):
+        """Called by Enemy.kill()"""
+        spares = self.free.setdefault(enemy.enemy_type, [])
+        if len(spares) < self.max_free:
+            spares.append(enemy)
+
+    def prewarm(self, budget_ms=2.0):
+        """Build spares up to the prewarm counts, stopping once budget_ms is used; True when done"""
+        deadline = time.perf_counter() + budget_ms / 1000
+        for enemy_type, count in self.prewarm_counts.items():
+            spares = self.free.setdefault(enemy_type, [])
+            while len(spares) < count:
+                if time.perf_counter() >= deadline:
+                    return False
+                spares.append(self._create(enemy_type))
+        return True
+
+    def _create(self, enemy_type):
+        enemy = create_enemy(enemy_type)
+        enemy.pool = self
+        self.created += 1
+        return enemy
+
+
+class SpawnQueue:
+    """Enemies waiting to enter the arena, let in a few at a time.
+
+    A spawn wave is queued all at once but drained under a per-tick budget
+    (count and time), so a big late-game wave takes a few ticks to arrive
+    instead of landing in one long frame. With budget_ms None only the count
+    applies, so headless runs spawn the same way however loaded the machine is.
+    """
+
+    def __init__(self, pool, max_per_tick=4, budget_ms=1.0):
+        self.pool = pool
+        self.max_per_tick = max_per_tick
+        self.budget_ms = budget_ms
+        self.queue = deque()
+
+    def __len__(self):
+        return len(self.queue)
+
+    def push(self, enemy_type, urgent=False):
+        """Queue one enemy; urgent ones (the mini-boss) go to the front"""
+        if urgent:
+            self.queue.appendleft(enemy_type)
+        else:
+            self.queue.append(enemy_type)
+
+    def clear(self):
+        self.queue.clear()
+
+    def drain(self, add):
+        """Spawn queued enemies within this tick's budget, passing each to add(enemy); returns how many"""
+        deadline = None if self.budget_ms is None else time.perf_counter() + self.budget_ms / 1000
+        spawned = 0
+        # At least one per tick so the queue always moves
+        while self.queue and spawned < self.max_per_tick and (
+                spawned == 0 or deadline is None or time.perf_counter() < deadline):
+            add(self.pool.acquire(self.queue.popleft()))
+            spawned += 1
+        return spawned
@@ -0,0 +1,43 @@
+import threading
+import time
+
+# Taken when this module is first imported, which main.py does before anything heavy
+PROCESS_START = time.perf_counter()
+
+
+class StartupTimer:
+    """Records named startup phases and reports them to registered hooks"""
+
+    def __init__(self, start=PROCESS_START):
+        self.start = start
+        self.last = start
+        self.phases = []
+        self.hooks = []
+        self._lock = threading.Lock()  # Asset phases are marked from the loader thread
+
+    def add_hook(self, hook):
+        """hook(name, duration_ms, since_start_ms) is called for every phase"""
+        self.hooks.append(hook)
+
+    def mark(self, name, duration_ms=None):
+        """Close a phase that ran from the previous mark (or lasted duration_ms) until now"""
+        with self._lock:
+            now = time.perf_counter()
+            if duration_ms is None:
+                duration_ms = (now - self.last) * 1000
+                self.last = now
+            since_start_ms = (now - self.start) * 1000
+            self.phases.append((name, duration_ms, since_start_ms))
+        for hook in self.hooks:
+            hook(name, duration_ms, since_start_ms)
+
+    def elapsed_ms(self, name):
+        """Time from process start until the named phase finished, or None"""
+        for phase_name, _, since_start_ms in self.phases:
+            if phase_name == name:
+                return since_start_ms
+        return None
+
+
+def print_phase(name, duration_ms, since_start_ms):
+    print(f"startup: {name:<20} {duration_ms:8.1f} ms  (t={since_start_ms:.1f} ms)")
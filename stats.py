@@ -0,0 +1,79 @@
+# Modifier operations, applied in this order: adds, then multiplies, then clamps
+ADD = "add"
+MULTIPLY = "multiply"
+CLAMP_MIN = "clamp_min"
+CLAMP_MAX = "clamp_max"
+
+
+class StatBlock:
+    """Base stats plus stacked modifiers; effective values are cached until a modifier changes"""
+
+    def __init__(self, **base):
+        self._base = dict(base)
+        self._modifiers = {}
+        self._cache = {}
+
+    def get(self, name):
+        try:
+            return self._cache[name]
+        except KeyError:
+            value = self._compute(name)
+            self._cache[name] = value
+            return value
+
+    def base(self, name):
+        return self._base[name]
+
+    def set_base(self, name, value):
+        self._base[name] = value
+        self._cache.pop(name, None)
+
+    def add_modifier(self, name, op, value):
+        self._modifiers.setdefault(name, []).append((op, value))
+        self._cache.pop(name, None)
+
+    def clear_modifiers(self):
+        self._modifiers.clear()
+        self._cache.clear()
+
+    def _compute(self, name):
+        value = self._base[name]
+        modifiers = self._modifiers.get(name)
+        if not modifiers:
+            return value
+
+        added = 0
+        multiplier = 1
+        low = None
+        high = None
+        for op, amount in modifiers:
+            if op == ADD:
+                added += amount
+            elif op == MULTIPLY:
+                multiplier *= amount
+            elif op == CLAMP_MIN:
+                low = amount if low is None else max(low, amount)
+            elif op == CLAMP_MAX:
+                high = amount if high is None else min(high, amount)
+
+        value = (value + added) * multiplier
+        if low is not None:
+            value = max(low, value)
+        if high is not None:
+            value = min(high, value)
+        return value
+
+
+class Stat:
+    """Class attribute that reads an effective stat; assigning sets the base value"""
+
+    def __set_name__(self, owner, name):
+        self.name = name
+
+    def __get__(self, obj, objtype=None):
+        if obj is None:
+            return self
+        return obj.stats.get(self.name)
+
+    def __set__(self, obj, value):
+        obj.stats.set_base(self.name, value)
@@ -0,0 +1,111 @@
+import gzip
+import json
+import os
+import threading
+import time
+from collections import deque
+
+
+class TelemetryWriter:
+    """Queues gameplay events and writes them as gzipped JSONL from a background thread.
+
+    emit() only appends a tuple to a deque (atomic in CPython, no lock), so the
+    game loop never waits on serialisation or disk. When the queue is full new
+    events are dropped and counted instead of blocking.
+    """
+
+    enabled = True
+
+    def __init__(self, directory, max_queue=100000, batch_size=2000, flush_interval=1.0,
+                 rotate_bytes=16 * 1024 * 1024, compress_level=5):
+        self.directory = directory
+        self.max_queue = max_queue
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.rotate_bytes = rotate_bytes
+        self.compress_level = compress_level
+
+        self.queue = deque()
+        self.dropped = 0
+        self.written = 0
+        self.files_written = 0
+        self.session = time.strftime("%Y%m%d-%H%M%S")
+
+        self._file = None
+        self._file_bytes = 0
+        self._reported_dropped = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="telemetry-writer", daemon=True)
+        self._thread.start()
+
+    def emit(self, kind, **fields):
+        """Queue one event; fields must be plain JSON values"""
+        if len(self.queue) >= self.max_queue:
+            self.dropped += 1
+            return
+        self.queue.append((time.time(), kind, fields))
+
+    def close(self):
+        """Flush everything still queued and stop the writer"""
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self):
+        while not self._stop.wait(self.flush_interval):
+            self._drain()
+        self._drain()
+        if self._file:
+            self._file.close()
+            self._file = None
+
+    def _drain(self):
+        while self.queue:
+            lines = []
+            while self.queue and len(lines) < self.batch_size:
+                timestamp, kind, fields = self.queue.popleft()
+                event = {"ts": round(timestamp, 4), "event": kind}
+                event.update(fields)
+                lines.append(json.dumps(event, separators=(",", ":")))
+
+            # Let readers see how much was lost under backpressure
+            if self.dropped != self._reported_dropped:
+                self._reported_dropped = self.dropped
+                lines.append(json.dumps({"ts": round(time.time(), 4), "event": "telemetry_dropped",
+                                         "dropped": self.dropped}, separators=(",", ":")))
+
+            self._write_batch(lines)
+
+    def _write_batch(self, lines):
+        # Each batch is its own gzip member; concatenated members are still one valid .gz file
+        data = gzip.compress(("\n".join(lines) + "\n").encode("utf-8"), self.compress_level)
+        try:
+            if self._file is None or self._file_bytes >= self.rotate_bytes:
+                self._rotate()
+            self._file.write(data)
+            self._file.flush()
+            self._file_bytes += len(data)
+            self.written += len(lines)
+        except OSError as e:
+            print(f"Error writing telemetry: {e}")
+
+    def _rotate(self):
+        if self._file:
+            self._file.close()
+        os.makedirs(self.directory, exist_ok=True)
+        path = os.path.join(self.directory, f"telemetry-{self.session}-{self.files_written:04d}.jsonl.gz")
+        self._file = open(path, "ab")
+        self._file_bytes = 0
+        self.files_written += 1
+
+
+class NullTelemetry:
+    """Stand-in used when telemetry is off"""
+
+    enabled = False
+    dropped = 0
+
+    def emit(self, kind, **fields):
+        pass
+
+    def close(self):
+        pass
@@ -0,0 +1,71 @@
+import numpy as np
+import pygame
+
+from collision import find_wall_hits, swept_hits
+
+
+def sweep(start, end, half, boxes, radii=None):
+    boxes = np.array(boxes, dtype=float)
+    radii = np.zeros(len(boxes)) if radii is None else np.array(radii, dtype=float)
+    return swept_hits(np.array([start], dtype=float), np.array([end], dtype=float), np.array([half], dtype=float),
+                      boxes, radii)
+
+
+def test_fast_shot_hits_a_box_it_jumps_over_in_one_frame():
+    _, targets, t = sweep((0, 50), (200, 50), 5, [(100, 40, 104, 60)])
+
+    assert targets.tolist() == [0]
+    assert t[0] == (100 - 5) / 200  # Enters as soon as its edge touches
+
+
+def test_shot_passing_by_a_box_misses():
+    _, targets, _ = sweep((0, 20), (200, 20), 5, [(100, 40, 104, 60)])
+
+    assert len(targets) == 0
+
+
+def test_shot_already_inside_a_box_hits_at_the_start():
+    _, targets, t = sweep((100, 50), (100, 50), 5, [(90, 40, 110, 60)])
+
+    assert targets.tolist() == [0]
+    assert t[0] == 0
+
+
+def test_hits_come_in_time_of_impact_order():
+    _, targets, t = sweep((0, 50), (300, 50), 5, [(200, 40, 210, 60), (100, 40, 110, 60)])
+
+    assert targets.tolist() == [1, 0]
+    assert t[0] < t[1]
+
+
+def test_round_target_uses_its_circle_not_its_box():
+    box = [(90, 40, 110, 60)]
+    # Clips the corner of the box grown by the shot's half size, but stays outside the grown circle
+    _, box_hits, _ = sweep((103, 73), (123, 53), 5, box)
+    _, circle_hits, _ = sweep((103, 73), (123, 53), 5, box, radii=[10])
+    assert len(box_hits) == 1
+    assert len(circle_hits) == 0
+
+    _, targets, t = sweep((0, 50), (200, 50), 5, box, radii=[10])
+    assert targets.tolist() == [0]
+    assert np.isclose(t[0], (100 - 15) / 200)
+
+
+class Shot:
+    def __init__(self, prev, now, size=10):
+        self.prev_x, self.prev_y = prev
+        self.x, self.y = now
+        self.rect = pygame.Rect(0, 0, size, size)
+
+
+def test_wall_hits_find_the_nearest_wall_on_a_fast_shot_path():
+    walls = np.array([(600, 0, 640, 900), (540, 0, 580, 900)], dtype=float)
+    through = Shot((480, 450), (620, 450))  # 140 px in one frame, past the first wall
+    clear = Shot((100, 450), (170, 450))
+
+    hits = find_wall_hits([through, clear], walls)
+
+    assert len(hits) == 1
+    shot, t = hits[0]
+    assert shot is through
+    assert np.isclose(480 + 140 * t, 535)  # Stopped at the first wall, less the shot's half size
@@ -0,0 +1,47 @@
+import pygame
+
+from flowfield import FlowField
+
+# A wall down from the top of a 400x320 arena; the way round is under it
+WALL = pygame.Rect(180, 0, 40, 200)
+
+
+def follow(field, x, y, limit=50):
+    """Cell centres visited walking the waypoints from (x, y) until there are none"""
+    visited = []
+    while len(visited) < limit:
+        waypoint = field.waypoint(x, y)
+        if waypoint is None:
+            return visited
+        x, y = waypoint
+        visited.append((x, y))
+    raise AssertionError("waypoints never reached the player")
+
+
+def test_waypoints_lead_around_the_wall_to_the_player():
+    field = FlowField((400, 320), [WALL])
+    assert field.update([(60, 60)])
+
+    path = follow(field, 340, 60)
+
+    assert field.cell_at(*path[-1]) == field.cell_at(60, 60)
+    assert not any(field.blocked[field.cell_at(x, y)] for x, y in path)
+    assert max(y for _, y in path) > WALL.bottom  # Went under the wall, not through it
+
+
+def test_visibility_is_blocked_by_the_wall():
+    field = FlowField((400, 320), [WALL])
+    field.update([(60, 60)])
+
+    assert field.visible_at(100, 100)
+    assert not field.visible_at(340, 60)
+
+
+def test_searches_are_cached_per_player_cell():
+    field = FlowField((400, 320), [WALL])
+    field.update([(60, 60)])
+    field.update([(340, 260)])
+
+    assert not field.update([(345, 265)])  # Same cell: nothing to do
+    assert field.update([(60, 60)])  # Back to a cell searched before
+    assert field.searches == 2
@@ -0,0 +1,38 @@
+import numpy as np
+
+from gems import GemField
+
+
+def test_drop_more_than_capacity_into_empty_field():
+    field = GemField((1600, 900), capacity=64)
+    rng = np.random.default_rng(1)
+    positions = rng.uniform((0, 0), (1600, 900), size=(500, 2))
+    values = rng.integers(1, 20, size=500)
+
+    field.drop(positions, values)
+
+    assert field.count <= field.capacity
+    assert field.value[:field.count].sum() == values.sum()  # No experience lost to the overflow
+
+
+def test_drop_more_than_capacity_into_full_field():
+    field = GemField((1600, 900), capacity=64, cell=1)  # Cells too small for merging to make room
+    field.drop([(i * 10, 5) for i in range(64)], [1] * 64)
+
+    field.drop([(i * 10, 500) for i in range(100)], [2] * 100)
+
+    assert field.count == field.capacity
+    assert field.value[:field.count].sum() == 64 + 200
+
+
+def test_serials_follow_gems_through_merges_and_pickups():
+    field = GemField((1600, 900))
+    field.drop([(100, 100), (110, 110), (500, 500)], [1, 2, 3])
+    lone = field.serial[2]
+
+    field.merge()  # The first two share a cell
+    assert field.count == 2
+    assert sorted(field.serial[:2].tolist()) == [1, lone]
+
+    field.update([(500, 500)], [10])  # Picks up the lone gem
+    assert field.serial[:field.count].tolist() == [1]
@@ -0,0 +1,54 @@
+from netplay import (decode_snapshot, dequantize, encode_snapshot, quantize, HEADER, KIND_BASIC, KIND_GEM,
+                     KIND_PLAYER, RECORD)
+
+HUD = {"server_ms": 1234, "you": 1, "health": 80, "max_health": 100, "score": 50, "level": 3,
+       "time_remaining": 600, "state": 1}
+
+
+def payload(packet):
+    return packet[HEADER.size:]
+
+
+def test_full_snapshot_round_trip():
+    entities = {1: (KIND_PLAYER, 200, 300, 100), 2: (KIND_BASIC, -40, 1800, 50), 3: (KIND_GEM, 10, 20, 2)}
+
+    seq, decoded, hud = decode_snapshot(payload(encode_snapshot(7, 0, None, entities, HUD)), {})
+
+    assert seq == 7
+    assert decoded == entities
+    assert hud == HUD
+
+
+def test_delta_snapshot_rebuilds_from_its_baseline():
+    baseline = {1: (KIND_PLAYER, 200, 300, 100), 2: (KIND_BASIC, 400, 400, 50), 3: (KIND_GEM, 10, 20, 0)}
+    entities = {1: (KIND_PLAYER, 202, 300, 100), 3: (KIND_GEM, 10, 20, 0), 4: (KIND_BASIC, 0, 0, 100)}
+
+    full = encode_snapshot(8, 0, None, entities, HUD)
+    delta = encode_snapshot(8, 7, baseline, entities, HUD)
+    _, decoded, _ = decode_snapshot(payload(delta), {7: baseline})
+
+    assert decoded == entities  # Moved, unchanged, removed and new entities
+    assert len(delta) < len(full)  # The unchanged gem isn't sent again
+
+
+def test_delta_snapshot_against_an_unknown_baseline_is_dropped():
+    baseline = {1: (KIND_PLAYER, 200, 300, 100)}
+
+    packet = encode_snapshot(9, 7, baseline, {1: (KIND_PLAYER, 210, 300, 100)}, HUD)
+
+    assert decode_snapshot(payload(packet), {6: baseline}) is None
+
+
+def test_large_snapshot_is_compressed_and_round_trips():
+    entities = {i: (KIND_GEM, i * 4, i * 2, i % 4) for i in range(1, 500)}
+
+    packet = encode_snapshot(1, 0, None, entities, HUD)
+    _, decoded, _ = decode_snapshot(payload(packet), {})
+
+    assert len(packet) < 499 * RECORD.size
+    assert decoded == entities
+
+
+def test_positions_survive_quantization_to_half_a_pixel():
+    for value in (0, 0.5, 123.25, -20.75, 1599.9):
+        assert abs(dequantize(quantize(value)) - value) <= 0.25
@@ -0,0 +1,36 @@
+import pygame
+
+from damage_numbers import DamageNumbers
+from spawning import EnemyPool
+
+
+def test_pool_reuses_dead_enemies_as_new_spawns():
+    pool = EnemyPool(prewarm_counts={})
+    group = pygame.sprite.Group()
+    enemy = pool.acquire("basic")
+    group.add(enemy)
+    first_serial = enemy.serial
+    enemy.health = 1
+
+    enemy.kill()
+    respawned = pool.acquire("basic")
+
+    assert respawned is enemy
+    assert pool.created == 1 and pool.reused == 1
+    assert respawned.health == respawned.max_health
+    assert respawned.serial != first_serial
+
+
+def test_damage_numbers_keep_a_respawned_enemy_apart_from_its_last_life():
+    pool = EnemyPool(prewarm_counts={})
+    numbers = DamageNumbers()
+    enemy = pool.acquire("basic")
+    pygame.sprite.Group(enemy)
+    numbers.add_hits([(enemy, 30)])
+
+    enemy.kill()
+    pool.acquire("basic")
+    numbers.add_hits([(enemy, 7)])
+
+    index, _ = numbers.live()
+    assert sorted(numbers.value[index].tolist()) == [7, 30]
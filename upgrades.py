@@ -0,0 +1,163 @@
+import random
+from itertools import accumulate
+
+from stats import ADD
+from weapons import Pistol, Shotgun, MachineGun, Bazooka
+
+# General upgrades (always available), applied to the player's stats
+GENERAL_UPGRADES = [
+    {
+        "name": "Speed Boost",
+        "description": "Increase movement speed by 1",
+        "type": "general",
+        "stat": "speed",
+        "modifiers": [(ADD, 1)],
+        "weight": 1.0
+    },
+    {
+        "name": "Health Boost",
+        "description": "Increase max health by 20",
+        "type": "general",
+        "stat": "max_health",
+        "modifiers": [(ADD, 20)],
+        "weight": 1.0
+    },
+    {
+        "name": "Magnet",
+        "description": "Increase gem pickup range by 40",
+        "type": "general",
+        "stat": "magnet_radius",
+        "modifiers": [(ADD, 40)],
+        "weight": 0.7
+    }
+]
+
+# Weapon unlocks (only offered while the player has room for another weapon)
+WEAPON_UNLOCKS = [
+    {
+        "name": "Shotgun",
+        "description": "Unlock shotgun weapon",
+        "type": "weapon_unlock",
+        "weapon": "shotgun",
+        "weight": 1.0
+    },
+    {
+        "name": "Machine Gun",
+        "description": "Unlock machine gun weapon",
+        "type": "weapon_unlock",
+        "weapon": "machine_gun",
+        "weight": 1.0
+    },
+    {
+        "name": "Bazooka",
+        "description": "Unlock bazooka weapon",
+        "type": "weapon_unlock",
+        "weapon": "bazooka",
+        "weight": 1.0
+    }
+]
+
+MAX_WEAPONS = 4
+
+
+class UpgradePool:
+    """A fixed list of catalog entries with cumulative weights computed once"""
+
+    def __init__(self, entries):
+        self.entries = entries
+        self.cum_weights = list(accumulate(entry.get("weight", 1.0) for entry in entries))
+        self.total_weight = self.cum_weights[-1] if entries else 0.0
+
+    def pick(self, rng):
+        return rng.choices(self.entries, cum_weights=self.cum_weights)[0]
+
+
+class UpgradeCatalog:
+    """Every upgrade in the game, grouped into pools so level-ups only do weighted picks"""
+
+    def __init__(self):
+        self.general = UpgradePool(GENERAL_UPGRADES)
+        self.unlocks = {entry["weapon"]: UpgradePool([entry]) for entry in WEAPON_UNLOCKS}
+        self.weapon_pools = {
+            weapon_class: UpgradePool(weapon_class.UPGRADES)
+            for weapon_class in (Pistol, Shotgun, MachineGun, Bazooka)
+        }
+
+    def _eligible(self, player):
+        """One list of (pool, target, type) per upgrade type this player could be offered"""
+        eligible = [[(self.general, player, "general")]]
+
+        if len(player.weapons) < MAX_WEAPONS:
+            unlocks = [(pool, player, "weapon_unlock") for weapon_type, pool in self.unlocks.items()
+                       if weapon_type not in player.owned_weapons]
+            if unlocks:
+                eligible.append(unlocks)
+
+        weapon_pools = [(self.weapon_pools[weapon.__class__], weapon, "weapon_specific")
+                        for weapon in player.weapons if weapon.__class__ in self.weapon_pools]
+        if weapon_pools:
+            eligible.append(weapon_pools)
+        return eligible
+
+    def choose(self, player, count=3, rng=random):
+        """Pick upgrade options, preferring one of each type before doubling up"""
+        eligible = self._eligible(player)
+        selected = []
+        chosen = set()
+
+        def pick_from(pools):
+            weights = [pool.total_weight for pool, _, _ in pools]
+            pool, target, upgrade_type = rng.choices(pools, weights=weights)[0]
+            return pool.pick(rng), target, upgrade_type
+
+        # First pass: one of each type, in a weighted random order
+        type_order = sorted(
+            eligible,
+            key=lambda pools: rng.random() ** (1.0 / sum(pool.total_weight for pool, _, _ in pools)),
+            reverse=True
+        )
+        for pools in type_order:
+            if len(selected) >= count:
+                break
+            entry, target, upgrade_type = pick_from(pools)
+            selected.append((entry, target, upgrade_type))
+            chosen.add((id(entry), id(target)))
+
+        # Second pass: fill remaining slots with distinct weighted picks
+        all_pools = [pool for pools in eligible for pool in pools]
+        available = sum(len(pool.entries) for pool, _, _ in all_pools)
+        while len(selected) < count and all_pools:
+            entry, target, upgrade_type = pick_from(all_pools)
+            key = (id(entry), id(target))
+            # If we run out of distinct upgrades, duplicates are allowed
+            if key in chosen and len(chosen) < available:
+                continue
+            selected.append((entry, target, upgrade_type))
+            chosen.add(key)
+
+        return [make_option(entry, target, upgrade_type, i + 1)
+                for i, (entry, target, upgrade_type) in enumerate(selected)]
+
+
+def apply_upgrade(entry, target, upgrade_type):
+    """Apply a catalog entry to the player or weapon it was offered for"""
+    if upgrade_type == "weapon_unlock":
+        return target.add_weapon(entry["weapon"])
+    if upgrade_type == "weapon_specific":
+        target.apply_upgrade(entry)
+    else:
+        for op, value in entry["modifiers"]:
+            target.stats.add_modifier(entry["stat"], op, value)
+    return True
+
+
+def make_option(entry, target, upgrade_type, number):
+    """A fresh option dict for the upgrade screen; catalog entries are never mutated"""
+    return {
+        "name": entry["name"],
+        "description": entry["description"],
+        "type": upgrade_type,
+        "number": number,
+        "entry": entry,
+        "apply": lambda: apply_upgrade(entry, target, upgrade_type)
+    }
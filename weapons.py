@@ -1,18 +1,26 @@
-import pygame
 import math
 import random
+import gameclock
+from stats import StatBlock, Stat, ADD, CLAMP_MIN
 
 class Weapon:
+    damage = Stat()
+    fire_rate = Stat()
+    spread = Stat()
+
+    # Upgrade catalog for this weapon type, shared by every instance
+    UPGRADES = []
+
     def __init__(self, damage, fire_rate, spread, projectile_color):
+        self.stats = StatBlock()
         self.damage = damage
         self.fire_rate = fire_rate
         self.spread = spread
         self.projectile_color = projectile_color
         self.level = 1
-        self.upgrades = []
 
     def shoot(self, player, target_x, target_y):
-        current_time = pygame.time.get_ticks()
+        current_time = gameclock.ticks()
         weapon_type = self.__class__.__name__.lower()
         
         # Check if weapon is on cooldown
@@ -23,118 +31,147 @@ class Weapon:
         player.weapon_cooldowns[weapon_type] = current_time + self.fire_rate
         return True
 
-    def get_upgrades(self):
-        """Return available upgrades for this weapon"""
-        return self.upgrades
+    def apply_upgrade(self, upgrade):
+        """Stack an upgrade's stat modifiers onto this weapon"""
+        for op, value in upgrade["modifiers"]:
+            self.stats.add_modifier(upgrade["stat"], op, value)
 
 class Pistol(Weapon):
+    projectile_speed = Stat()
+
+    UPGRADES = [
+        {
+            "name": "Damage Up",
+            "description": "Increase pistol damage by 5",
+            "stat": "damage",
+            "modifiers": [(ADD, 5)]
+        },
+        {
+            "name": "Fire Rate Up",
+            "description": "Decrease cooldown by 50ms",
+            "stat": "fire_rate",
+            "modifiers": [(ADD, -50), (CLAMP_MIN, 200)]
+        },
+        {
+            "name": "Speed Up",
+            "description": "Increase projectile speed by 2",
+            "stat": "projectile_speed",
+            "modifiers": [(ADD, 2)]
+        }
+    ]
+
     def __init__(self):
         super().__init__(damage=20, fire_rate=500, spread=0, projectile_color=(0, 0, 255))
         self.projectile_speed = 10
-        self.upgrades = [
-            {
-                "name": "Damage Up",
-                "description": "Increase pistol damage by 5",
-                "apply": lambda: setattr(self, 'damage', self.damage + 5)
-            },
-            {
-                "name": "Fire Rate Up",
-                "description": "Decrease cooldown by 50ms",
-                "apply": lambda: setattr(self, 'fire_rate', max(200, self.fire_rate - 50))
-            },
-            {
-                "name": "Speed Up",
-                "description": "Increase projectile speed by 2",
-                "apply": lambda: setattr(self, 'projectile_speed', self.projectile_speed + 2)
-            }
-        ]
 
 class Shotgun(Weapon):
+    pellets = Stat()
+
+    UPGRADES = [
+        {
+            "name": "Tighter Spread",
+            "description": "Reduce spread by 1 degree",
+            "stat": "spread",
+            "modifiers": [(ADD, -1), (CLAMP_MIN, 1)]
+        },
+        {
+            "name": "More Pellets",
+            "description": "Add 1 more pellet",
+            "stat": "pellets",
+            "modifiers": [(ADD, 1)]
+        },
+        {
+            "name": "Damage Up",
+            "description": "Increase pellet damage by 3",
+            "stat": "damage",
+            "modifiers": [(ADD, 3)]
+        },
+        {
+            "name": "Faster Reload",
+            "description": "Decrease cooldown by 100ms",
+            "stat": "fire_rate",
+            "modifiers": [(ADD, -100), (CLAMP_MIN, 400)]
+        }
+    ]
+
     def __init__(self):
         super().__init__(damage=10, fire_rate=800, spread=5, projectile_color=(128, 0, 128))
         self.pellets = 3
-        self.upgrades = [
-            {
-                "name": "Tighter Spread",
-                "description": "Reduce spread by 1 degree",
-                "apply": lambda: setattr(self, 'spread', max(1, self.spread - 1))
-            },
-            {
-                "name": "More Pellets",
-                "description": "Add 1 more pellet",
-                "apply": lambda: setattr(self, 'pellets', self.pellets + 1)
-            },
-            {
-                "name": "Damage Up",
-                "description": "Increase pellet damage by 3",
-                "apply": lambda: setattr(self, 'damage', self.damage + 3)
-            },
-            {
-                "name": "Faster Reload",
-                "description": "Decrease cooldown by 100ms",
-                "apply": lambda: setattr(self, 'fire_rate', max(400, self.fire_rate - 100))
-            }
-        ]
 
 class MachineGun(Weapon):
+    UPGRADES = [
+        {
+            "name": "Faster Fire Rate",
+            "description": "Decrease cooldown by 10ms",
+            "stat": "fire_rate",
+            "modifiers": [(ADD, -10), (CLAMP_MIN, 50)]
+        },
+        {
+            "name": "Tighter Spread",
+            "description": "Reduce spread by 0.5 degrees",
+            "stat": "spread",
+            "modifiers": [(ADD, -0.5), (CLAMP_MIN, 0.5)]
+        },
+        {
+            "name": "Damage Up",
+            "description": "Increase damage by 3",
+            "stat": "damage",
+            "modifiers": [(ADD, 3)]
+        },
+        {
+            "name": "Extended Magazine",
+            "description": "Decrease cooldown by 20ms",
+            "stat": "fire_rate",
+            "modifiers": [(ADD, -20), (CLAMP_MIN, 50)]
+        }
+    ]
+
     def __init__(self):
         super().__init__(damage=15, fire_rate=100, spread=2, projectile_color=(255, 255, 0))
-        self.upgrades = [
-            {
-                "name": "Faster Fire Rate",
-                "description": "Decrease cooldown by 10ms",
-                "apply": lambda: setattr(self, 'fire_rate', max(50, self.fire_rate - 10))
-            },
-            {
-                "name": "Tighter Spread",
-                "description": "Reduce spread by 0.5 degrees",
-                "apply": lambda: setattr(self, 'spread', max(0.5, self.spread - 0.5))
-            },
-            {
-                "name": "Damage Up",
-                "description": "Increase damage by 3",
-                "apply": lambda: setattr(self, 'damage', self.damage + 3)
-            },
-            {
-                "name": "Extended Magazine",
-                "description": "Decrease cooldown by 20ms",
-                "apply": lambda: setattr(self, 'fire_rate', max(50, self.fire_rate - 20))
-            }
-        ]
 
 class Bazooka(Weapon):
+    explosion_radius = Stat()
+    particle_count = Stat()
+    particle_size = Stat()
+
+    UPGRADES = [
+        {
+            "name": "Larger Explosion",
+            "description": "Increase explosion radius by 20",
+            "stat": "explosion_radius",
+            "modifiers": [(ADD, 20)]
+        },
+        {
+            "name": "More Particles",
+            "description": "Add 5 more explosion particles",
+            "stat": "particle_count",
+            "modifiers": [(ADD, 5)]
+        },
+        {
+            "name": "Larger Particles",
+            "description": "Increase particle size by 1",
+            "stat": "particle_size",
+            "modifiers": [(ADD, 1)]
+        },
+        {
+            "name": "Faster Reload",
+            "description": "Decrease cooldown by 200ms",
+            "stat": "fire_rate",
+            "modifiers": [(ADD, -200), (CLAMP_MIN, 800)]
+        },
+        {
+            "name": "Damage Up",
+            "description": "Increase explosion damage by 10",
+            "stat": "damage",
+            "modifiers": [(ADD, 10)]
+        }
+    ]
+
     def __init__(self):
         super().__init__(damage=50, fire_rate=1500, spread=0, projectile_color=(255, 100, 0))
         self.explosion_radius = 100
         self.particle_count = 20
         self.particle_size = 5
-        self.upgrades = [
-            {
-                "name": "Larger Explosion",
-                "description": "Increase explosion radius by 20",
-                "apply": lambda: setattr(self, 'explosion_radius', self.explosion_radius + 20)
-            },
-            {
-                "name": "More Particles",
-                "description": "Add 5 more explosion particles",
-                "apply": lambda: setattr(self, 'particle_count', self.particle_count + 5)
-            },
-            {
-                "name": "Larger Particles",
-                "description": "Increase particle size by 1",
-                "apply": lambda: setattr(self, 'particle_size', self.particle_size + 1)
-            },
-            {
-                "name": "Faster Reload",
-                "description": "Decrease cooldown by 200ms",
-                "apply": lambda: setattr(self, 'fire_rate', max(800, self.fire_rate - 200))
-            },
-            {
-                "name": "Damage Up",
-                "description": "Increase explosion damage by 10",
-                "apply": lambda: setattr(self, 'damage', self.damage + 10)
-            }
-        ]
 
 # Weapon factory to create weapons
 def create_weapon(weapon_type):